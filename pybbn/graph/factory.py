@@ -1,8 +1,8 @@
 import itertools
 import json
-from itertools import product
 
 import networkx as nx
+import numpy as np
 import pandas as pd
 from networkx.algorithms.dag import topological_sort
 
@@ -136,21 +136,31 @@ class Factory(object):
         return bbn
 
     @staticmethod
-    def from_data(structure, df):
+    def from_data(structure, df, smoothing=0.0):
         """
-        Creates a BBN.
+        Creates a BBN. The parameters are learned by counting; every family (a node and its parents) is
+        counted with one group-by per chunk of data.
 
         :param structure: A dictionary where keys are names of children and values are list of parent names.
-        :param df: A dataframe.
+        :param df: A dataframe, or an iterable of dataframes (chunks) having the same columns, e.g.
+            pd.read_csv(path, chunksize=100_000).
+        :param smoothing: Dirichlet pseudo-count added to every cell of the CPTs (e.g. 1.0 for Laplace
+            smoothing). Conditional probabilities of parent configurations that are never observed (and not
+            smoothed) are uniform.
         :return: BBN.
         """
 
-        def get_profile(df):
-            profile = {}
-            for c in df.columns:
-                values = sorted(list(df[c].value_counts().index))
-                profile[c] = values
-            return profile
+        def get_chunks(df):
+            if isinstance(df, pd.DataFrame):
+                return [df]
+            return df
+
+        def get_counts(counts, name, parents, df):
+            columns = sorted(parents) + [name]
+            c = df.groupby(columns, observed=True, sort=False).size()
+            if name not in counts:
+                return c
+            return counts[name].add(c, fill_value=0)
 
         def get_n2i(parents):
             g = nx.DiGraph()
@@ -162,51 +172,34 @@ class Factory(object):
             nodes = list(topological_sort(g))
             return {n: i for i, n in enumerate(nodes)}
 
-        def get_cpt(name, parents, n2v, df):
-            parents = sorted(parents)
-            n2v = {k: sorted(v) for k, v in n2v.items()}
-
-            n = df.shape[0]
+        def get_cpt(name, parents, n2v, counts):
+            columns = sorted(parents) + [name]
 
-            cpts = []
-            if len(parents) == 0:
-                for v in n2v[name]:
-                    c = df[df[name] == v].shape[0]
-                    p = c / n
-                    cpts.append(p)
+            if len(columns) == 1:
+                index = pd.Index(n2v[name])
             else:
-                domains = [(n, d) for n, d in n2v.items() if n in parents]
-                domains = sorted(domains, key=lambda tup: tup[0])
-                domain_names = [tup[0] for tup in domains]
-                domain_values = [tup[1] for tup in domains]
-                domains = list(product(*domain_values))
-
-                for values in domains:
-                    probs = []
-                    denom_q = " and ".join(
-                        [f'{n}=="{v}"' for n, v in zip(domain_names, values)]
-                    )
-                    for v in n2v[name]:
-                        numer_q = f'{name}=="{v}" and {denom_q}'
-
-                        numer = df.query(numer_q).shape[0] / n
-                        denom = df.query(denom_q).shape[0] / n
-
-                        if denom == 0:
-                            prob = 1e-5
-                        else:
-                            prob = numer / denom
-                        probs.append(prob)
-                    probs = pd.Series(probs)
-                    probs = probs / probs.sum()
-                    probs = list(probs)
-                    cpts.extend(probs)
-
-            return cpts
-
-        n2v = get_profile(df)
-        n2i = get_n2i(df)
-        n2c = {n: get_cpt(n, structure[n], n2v, df) for n in structure}
+                index = pd.MultiIndex.from_product([n2v[c] for c in columns])
+
+            n = len(n2v[name])
+            c = counts.reindex(index, fill_value=0).values.reshape(-1, n)
+            c = c + smoothing
+            totals = c.sum(axis=1, keepdims=True)
+
+            probs = np.full(c.shape, 1.0 / n)
+            np.divide(c, totals, out=probs, where=totals > 0)
+            return probs.ravel().tolist()
+
+        n2v = {}
+        n2f = {}
+        for chunk in get_chunks(df):
+            for c in chunk.columns:
+                n2v.setdefault(c, set()).update(chunk[c].dropna().unique())
+            for name in structure:
+                n2f[name] = get_counts(n2f, name, structure[name], chunk)
+
+        n2v = {n: sorted(v) for n, v in n2v.items()}
+        n2i = get_n2i(structure)
+        n2c = {n: get_cpt(n, structure[n], n2v, n2f[n]) for n in structure}
 
         bbn = Bbn()
 
@@ -223,7 +216,7 @@ class Factory(object):
 
         for ch, parents in structure.items():
             ch_node = nodes[ch]
-            for pa in parents:
+            for pa in sorted(parents):
                 pa_node = nodes[pa]
 
                 edge = Edge(pa_node, ch_node, EdgeType.DIRECTED)
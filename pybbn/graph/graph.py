@@ -142,15 +142,14 @@ class Graph(object):
         """
         self.nodes.pop(id, None)
         self.edge_map.pop(id, None)
-        self.neighbors.pop(id, None)
-
-        for k, v in self.edge_map.items():
-            if id in v:
-                v.remove(id)
-
-        for k, v in self.neighbors.items():
-            if id in v:
-                v.remove(id)
+        neighbors = self.neighbors.pop(id, set())
+
+        # only neighbors can reference the removed node
+        for k in neighbors:
+            if k in self.edge_map:
+                self.edge_map[k].discard(id)
+            if k in self.neighbors:
+                self.neighbors[k].discard(id)
 
     def __str__(self):
         nodes = str.join("\n", [x.__str__() for x in self.nodes.values()])
@@ -5,13 +5,20 @@ from enum import Enum
 from pybbn.graph.edge import JtEdge
 from pybbn.graph.graph import Ug
 from pybbn.graph.node import BbnNode, Clique, SepSet
-from pybbn.graph.potential import Potential, PotentialEntry, PotentialUtil
+from pybbn.graph.potential import (
+    DensePotential,
+    Potential,
+    PotentialEntry,
+    PotentialUtil,
+    Projection,
+)
 from pybbn.graph.variable import Variable
 
 
 class JoinTree(Ug):
     """
-    Join tree.
+    Join tree. The potentials attribute may be stale while evidence is distributed lazily; read the
+    potentials through get_potentials or get_bbn_potential.
     """
 
     def __init__(self):
@@ -20,10 +27,21 @@ class JoinTree(Ug):
         """
         Ug.__init__(self)
         self.potentials = dict()
+        self.initial_potentials = None
         self.evidences = dict()
+        self.evidence_changes = dict()
         self.listener = None
         self.parent_info = defaultdict(set)
-        # self.__all_nodes__ = None
+        self.projections = dict()
+        self.schedule = None
+        self.scaled = False
+        self.sparse = True
+        self.is_clone = False
+        self.fresh = None
+        self.cpt_version = 0
+        self.__all_nodes__ = None
+        self.__all_names__ = None
+        self.__all_values__ = None
 
     def __deepcopy__(self, memodict={}):
         nodes = deepcopy(self.nodes, memodict)
@@ -32,6 +50,7 @@ class JoinTree(Ug):
         neighbors = deepcopy(self.neighbors, memodict)
         potentials = deepcopy(self.potentials, memodict)
         evidences = deepcopy(self.evidences, memodict)
+        evidence_changes = deepcopy(self.evidence_changes, memodict)
         parent_info = deepcopy(self.parent_info, memodict)
 
         jt = JoinTree()
@@ -40,33 +59,128 @@ class JoinTree(Ug):
         jt.edge_map = edge_map
         jt.neighbors = neighbors
         jt.potentials = potentials
+        jt.initial_potentials = (
+            None if self.initial_potentials is None else dict(self.initial_potentials)
+        )
         jt.evidences = evidences
+        jt.evidence_changes = evidence_changes
         jt.parent_info = parent_info
+        jt.projections = dict(self.projections)
+        jt.scaled = self.scaled
+        jt.sparse = self.sparse
+        jt.fresh = None if self.fresh is None else set(self.fresh)
+        jt.cpt_version = self.cpt_version
+        return jt
+
+    def clone(self):
+        """
+        Clones this join tree for independent inference. Unlike a deep copy, the structure (cliques,
+        separation-sets, BBN nodes, edges, neighbors, parent info, projections, schedule and initial
+        potentials) is shared with this join tree; only the potentials and evidence are copied. The
+        arrays of the potentials are copied lazily on the first write to either join tree.
+
+        Since the BBN nodes (and so the CPTs) are shared, the CPTs of a clone cannot be updated (see
+        update_bbn_cpts); the CPTs of this join tree must not be updated while the clone is in use either.
+        Use InferenceController.reapply, which deep copies, to change the parameters.
+
+        :return: Join tree.
+        """
+        jt = JoinTree()
+        jt.nodes = self.nodes
+        jt.edges = self.edges
+        jt.edge_map = self.edge_map
+        jt.neighbors = self.neighbors
+        jt.parent_info = self.parent_info
+        jt.projections = self.projections
+        jt.schedule = self.schedule
+        jt.initial_potentials = self.initial_potentials
+        jt.potentials = {k: p.share() for k, p in self.potentials.items()}
+        jt.evidences = {
+            node_id: {
+                value: Potential().add_entry(p.entries[0].duplicate())
+                for value, p in potentials.items()
+            }
+            for node_id, potentials in self.evidences.items()
+        }
+        jt.evidence_changes = dict(self.evidence_changes)
+        jt.listener = self.listener
+        jt.scaled = self.scaled
+        jt.sparse = self.sparse
+        jt.is_clone = True
+        jt.fresh = None if self.fresh is None else set(self.fresh)
+        jt.cpt_version = self.cpt_version
+        jt.__all_nodes__ = self.__all_nodes__
+        jt.__all_names__ = self.__all_names__
+        jt.__all_values__ = self.__all_values__
         return jt
 
-    def get_posteriors(self):
+    def get_posteriors(self, names=None):
         """
         Gets the posterior for all nodes.
 
+        :param names: Names of the nodes (optional). Defaults to all nodes. Only the marginals of these
+            nodes are computed.
         :return: Map. Keys are node names; values are map of node values to posterior probabilities.
         """
-        bbn_nodes = self.get_bbn_nodes()
+        bbn_nodes = self.__get_bbn_nodes_by_names__(names)
 
         posteriors = {}
 
         for bbn_node in bbn_nodes:
             potential = self.get_bbn_potential(bbn_node)
 
-            m = {}
-            for potential_entry in potential.entries:
-                k = "".join([f"{y}" for _, y in potential_entry.entries.items()])
-                m[k] = potential_entry.value
+            m = {
+                f"{value}": float(p)
+                for value, p in zip(bbn_node.variable.values, potential.values)
+            }
 
             name = bbn_node.variable.name
             posteriors[name] = m
 
         return posteriors
 
+    def get_posterior_arrays(self, names=None):
+        """
+        Gets the posterior for all nodes as arrays.
+
+        :param names: Names of the nodes (optional). Defaults to all nodes. Only the marginals of these
+            nodes are computed.
+        :return: Map. Keys are node names; values are arrays of posterior probabilities in the order of the
+            node values.
+        """
+        return {
+            node.variable.name: self.get_bbn_potential(node).values
+            for node in self.__get_bbn_nodes_by_names__(names)
+        }
+
+    def __get_bbn_nodes_by_names__(self, names):
+        """
+        Gets the BBN nodes with the specified names.
+
+        :param names: Names of the nodes; if None, all BBN nodes are returned.
+        :return: List of BBN nodes.
+        """
+        if names is None:
+            return self.get_bbn_nodes()
+
+        nodes = [self.get_bbn_node_by_name(name) for name in names]
+        for name, node in zip(names, nodes):
+            if node is None:
+                raise ValueError(f"no such variable: {name}")
+        return nodes
+
+    def get_potentials(self):
+        """
+        Gets the clique and separation-set potentials. Evidence that was collected lazily (see
+        InferenceController) is distributed to all cliques first; until then, the potentials attribute
+        holds stale potentials for the cliques that were not requested.
+
+        :return: Dictionary. Keys are clique and separation-set IDs and values are potentials.
+        """
+        if self.fresh is not None and self.listener is not None:
+            self.listener.potentials_requested(self, self.get_cliques())
+        return self.potentials
+
     def get_bbn_potential(self, node):
         """
         Gets the potential associated with the specified BBN node.
@@ -75,11 +189,27 @@ class JoinTree(Ug):
         :return: Potential.
         """
         clique = node.metadata["parent.clique"]
+        if self.fresh is not None and self.listener is not None:
+            self.listener.potentials_requested(self, [clique])
         potential = PotentialUtil.normalize(
             PotentialUtil.marginalize_for(self, clique, [node])
         )
         return potential
 
+    def get_projection(self, clique, nodes):
+        """
+        Gets the projection of the specified clique onto the specified nodes. Projections are computed
+        once and cached since the structure of the join tree does not change.
+
+        :param clique: Clique.
+        :param nodes: List of BBN nodes (e.g. the nodes of a separation-set).
+        :return: Projection.
+        """
+        key = (clique.id, tuple([node.id for node in nodes]))
+        if key not in self.projections:
+            self.projections[key] = Projection(clique.nodes, nodes)
+        return self.projections[key]
+
     def unmark_cliques(self):
         """
         Unmarks the cliques.
@@ -89,11 +219,17 @@ class JoinTree(Ug):
 
     def update_bbn_cpts(self, cpts):
         """
-        Updates the CPTs of the BBN nodes.
+        Updates the CPTs of the BBN nodes. The CPT version of this join tree is incremented.
 
         :param cpts: Dictionary of CPTs. Keys are ids of BBN node and values are new CPTs.
         :return: None
         """
+        if self.is_clone:
+            raise ValueError(
+                "the BBN nodes of a cloned join tree are shared with the join tree it was cloned from"
+            )
+
+        self.cpt_version += 1
         bbn_nodes = {
             node.id: node for clique in self.get_cliques() for node in clique.nodes
         }
@@ -123,17 +259,51 @@ class JoinTree(Ug):
 
     def __get_bbn_nodes__(self):
         """
-        Gets all BBN nodes (cached).
+        Gets all BBN nodes (cached). The cache, along with the maps of names to BBN nodes and of values to
+        value indices, is built on first use and reset whenever a node is added to or removed from this
+        join tree.
 
         :return: Dictionary of BBN nodes.
         """
-        # if self.__all_nodes__ is None:
-        #     self.__all_nodes__ = {node.id: node for clique in self.get_cliques() for node in clique.nodes}
-        # return self.__all_nodes__
-        result = {
-            node.id: node for clique in self.get_cliques() for node in clique.nodes
-        }
-        return result
+        if self.__all_nodes__ is None:
+            self.__all_nodes__ = {
+                node.id: node for clique in self.get_cliques() for node in clique.nodes
+            }
+            self.__all_names__ = {
+                node.variable.name: node for node in self.__all_nodes__.values()
+            }
+            self.__all_values__ = {
+                node.id: {value: i for i, value in enumerate(node.variable.values)}
+                for node in self.__all_nodes__.values()
+            }
+        return self.__all_nodes__
+
+    def __reset_bbn_nodes__(self):
+        """
+        Resets the cache of BBN nodes (see __get_bbn_nodes__).
+        """
+        self.__all_nodes__ = None
+        self.__all_names__ = None
+        self.__all_values__ = None
+
+    def add_node(self, node):
+        """
+        Adds a node.
+
+        :param node: Node.
+        :return: This join tree.
+        """
+        self.__reset_bbn_nodes__()
+        return Ug.add_node(self, node)
+
+    def remove_node(self, id):
+        """
+        Removes a node from the join tree.
+
+        :param id: Node id.
+        """
+        self.__reset_bbn_nodes__()
+        Ug.remove_node(self, id)
 
     def get_bbn_nodes(self):
         """
@@ -162,14 +332,19 @@ class JoinTree(Ug):
         :param name: Node name.
         :return: BBN node or None if no such node exists.
         """
-        bbn_nodes = {
-            node.variable.name: node
-            for clique in self.get_cliques()
-            for node in clique.nodes
-        }
-        if name in bbn_nodes:
-            return bbn_nodes[name]
-        return None
+        self.__get_bbn_nodes__()
+        return self.__all_names__.get(name)
+
+    def get_value_index(self, node, value):
+        """
+        Gets the index of the specified value of the specified BBN node.
+
+        :param node: BBN node.
+        :param value: Value.
+        :return: Index of the value or None if the node does not have such value.
+        """
+        self.__get_bbn_nodes__()
+        return self.__all_values__[node.id].get(value)
 
     def find_cliques_with_node_and_parents(self, id):
         """
@@ -216,11 +391,13 @@ class JoinTree(Ug):
         """
         return [sep_set for sep_set in self.get_nodes() if isinstance(sep_set, SepSet)]
 
-    def add_edge(self, edge):
+    def add_edge(self, edge, detect_path=True):
         """
         Adds an JtEdge.
 
         :param edge: JtEdge.
+        :param detect_path: Checks if a path already exists between the two cliques (the edge would then
+            create a cycle and is not added). Only turn this off when the caller guarantees there is none.
         :return: This join tree.
         """
         if not isinstance(edge, JtEdge):
@@ -230,7 +407,7 @@ class JoinTree(Ug):
         lhs = edge.i
         rhs = edge.j
 
-        if self.__shouldadd__(edge):
+        if not detect_path or self.__shouldadd__(edge):
             self.add_node(sep_set)
             self.add_node(lhs)
             self.add_node(rhs)
@@ -247,6 +424,10 @@ class JoinTree(Ug):
 
             self.edges[edge.key] = edge
 
+            self.get_projection(lhs, sep_set.nodes)
+            self.get_projection(rhs, sep_set.nodes)
+            self.schedule = None
+
         return self
 
     def get_flattened_edges(self):
@@ -294,6 +475,19 @@ class JoinTree(Ug):
         result = self.evidences[node.id][value]
         return result
 
+    def get_evidence_potential(self, node):
+        """
+        Gets the likelihoods of all the values of the specified BBN node as a single potential.
+
+        :param node: BBN node.
+        :return: Potential (the evidence over all values of the node).
+        """
+        likelihoods = [
+            self.get_evidence(node, value).entries[0].value
+            for value in node.variable.values
+        ]
+        return DensePotential([node], likelihoods)
+
     def get_change_type(self, evidences):
         """
         Gets the change type associated with the specified list of evidences.
@@ -301,29 +495,14 @@ class JoinTree(Ug):
         :param evidences: List of evidences.
         :return: ChangeType.
         """
-        changes = []
-        for evidence in evidences:
-            node = evidence.node
-            potentials = self.evidences[node.id]
-            change = evidence.compare(potentials)
-            changes.append(change)
+        changes = [
+            evidence.compare(self.evidences[evidence.node.id]) for evidence in evidences
+        ]
 
-        count = len(
-            [
-                change_type
-                for change_type in changes
-                if ChangeType.RETRACTION == change_type
-            ]
-        )
-        if count > 0:
+        if ChangeType.RETRACTION in changes:
             return ChangeType.RETRACTION
-
-        count = len(
-            [change_type for change_type in changes if ChangeType.UPDATE == change_type]
-        )
-        if count > 0:
+        if ChangeType.UPDATE in changes:
             return ChangeType.UPDATE
-
         return ChangeType.NONE
 
     def get_unobserved_evidence(self, node):
@@ -360,23 +539,86 @@ class JoinTree(Ug):
 
     def update_evidences(self, evidences):
         """
-        Updates this join tree with the list of specified evidence.
+        Updates this join tree with the list of specified evidence. The likelihoods of the nodes whose
+        evidence changed are recorded (as they were before the change) until the next propagation so that
+        only the cliques that got new evidence need to be updated.
 
         :param evidences: List of evidences.
         :return: This join tree.
         """
         for evidence in evidences:
             evidence.validate()
-        change = self.get_change_type(evidences)
-        for evidence in evidences:
-            node = evidence.node
+        self.__update_likelihoods__(
+            [
+                (
+                    evidence.node,
+                    [evidence.values[v] for v in evidence.node.variable.values],
+                )
+                for evidence in evidences
+            ]
+        )
+        return self
+
+    def observe(self, observations):
+        """
+        Observes the specified values. All observations are validated first and then applied in a single
+        pass, followed by a single propagation. Nodes not specified are left as they are.
+
+        :param observations: Dictionary. Keys are node names and values are the observed values; a value of
+            None unobserves the node.
+        :return: This join tree.
+        """
+        self.__get_bbn_nodes__()
+
+        changes = []
+        for name, value in observations.items():
+            node = self.__all_names__.get(name)
+            if node is None:
+                raise ValueError(f"no such variable: {name}")
+
+            likelihoods = [1.0] * len(node.variable.values)
+            if value is not None:
+                index = self.__all_values__[node.id].get(value)
+                if index is None:
+                    raise ValueError(f"invalid value for {name}: {value}")
+                likelihoods = [0.0] * len(node.variable.values)
+                likelihoods[index] = 1.0
+            changes.append((node, likelihoods))
+
+        self.__update_likelihoods__(changes)
+        return self
+
+    def __update_likelihoods__(self, changes):
+        """
+        Sets the likelihoods of the values of the specified BBN nodes and notifies the listener once of the
+        overall change (a retraction if any node had a value that was ruled out become possible again,
+        otherwise an update if any likelihood changed). The likelihoods of the nodes whose evidence changed
+        are recorded (as they were before the change) until the next propagation.
+
+        :param changes: List of tuples (BBN node, likelihoods); likelihoods are in the order of the values
+            of the node.
+        """
+        change = ChangeType.NONE
+        for node, likelihoods in changes:
             potentials = self.evidences[node.id]
+            entries = [potentials[value].entries[0] for value in node.variable.values]
+            old_likelihoods = [entry.value for entry in entries]
+
+            node_change = Evidence.__get_change_type__(old_likelihoods, likelihoods)
+            if ChangeType.NONE == node_change:
+                continue
+
+            if ChangeType.RETRACTION == node_change:
+                change = ChangeType.RETRACTION
+            elif ChangeType.NONE == change:
+                change = ChangeType.UPDATE
+
+            for entry, likelihood in zip(entries, likelihoods):
+                entry.value = likelihood
 
-            for k, v in evidence.values.items():
-                potential = potentials[k]
-                potential.entries[0].value = v
+            if node.id not in self.evidence_changes:
+                self.evidence_changes[node.id] = DensePotential([node], old_likelihoods)
         self.__notify_listener__(change)
-        return self
 
     def set_observation(self, evidence):
         """
@@ -576,26 +818,26 @@ class PathDetector(object):
 
     def __find__(self, i):
         """
-        Checks if a path exists from the specified node to the stop node.
+        Checks if a path exists from the specified node to the stop node. The search is iterative so that
+        long paths do not hit the recursion limit.
 
         :param i: Node id.
         :return: True if a path exists, otherwise, false.
         """
-        neighbors = set()
-
-        try:
-            neighbors = self.graph.get_neighbors(i)
-        except KeyError:
-            pass
+        stack = [i]
+        self.seen.add(i)
 
-        if self.stop in neighbors:
-            return True
+        while len(stack) > 0:
+            neighbors = self.graph.neighbors.get(stack.pop(), set())
 
-        self.seen.add(i)
-        for neighbor in neighbors:
-            if neighbor not in self.seen and self.__find__(neighbor):
+            if self.stop in neighbors:
                 return True
 
+            for neighbor in neighbors:
+                if neighbor not in self.seen:
+                    self.seen.add(neighbor)
+                    stack.append(neighbor)
+
         return False
 
 
@@ -620,6 +862,15 @@ class JoinTreeListener(object):
         """
         pass
 
+    def potentials_requested(self, join_tree, cliques):
+        """
+        Potentials of the specified cliques are about to be read.
+
+        :param join_tree: Join tree.
+        :param cliques: Cliques.
+        """
+        pass
+
 
 class EvidenceType(Enum):
     """
@@ -727,45 +978,38 @@ class Evidence(object):
 
     def compare(self, potentials):
         """
-        Compares this evidence with previous ones.
+        Compares this evidence with previous ones. The change is an update if the new likelihoods can be
+        absorbed by multiplying the previous ones by a ratio (e.g. going from unobserved to observed); it is
+        a retraction if a value that was ruled out (likelihood of 0.0) becomes possible again.
 
         :param potentials: Map of potentials.
         :return: The ChangeType from the comparison.
         """
-        that = self.__convert__(potentials)
-
-        that_unobserve = self.__is_unobserved__(that)
-        this_unobserve = self.__is_unobserved__(self.values)
-
-        if that_unobserve and this_unobserve:
-            return ChangeType.NONE
-
-        that_observe = self.__is_observed__(that)
-        this_observe = self.__is_observed__(self.values)
-
-        if that_observe and this_observe:
-            s1 = self.__get_observed_value__(that)
-            s2 = self.__get_observed_value__(self.values)
-
-            if s1 == s2:
-                return ChangeType.NONE
-            else:
-                return ChangeType.RETRACTION
-
-        return ChangeType.RETRACTION
+        values = list(potentials.keys())
+        return Evidence.__get_change_type__(
+            [potentials[value].entries[0].value for value in values],
+            [self.values.get(value, 0.0) for value in values],
+        )
 
     @staticmethod
-    def __convert__(potentials):
+    def __get_change_type__(old_likelihoods, new_likelihoods):
         """
-        Converts potentials to a map (dict).
+        Gets the change type from old to new likelihoods: a retraction if any likelihood of 0.0 becomes
+        nonzero, otherwise an update if any likelihood changes.
 
-        :param potentials: Potentials.
-        :return: Dict where keys are BBN node values and values are likelihoods.
+        :param old_likelihoods: Likelihoods before the change.
+        :param new_likelihoods: Likelihoods after the change (in the same order).
+        :return: ChangeType.
         """
-        m = dict()
-        for k, v in potentials.items():
-            m[k] = v.entries[0].value
-        return m
+        if list(old_likelihoods) == list(new_likelihoods):
+            return ChangeType.NONE
+
+        if any(
+            [0.0 == o and 0.0 != n for o, n in zip(old_likelihoods, new_likelihoods)]
+        ):
+            return ChangeType.RETRACTION
+
+        return ChangeType.UPDATE
 
     @staticmethod
     def __is_unobserved__(values):
@@ -1,5 +1,7 @@
 import itertools
 
+import numpy as np
+
 
 class Potential(object):
     """
@@ -136,13 +138,388 @@ class PotentialEntry(object):
         return self.__str__()
 
 
+class DensePotential(object):
+    """
+    Dense potential. The table is stored as a NumPy array with one axis per BBN node. The axes follow the
+    order of the nodes and the cells are laid out in the same order as the cartesian product of the node
+    values (e.g. the last node varies the fastest).
+
+    The cells are values * exp(log_scale). The log scale is 0.0 unless the potential was rescaled (see
+    PotentialUtil.rescale) to keep the values from underflowing.
+    """
+
+    def __init__(self, nodes, values=None, log_scale=0.0):
+        """
+        Ctor.
+
+        :param nodes: Array of BBN nodes; one axis per node.
+        :param values: Values of the cells (optional). Defaults to all 1.0.
+        :param log_scale: Log of the factor the values are scaled by (optional).
+        """
+        self.nodes = nodes
+        self.node_ids = [node.id for node in nodes]
+        self.shape = tuple([len(node.variable.values) for node in nodes])
+        self.log_scale = log_scale
+        if values is None:
+            self.values = np.ones(self.shape)
+        else:
+            self.values = np.asarray(values, dtype=np.float64).reshape(self.shape)
+
+    @property
+    def entries(self):
+        """
+        Gets a view of the cells of this potential as potential entries. Setting the value of an entry
+        updates the underlying array.
+
+        :return: Array of DensePotentialEntry.
+        """
+        return [DensePotentialEntry(self, i) for i in range(self.values.size)]
+
+    def get_matching_entries(self, entry):
+        """
+        Gets all potential entries matching the specified entry.
+
+        :param entry: PotentialEntry.
+        :return: Array of matching potential entries.
+        """
+        return [e for e in self.entries if e.matches(entry)]
+
+    def share(self):
+        """
+        Gets a copy of this potential that shares the array of values with this one. The array is made
+        read-only, so whichever potential is written to first copies it (copy-on-write).
+
+        :return: DensePotential.
+        """
+        self.values.flags.writeable = False
+
+        potential = DensePotential.__new__(DensePotential)
+        potential.nodes = self.nodes
+        potential.node_ids = self.node_ids
+        potential.shape = self.shape
+        potential.log_scale = self.log_scale
+        potential.values = self.values
+        return potential
+
+    def get_writeable_values(self):
+        """
+        Gets the array of values for writing. If the array is shared (read-only), it is copied first.
+
+        :return: Array of values.
+        """
+        if not self.values.flags.writeable:
+            self.values = self.values.copy()
+        return self.values
+
+    def __str__(self):
+        return str.join("\n", [entry.__str__() for entry in self.entries])
+
+    def __repr__(self):
+        return self.__str__()
+
+
+class DensePotentialEntry(PotentialEntry):
+    """
+    Dense potential entry. A view of a single cell of a DensePotential.
+    """
+
+    def __init__(self, potential, index):
+        """
+        Ctor.
+
+        :param potential: DensePotential.
+        :param index: Flat index of the cell.
+        """
+        self.potential = potential
+        self.index = index
+        cell = np.unravel_index(index, potential.shape)
+        self.entries = {
+            node.id: node.variable.values[i] for node, i in zip(potential.nodes, cell)
+        }
+
+    @property
+    def value(self):
+        """
+        Gets the value of the cell.
+
+        :return: Value.
+        """
+        return float(self.potential.values.flat[self.index])
+
+    @value.setter
+    def value(self, v):
+        """
+        Sets the value of the cell.
+
+        :param v: Value.
+        """
+        self.potential.get_writeable_values().flat[self.index] = v
+
+
+class SparsePotentialEntry(DensePotentialEntry):
+    """
+    Sparse potential entry. A read-only view of a single cell of a SparsePotential.
+    """
+
+    @property
+    def value(self):
+        """
+        Gets the value of the cell.
+
+        :return: Value.
+        """
+        return float(self.potential.values.flat[self.index])
+
+    @value.setter
+    def value(self, v):
+        """
+        Raises a ValueError; the cells of a sparse potential cannot be set.
+
+        :param v: Value.
+        """
+        raise ValueError("the entries of a sparse potential are read-only")
+
+
+class SparsePotential(object):
+    """
+    Sparse potential. Only the nonzero cells are stored: their flat indices into the table of the equivalent
+    DensePotential (in increasing order) and their values. Cells that are 0.0 stay 0.0 through propagation
+    (multiplying or dividing a 0.0 cell gives 0.0), so deterministic CPTs (logical gates, lookup tables)
+    make cliques whose tables are mostly zeros cheap to store and to propagate.
+
+    The cells are data * exp(log_scale), as for DensePotential.
+    """
+
+    MAX_DENSITY = 0.25
+
+    def __init__(self, nodes, index, data, log_scale=0.0, offsets=None):
+        """
+        Ctor.
+
+        :param nodes: Array of BBN nodes; one axis per node.
+        :param index: Flat indices of the nonzero cells, in increasing order.
+        :param data: Values of the nonzero cells.
+        :param log_scale: Log of the factor the values are scaled by (optional).
+        :param offsets: Cache of offsets (see get_offsets) shared by the potentials with the same index
+            (optional).
+        """
+        self.nodes = nodes
+        self.node_ids = [node.id for node in nodes]
+        self.shape = tuple([len(node.variable.values) for node in nodes])
+        self.log_scale = log_scale
+        self.index = np.asarray(index, dtype=np.int64)
+        self.data = np.asarray(data, dtype=np.float64)
+        self.offsets = dict() if offsets is None else offsets
+
+    @staticmethod
+    def from_dense(potential):
+        """
+        Gets the sparse representation of the specified dense potential.
+
+        :param potential: DensePotential.
+        :return: SparsePotential.
+        """
+        values = potential.values.ravel()
+        index = np.flatnonzero(values)
+        return SparsePotential(
+            potential.nodes, index, values[index], potential.log_scale
+        )
+
+    @property
+    def values(self):
+        """
+        Gets the cells as a (read-only) dense array; writing to it does not change this potential.
+
+        :return: Array of values.
+        """
+        values = np.zeros(int(np.prod(self.shape)))
+        values[self.index] = self.data
+        values = values.reshape(self.shape)
+        values.flags.writeable = False
+        return values
+
+    @property
+    def entries(self):
+        """
+        Gets a read-only view of the cells of this potential as potential entries. Setting the value of an
+        entry raises a ValueError; write to the dense representation (see to_dense) instead.
+
+        :return: Array of SparsePotentialEntry.
+        """
+        potential = DensePotential(self.nodes, self.values)
+        return [
+            SparsePotentialEntry(potential, i) for i in range(potential.values.size)
+        ]
+
+    @property
+    def nbytes(self):
+        """
+        Gets the number of bytes of the stored arrays (including the cached offsets).
+
+        :return: Number of bytes.
+        """
+        offsets = sum([o.nbytes for o in self.offsets.values()])
+        return self.index.nbytes + self.data.nbytes + offsets
+
+    def to_dense(self):
+        """
+        Gets the dense representation of this potential.
+
+        :return: DensePotential.
+        """
+        return DensePotential(self.nodes, self.values.copy(), self.log_scale)
+
+    def get_offsets(self, node_ids):
+        """
+        Gets the flat indices of the nonzero cells in the table of a potential over a subset of the nodes.
+        They are cached since the same subsets (separation-sets and evidence nodes) come up on every
+        propagation.
+
+        :param node_ids: IDs of the nodes of the subset (in the order of its axes).
+        :return: Array of flat indices, one per nonzero cell.
+        """
+        key = tuple(node_ids)
+        if key in self.offsets:
+            return self.offsets[key]
+
+        strides = np.cumprod((self.shape + (1,))[::-1])[::-1][1:]
+        offsets = np.zeros(self.index.shape, dtype=np.int64)
+        sub_stride = 1
+        for node_id in reversed(node_ids):
+            axis = self.node_ids.index(node_id)
+            offsets += (self.index // strides[axis]) % self.shape[axis] * sub_stride
+            sub_stride *= self.shape[axis]
+
+        if sub_stride < np.iinfo(np.int32).max:
+            offsets = offsets.astype(np.int32)
+        offsets.flags.writeable = False
+        self.offsets[key] = offsets
+        return offsets
+
+    def compact(self):
+        """
+        Drops the cells that became 0.0 (e.g. after evidence was multiplied in).
+
+        :return: This potential.
+        """
+        nonzero = self.data != 0.0
+        self.index = self.index[nonzero]
+        self.data = self.data[nonzero]
+        self.offsets = {k: o[nonzero] for k, o in self.offsets.items()}
+        return self
+
+    def share(self):
+        """
+        Gets a copy of this potential that shares the arrays with this one. The array of values is made
+        read-only, so whichever potential is written to first copies it (copy-on-write).
+
+        :return: SparsePotential.
+        """
+        self.data.flags.writeable = False
+        return SparsePotential(
+            self.nodes, self.index, self.data, self.log_scale, self.offsets
+        )
+
+    def get_writeable_data(self):
+        """
+        Gets the array of values of the nonzero cells for writing. If the array is shared (read-only), it is
+        copied first.
+
+        :return: Array of values.
+        """
+        if not self.data.flags.writeable:
+            self.data = self.data.copy()
+        return self.data
+
+    def __str__(self):
+        return str.join("\n", [entry.__str__() for entry in self.entries])
+
+    def __repr__(self):
+        return self.__str__()
+
+
+class Projection(object):
+    """
+    Projection of the cells of a clique potential onto a subset of its nodes (e.g. a separation-set or a
+    single BBN node). The axes to sum out and the permutations between the two axis orders are computed
+    once so that marginalization is a single vectorized sum and multiplication a single broadcast.
+    """
+
+    def __init__(self, nodes, sub_nodes):
+        """
+        Ctor.
+
+        :param nodes: Array of BBN nodes (axes of the clique potential).
+        :param sub_nodes: Array of BBN nodes (axes of the projected potential); a subset of nodes.
+        """
+        node_ids = [node.id for node in nodes]
+        sub_node_ids = [node.id for node in sub_nodes]
+        kept = [node_id for node_id in node_ids if node_id in sub_node_ids]
+
+        self.node_ids = node_ids
+        self.sub_node_ids = sub_node_ids
+        self.sum_axes = tuple(
+            [i for i, node_id in enumerate(node_ids) if node_id not in sub_node_ids]
+        )
+        self.marginal_perm = [kept.index(node_id) for node_id in sub_node_ids]
+        self.expand_perm = [sub_node_ids.index(node_id) for node_id in kept]
+        self.expand_shape = tuple(
+            [
+                len(node.variable.values) if node.id in sub_node_ids else 1
+                for node in nodes
+            ]
+        )
+
+    def marginalize(self, values):
+        """
+        Sums out the nodes not in the subset.
+
+        :param values: Array of values of the clique potential; may have leading (e.g. batch) axes.
+        :return: Array of values with axes in the order of the subset.
+        """
+        offset = values.ndim - len(self.node_ids)
+        if 0 == offset:
+            return np.transpose(values.sum(axis=self.sum_axes), self.marginal_perm)
+
+        axes = tuple([offset + i for i in self.sum_axes])
+        perm = list(range(offset)) + [offset + i for i in self.marginal_perm]
+        return np.transpose(values.sum(axis=axes), perm)
+
+    def maximize(self, values):
+        """
+        Maxes out the nodes not in the subset (max-marginalization).
+
+        :param values: Array of values of the clique potential.
+        :return: Array of values with axes in the order of the subset.
+        """
+        return np.transpose(values.max(axis=self.sum_axes), self.marginal_perm)
+
+    def expand(self, values):
+        """
+        Permutes and reshapes the values of a potential over the subset so they broadcast against the
+        clique potential.
+
+        :param values: Array of values with axes in the order of the subset; may have leading (e.g. batch)
+            axes.
+        :return: Array of values.
+        """
+        offset = values.ndim - len(self.sub_node_ids)
+        if 0 == offset:
+            return np.transpose(values, self.expand_perm).reshape(self.expand_shape)
+
+        perm = list(range(offset)) + [offset + i for i in self.expand_perm]
+        shape = values.shape[:offset] + self.expand_shape
+        return np.transpose(values, perm).reshape(shape)
+
+
 class PotentialUtil(object):
     """
-    Potential util.
+    Potential util. The operations are on DensePotential and, where the cells that are 0.0 allow it (e.g.
+    multiply, divide, marginalize, normalize, rescale and get_sparse_product), on SparsePotential as well.
     """
 
     @staticmethod
-    def pass_single_message(join_tree, x, s, y):
+    def pass_single_message(join_tree, x, s, y, skip_proportional=False):
         """
         Single message pass from x -- s -- y (from x to s to y).
 
@@ -150,14 +527,27 @@ class PotentialUtil(object):
         :param x: Clique.
         :param s: Separation-set.
         :param y: Clique.
+        :param skip_proportional: If True, the message is not passed when the new separation-set potential
+            is proportional to the old one; y is then consistent with x up to a constant factor, which does
+            not change any (normalized) posterior.
+        :return: A boolean indicating if the message was passed.
         """
         old_sep_set_potential = join_tree.potentials[s.id]
         new_sep_set_potential = PotentialUtil.marginalize_for(join_tree, x, s.nodes)
+
+        if skip_proportional and PotentialUtil.is_proportional(
+            new_sep_set_potential, old_sep_set_potential
+        ):
+            return False
+
         join_tree.potentials[s.id] = new_sep_set_potential
         y_potential = join_tree.potentials[y.id]
 
         ratio = PotentialUtil.divide(new_sep_set_potential, old_sep_set_potential)
-        PotentialUtil.multiply(y_potential, ratio)
+        PotentialUtil.multiply(y_potential, ratio, join_tree.get_projection(y, s.nodes))
+        if join_tree.scaled:
+            PotentialUtil.rescale(y_potential)
+        return True
 
     @staticmethod
     def marginalize_for(join_tree, clique, nodes):
@@ -169,56 +559,129 @@ class PotentialUtil(object):
         :param nodes: List of BBN nodes.
         :return: Potential.
         """
-        potential = PotentialUtil.get_potential_from_nodes(nodes)
         clique_potential = join_tree.potentials.get(clique.id)
+        projection = join_tree.get_projection(clique, nodes)
+        return PotentialUtil.marginalize(clique_potential, nodes, projection)
+
+    @staticmethod
+    def marginalize(potential, nodes, projection=None):
+        """
+        Marginalizes the specified potential over the specified nodes (sums out all other nodes).
 
-        for entry in potential.entries:
-            matched_entries = clique_potential.get_matching_entries(entry)
-            entry.value = sum(
-                [matched_entry.value for matched_entry in matched_entries]
+        :param potential: Potential.
+        :param nodes: List of BBN nodes; must be a subset of the nodes of the potential.
+        :param projection: Projection of the potential onto the nodes (optional).
+        :return: Potential (dense).
+        """
+        if isinstance(potential, SparsePotential):
+            offsets = potential.get_offsets([node.id for node in nodes])
+            shape = tuple([len(node.variable.values) for node in nodes])
+            values = np.bincount(
+                offsets, weights=potential.data, minlength=int(np.prod(shape))
             )
+            return DensePotential(nodes, values, potential.log_scale)
 
-        return potential
+        if projection is None:
+            projection = Projection(potential.nodes, nodes)
+        values = projection.marginalize(potential.values)
+        return DensePotential(nodes, values, potential.log_scale)
 
     @staticmethod
     def normalize(potential):
         """
-        Normalizes the potential (make sure they sum to 1.0).
+        Normalizes the potential (make sure they sum to 1.0). The log scale is reset to 0.0.
 
         :param potential: Potential.
         :return: Potential.
         """
-        total = sum([entry.value for entry in potential.entries])
+        if isinstance(potential, SparsePotential):
+            total = potential.data.sum()
+            if total != 0.0:
+                potential.get_writeable_data()[...] /= total
+                potential.log_scale = 0.0
+            return potential
+
+        total = potential.values.sum()
 
         if total != 0.0:
-            for entry in potential.entries:
-                d = entry.value / total
-                entry.value = d
+            potential.get_writeable_values()[...] /= total
+            potential.log_scale = 0.0
 
         return potential
 
     @staticmethod
-    def divide(numerator, denominator):
+    def rescale(potential):
         """
-        Divides two potentials.
+        Rescales the potential so that its largest value is 1.0; the factor is moved into the log scale.
+        This keeps products of many small numbers (e.g. long chains or many soft evidences) from
+        underflowing to 0.0. A potential that is all 0.0 is left as is.
 
-        :param numerator: Potential.
-        :param denominator: Potential.
+        :param potential: Potential.
         :return: Potential.
         """
-        potential = Potential()
-        for i, entry in enumerate(numerator.entries):
-            e = denominator.entries[i]
-            d = (
-                0.0
-                if PotentialUtil.is_zero(entry.value) or PotentialUtil.is_zero(e.value)
-                else (entry.value / e.value)
-            )
-            new_entry = entry.duplicate()
-            new_entry.value = d
-            potential.add_entry(new_entry)
+        if isinstance(potential, SparsePotential):
+            m = potential.data.max(initial=0.0)
+            if m != 0.0 and m != 1.0:
+                potential.get_writeable_data()[...] /= m
+                potential.log_scale += float(np.log(m))
+            return potential
+
+        m = potential.values.max()
+
+        if m != 0.0 and m != 1.0:
+            potential.get_writeable_values()[...] /= m
+            potential.log_scale += float(np.log(m))
+
         return potential
 
+    @staticmethod
+    def divide(numerator, denominator):
+        """
+        Divides two potentials. Cells where either the numerator or denominator is 0.0 are set to 0.0.
+
+        :param numerator: Potential.
+        :param denominator: Potential; its nodes must be a subset of the nodes of the numerator.
+        :return: Potential (sparse if the numerator is sparse).
+        """
+        if isinstance(numerator, SparsePotential):
+            n = numerator.data
+            d = denominator.values.ravel()[numerator.get_offsets(denominator.node_ids)]
+            data = np.zeros(n.shape)
+            np.divide(n, d, out=data, where=(n != 0.0) & (d != 0.0))
+            log_scale = numerator.log_scale - denominator.log_scale
+            return SparsePotential(
+                numerator.nodes, numerator.index, data, log_scale, numerator.offsets
+            ).compact()
+
+        n = numerator.values
+        d = PotentialUtil.get_aligned_values(denominator, numerator.node_ids)
+        values = np.zeros(numerator.shape)
+        np.divide(n, d, out=values, where=(n != 0.0) & (d != 0.0))
+        log_scale = numerator.log_scale - denominator.log_scale
+        return DensePotential(numerator.nodes, values, log_scale)
+
+    @staticmethod
+    def is_proportional(lhs, rhs, rtol=1e-9):
+        """
+        Checks if two potentials over the same nodes are proportional (equal up to a constant factor).
+
+        :param lhs: Potential.
+        :param rhs: Potential.
+        :param rtol: Relative tolerance.
+        :return: A boolean indicating if the potentials are proportional.
+        """
+        a = lhs.values
+        b = PotentialUtil.get_aligned_values(rhs, lhs.node_ids)
+        nonzero = a != 0.0
+
+        if not np.array_equal(nonzero, b != 0.0):
+            return False
+        if not nonzero.any():
+            return True
+
+        ratios = a[nonzero] / b[nonzero]
+        return bool(np.allclose(ratios, ratios[0], rtol=rtol, atol=0.0))
+
     @staticmethod
     def is_zero(d):
         """
@@ -230,17 +693,134 @@ class PotentialUtil(object):
         return 0.0 == d
 
     @staticmethod
-    def multiply(bigger, smaller):
+    def multiply(bigger, smaller, projection=None):
         """
-        Multiplies two potentials. Order matters.
+        Multiplies two potentials. Order matters. The bigger potential is updated in place.
 
         :param bigger: Bigger potential.
-        :param smaller: Smaller potential.
+        :param smaller: Smaller potential; its nodes must be a subset of the nodes of the bigger one.
+        :param projection: Projection of the bigger potential onto the smaller one (optional).
+        """
+        if isinstance(bigger, SparsePotential):
+            values = smaller.values.ravel()[bigger.get_offsets(smaller.node_ids)]
+            bigger.get_writeable_data()[...] *= values
+            bigger.log_scale += smaller.log_scale
+            # cells zeroed (e.g. by evidence) stay zero until the potential is reinitialized
+            if np.count_nonzero(bigger.data) <= bigger.data.size // 2:
+                bigger.compact()
+            return
+
+        if projection is None:
+            values = PotentialUtil.get_aligned_values(smaller, bigger.node_ids)
+        else:
+            values = projection.expand(smaller.values)
+        bigger.get_writeable_values()[...] *= values
+        bigger.log_scale += smaller.log_scale
+
+    @staticmethod
+    def get_sparse_product(nodes, potentials, max_cells=None):
+        """
+        Multiplies the specified potentials onto a sparse potential over the specified nodes. Only the cells
+        where every potential is nonzero are visited: the nonzero cells of the potentials are joined one
+        potential at a time (next, the one sharing the most nodes with those joined so far, then the one
+        with the fewest nonzero cells) on the nodes they share, so the dense table is never allocated.
+
+        :param nodes: Array of BBN nodes; a superset of the nodes of the potentials.
+        :param potentials: List of potentials.
+        :param max_cells: Maximum number of nonzero cells (optional). If the product (or a partial product)
+            has more, None is returned.
+        :return: SparsePotential or None.
+        """
+        ids = []
+        columns = []
+        data = np.ones(1)
+        remaining = [(p, np.count_nonzero(p.values)) for p in potentials]
+
+        while len(remaining) > 0:
+            potential, _ = min(
+                remaining,
+                key=lambda t: (-len([i for i in t[0].node_ids if i in ids]), t[1]),
+            )
+            remaining = [t for t in remaining if t[0] is not potential]
+            coordinates = np.nonzero(potential.values)
+            values = potential.values[coordinates]
+
+            shared = [
+                i for i, node_id in enumerate(potential.node_ids) if node_id in ids
+            ]
+            shape = [potential.shape[i] for i in shared]
+            lhs = np.zeros(data.size, dtype=np.int64)
+            rhs = np.zeros(values.size, dtype=np.int64)
+            if len(shared) > 0:
+                lhs = np.ravel_multi_index(
+                    [columns[ids.index(potential.node_ids[i])] for i in shared], shape
+                )
+                rhs = np.ravel_multi_index([coordinates[i] for i in shared], shape)
+
+            order = np.argsort(rhs, kind="stable")
+            lo = np.searchsorted(rhs[order], lhs, side="left")
+            counts = np.searchsorted(rhs[order], lhs, side="right") - lo
+            rows = np.repeat(np.arange(lhs.size), counts)
+            matches = order[
+                np.arange(rows.size)
+                - np.repeat(np.cumsum(counts) - counts, counts)
+                + np.repeat(lo, counts)
+            ]
+
+            columns = [column[rows] for column in columns]
+            data = data[rows] * values[matches]
+            for i, node_id in enumerate(potential.node_ids):
+                if node_id not in ids:
+                    ids.append(node_id)
+                    columns.append(coordinates[i][matches])
+
+            if max_cells is not None and data.size > max_cells:
+                return None
+
+        missing = [len(node.variable.values) for node in nodes if node.id not in ids]
+        if max_cells is not None and data.size * int(np.prod(missing)) > max_cells:
+            return None
+
+        for node in nodes:
+            if node.id not in ids:
+                n = len(node.variable.values)
+                columns = [np.repeat(column, n) for column in columns]
+                columns.append(np.tile(np.arange(n), data.size))
+                data = np.repeat(data, n)
+                ids.append(node.id)
+
+        shape = tuple([len(node.variable.values) for node in nodes])
+        index = np.ravel_multi_index(
+            [columns[ids.index(node.id)] for node in nodes], shape
+        )
+        order = np.argsort(index)
+        return SparsePotential(nodes, index[order], data[order]).compact()
+
+    @staticmethod
+    def get_aligned_values(potential, node_ids):
         """
-        for entry in smaller.entries:
-            for e in bigger.get_matching_entries(entry):
-                d = e.value * entry.value
-                e.value = d
+        Gets the values of the specified potential with its axes permuted to the order of the specified
+        node IDs. Node IDs not in the potential get an axis of length 1 so that the values broadcast.
+
+        :param potential: Potential.
+        :param node_ids: List of node IDs (a superset of the node IDs of the potential).
+        :return: Array of values.
+        """
+        if potential.node_ids == node_ids:
+            return potential.values
+
+        perm = [
+            potential.node_ids.index(i) for i in node_ids if i in potential.node_ids
+        ]
+        shape = [
+            (
+                potential.shape[potential.node_ids.index(i)]
+                if i in potential.node_ids
+                else 1
+            )
+            for i in node_ids
+        ]
+        return np.transpose(potential.values, perm).reshape(shape)
 
     @staticmethod
     def get_potential(node, parents):
@@ -251,31 +831,17 @@ class PotentialUtil(object):
         :param parents: Parents of the BBN node (that themselves are also BBN nodes).
         :return: Potential.
         """
-        potential = PotentialUtil.get_potential_from_nodes(
-            PotentialUtil.merge(node, parents)
-        )
-        for i in range(len(potential.entries)):
-            prob = node.probs[i]
-            potential.entries[i].value = prob
-        return potential
+        return DensePotential(PotentialUtil.merge(node, parents), node.probs)
 
     @staticmethod
     def get_potential_from_nodes(nodes):
         """
-        Gets a potential from a list of BBN nodes.
+        Gets a potential from a list of BBN nodes. All cells are initialized to 1.0.
 
         :param nodes: Array of BBN nodes.
         :return: Potential.
         """
-        lists = [node.variable.values for node in nodes]
-        cartesian = PotentialUtil.get_cartesian_product(lists)
-        potential = Potential()
-        for values in cartesian:
-            entry = PotentialEntry()
-            for i in range(len(nodes)):
-                entry.add(nodes[i].id, values[i])
-            potential.add_entry(entry)
-        return potential
+        return DensePotential(nodes)
 
     @staticmethod
     def get_cartesian_product(lists):
@@ -0,0 +1,181 @@
+import json
+import os
+
+import numpy as np
+
+from pybbn.graph.edge import JtEdge
+from pybbn.graph.jointree import JoinTree
+from pybbn.graph.node import BbnNode, Clique, SepSet
+from pybbn.graph.potential import DensePotential, PotentialUtil
+from pybbn.graph.variable import Variable
+from pybbn.pptc.inferencecontroller import InferenceController
+from pybbn.pptc.initializer import Initializer
+from pybbn.pptc.propagator import Propagator, Schedule
+
+
+class CompiledModel(object):
+    """
+    Compiled model. A join tree saved to a directory holding a JSON manifest (BBN nodes, cliques,
+    separation-sets, parent cliques and message passing schedule) and two NumPy arrays: the initial clique
+    potentials and the propagated (no evidence) clique and separation-set potentials. Loading does not
+    moralize, triangulate, initialize or propagate; the arrays may be memory-mapped and are only copied
+    (per potential) when evidence is entered. Projections are recomputed on load since that is faster than
+    parsing them. Sparse potentials are saved (and loaded) dense.
+    """
+
+    MANIFEST = "manifest.json"
+    INITIAL_POTENTIALS = "initial.npy"
+    POTENTIALS = "potentials.npy"
+
+    @staticmethod
+    def save(join_tree, path):
+        """
+        Saves the specified join tree to the specified directory. Evidence set on the join tree is not saved.
+
+        :param join_tree: Join tree (initialized, e.g. returned by InferenceController.apply).
+        :param path: Path to the directory; created if it does not exist.
+        :return: None.
+        """
+        if join_tree.initial_potentials is None:
+            raise ValueError("join tree is not initialized")
+
+        jt = join_tree.clone()
+        jt.listener = None
+        jt.evidences = dict()
+        Initializer.reinitialize(jt)
+        Propagator.propagate(jt)
+
+        jt_potentials = jt.get_potentials()
+        cliques = sorted(jt.get_cliques(), key=lambda c: c.id)
+        sep_sets = sorted(jt.get_sep_sets(), key=lambda s: s.id)
+        c_index = {clique.id: i for i, clique in enumerate(cliques)}
+        s_index = {sep_set.id: i for i, sep_set in enumerate(sep_sets)}
+        bbn_nodes = sorted(jt.get_bbn_nodes(), key=lambda n: n.id)
+
+        def get_messages(messages):
+            return [
+                [c_index[x.id], s_index[s.id], c_index[y.id]] for x, s, y in messages
+            ]
+
+        schedule = Propagator.get_schedule(jt)
+        manifest = {
+            "version": 1,
+            "scaled": jt.scaled,
+            "sparse": jt.sparse,
+            "bbn_nodes": [n.to_dict() for n in bbn_nodes],
+            "parent_info": {
+                str(n.id): list(jt.parent_info[n.id])
+                for n in bbn_nodes
+                if n.id in jt.parent_info
+            },
+            "parent_cliques": {
+                str(n.id): c_index[n.metadata["parent.clique"].id] for n in bbn_nodes
+            },
+            "cliques": [[n.id for n in clique.nodes] for clique in cliques],
+            "sep_sets": [[c_index[s.left.id], c_index[s.right.id]] for s in sep_sets],
+            "schedule": {
+                "collect": get_messages(schedule.collect),
+                "distribute": get_messages(schedule.distribute),
+            },
+            "log_scales": [jt_potentials[n.id].log_scale for n in cliques + sep_sets],
+        }
+
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, CompiledModel.MANIFEST), "w") as f:
+            json.dump(manifest, f)
+
+        initial_potentials = [
+            Initializer.get_initial_potential(jt, c).values.ravel() for c in cliques
+        ]
+        potentials = [jt_potentials[n.id].values.ravel() for n in cliques + sep_sets]
+        np.save(
+            os.path.join(path, CompiledModel.INITIAL_POTENTIALS),
+            np.concatenate(initial_potentials),
+        )
+        np.save(
+            os.path.join(path, CompiledModel.POTENTIALS), np.concatenate(potentials)
+        )
+
+    @staticmethod
+    def load(path, mmap=True):
+        """
+        Loads an inference-ready join tree from the specified directory.
+
+        :param path: Path to the directory (see save).
+        :param mmap: If True, the arrays of potentials are memory-mapped (read-only) instead of read.
+        :return: Join tree.
+        """
+        with open(os.path.join(path, CompiledModel.MANIFEST), "r") as f:
+            manifest = json.load(f)
+
+        mmap_mode = "r" if mmap else None
+        initial_values = np.load(
+            os.path.join(path, CompiledModel.INITIAL_POTENTIALS), mmap_mode=mmap_mode
+        )
+        values = np.load(
+            os.path.join(path, CompiledModel.POTENTIALS), mmap_mode=mmap_mode
+        )
+        if not mmap:
+            initial_values.flags.writeable = False
+            values.flags.writeable = False
+
+        def get_bbn_node(d):
+            v = d["variable"]
+            return BbnNode(Variable(v["id"], v["name"], v["values"]), d["probs"])
+
+        bbn_nodes = {n.id: n for n in [get_bbn_node(d) for d in manifest["bbn_nodes"]]}
+        cliques = [Clique([bbn_nodes[i] for i in ids]) for ids in manifest["cliques"]]
+        sep_sets = []
+        for lhs, rhs in manifest["sep_sets"]:
+            _, lhs_ids, rhs_ids, intersection = cliques[lhs].intersects(cliques[rhs])
+            sep_sets.append(
+                SepSet(cliques[lhs], cliques[rhs], lhs_ids, rhs_ids, intersection)
+            )
+
+        jt = JoinTree()
+        jt.scaled = manifest.get("scaled", False)
+        jt.sparse = manifest.get("sparse", False)
+        for clique in cliques:
+            jt.add_node(clique)
+        for sep_set in sep_sets:
+            jt.add_edge(JtEdge(sep_set), detect_path=False)
+
+        jt.parent_info = {int(k): v for k, v in manifest["parent_info"].items()}
+        for node_id, node in bbn_nodes.items():
+            parents = [bbn_nodes[pa_id] for pa_id in jt.parent_info.get(node_id, [])]
+            node.potential = PotentialUtil.get_potential(node, parents)
+            node.add_metadata("parents", parents)
+            clique = cliques[manifest["parent_cliques"][str(node_id)]]
+            node.add_metadata("parent.clique", clique)
+            jt.get_projection(clique, [node])
+            for value in node.variable.values:
+                jt.get_evidence(node, value)
+
+        def get_values(arr, offset, nodes):
+            size = 1
+            for n in nodes:
+                size *= len(n.variable.values)
+            return np.asarray(arr[offset : offset + size]), offset + size
+
+        offset = 0
+        jt.initial_potentials = dict()
+        for clique in cliques:
+            v, offset = get_values(initial_values, offset, clique.nodes)
+            jt.initial_potentials[clique.id] = DensePotential(clique.nodes, v).values
+
+        offset = 0
+        log_scales = manifest.get("log_scales", [0.0] * (len(cliques) + len(sep_sets)))
+        for node, log_scale in zip(cliques + sep_sets, log_scales):
+            v, offset = get_values(values, offset, node.nodes)
+            jt.add_potential(node, DensePotential(node.nodes, v, log_scale))
+
+        def get_messages(messages):
+            return [(cliques[x], sep_sets[s], cliques[y]) for x, s, y in messages]
+
+        jt.schedule = Schedule(
+            get_messages(manifest["schedule"]["collect"]),
+            get_messages(manifest["schedule"]["distribute"]),
+        )
+
+        jt.set_listener(InferenceController())
+        return jt
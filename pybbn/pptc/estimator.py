@@ -0,0 +1,152 @@
+import numpy as np
+
+from pybbn.graph.potential import SparsePotential
+from pybbn.pptc.moralizer import Moralizer
+from pybbn.pptc.transformer import Transformer
+from pybbn.pptc.triangulator import Heuristic, Triangulator
+
+
+class Estimate(object):
+    """
+    Estimate of the size of a join tree.
+    """
+
+    def __init__(
+        self,
+        n_cliques,
+        treewidth,
+        max_clique_cells,
+        clique_cells,
+        sep_set_cells,
+        itemsize=8,
+    ):
+        """
+        Ctor.
+
+        :param n_cliques: Number of cliques.
+        :param treewidth: Treewidth (number of BBN nodes in the largest clique, minus one).
+        :param max_clique_cells: State-space size (number of potential cells) of the largest clique.
+        :param clique_cells: Total number of potential cells of the cliques.
+        :param sep_set_cells: Total number of potential cells of the separation-sets.
+        :param itemsize: Number of bytes per potential cell.
+        """
+        self.n_cliques = n_cliques
+        self.treewidth = treewidth
+        self.max_clique_cells = max_clique_cells
+        self.clique_cells = clique_cells
+        self.sep_set_cells = sep_set_cells
+        self.total_cells = clique_cells + sep_set_cells
+        self.itemsize = itemsize
+
+    @property
+    def bytes(self):
+        """
+        Gets the estimated number of bytes of the potentials: the clique and separation-set potentials, the
+        snapshot of the initial clique potentials and one clique-sized temporary.
+
+        :return: Number of bytes.
+        """
+        return self.itemsize * (
+            2 * self.clique_cells + self.sep_set_cells + self.max_clique_cells
+        )
+
+    def to_dict(self):
+        """
+        Gets a JSON serializable dictionary representation.
+
+        :return: Dictionary.
+        """
+        return {
+            "n_cliques": self.n_cliques,
+            "treewidth": self.treewidth,
+            "max_clique_cells": self.max_clique_cells,
+            "total_cells": self.total_cells,
+            "bytes": self.bytes,
+        }
+
+    def __str__(self):
+        return (
+            f"cliques={self.n_cliques}|treewidth={self.treewidth}|max_clique_cells={self.max_clique_cells}"
+            f"|total_cells={self.total_cells}|bytes={self.bytes}"
+        )
+
+
+class Estimator(object):
+    """
+    Estimates the size of the join tree of a BBN before any potential is allocated.
+    """
+
+    @staticmethod
+    def estimate(bbn, heuristic=Heuristic.DEFAULT):
+        """
+        Estimates the size of the join tree of the specified BBN. The BBN is moralized, triangulated and
+        transformed (only the clique and separation-set memberships are computed).
+
+        :param bbn: BBN graph.
+        :param heuristic: Triangulation heuristic.
+        :return: Estimate.
+        """
+        ug = Moralizer.moralize(bbn)
+        cliques = Triangulator.triangulate(ug, heuristic)
+        join_tree = Transformer.transform(cliques)
+        return Estimator.get_estimate(join_tree)
+
+    @staticmethod
+    def get_compression(join_tree):
+        """
+        Gets the compression report of the potentials (and the snapshot of the initial clique potentials) of
+        the specified initialized join tree: how many bytes they take against how many they would take if
+        they were all dense (see SparsePotential). Arrays shared between potentials are counted once.
+
+        :param join_tree: Join tree (initialized).
+        :return: Dictionary of the number of sparse cliques, the number of bytes if all were dense, the
+            number of bytes and their ratio.
+        """
+        potentials = join_tree.get_potentials()
+        dense_bytes = 0
+        stored_bytes = 0
+        shared = set()
+        for p in list(potentials.values()) + list(
+            join_tree.initial_potentials.values()
+        ):
+            if isinstance(p, SparsePotential):
+                dense_bytes += 8 * int(np.prod(p.shape))
+                for arr in [p.index, p.data] + list(p.offsets.values()):
+                    if id(arr) not in shared:
+                        shared.add(id(arr))
+                        stored_bytes += arr.nbytes
+            else:
+                nbytes = p.nbytes if isinstance(p, np.ndarray) else p.values.nbytes
+                dense_bytes += nbytes
+                stored_bytes += nbytes
+
+        sparse_cliques = [
+            clique
+            for clique in join_tree.get_cliques()
+            if isinstance(potentials[clique.id], SparsePotential)
+        ]
+        return {
+            "sparse_cliques": len(sparse_cliques),
+            "dense_bytes": dense_bytes,
+            "bytes": stored_bytes,
+            "ratio": stored_bytes / dense_bytes if dense_bytes > 0 else 1.0,
+        }
+
+    @staticmethod
+    def get_estimate(join_tree):
+        """
+        Estimates the size of the specified join tree (its potentials need not be initialized).
+
+        :param join_tree: Join tree.
+        :return: Estimate.
+        """
+        cliques = join_tree.get_cliques()
+        clique_cells = [clique.get_weight() for clique in cliques]
+        sep_set_cells = [sep_set.get_weight() for sep_set in join_tree.get_sep_sets()]
+        return Estimate(
+            len(cliques),
+            max([len(clique.nodes) for clique in cliques], default=0) - 1,
+            max(clique_cells, default=0),
+            sum(clique_cells),
+            sum(sep_set_cells),
+        )
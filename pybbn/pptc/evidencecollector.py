@@ -34,42 +34,33 @@ class EvidenceCollector(object):
 
         return sepsets, cliques
 
-    def start(self):
-        """
-        Starts the evidence collection.
+    def get_messages(self):
         """
-        self.start_clique.mark()
-
-        sepsets, cliques = self.__get_neighboring_cliques__(
-            self.join_tree, self.start_clique
-        )
+        Gets the messages to pass in order. The tree is walked iteratively (no recursion) away from the
+        start clique and the messages are ordered such that a clique sends its message only after all
+        the cliques further away have sent theirs.
 
-        for clique in cliques:
-            clique[1].mark()
-
-        for s, c in zip(sepsets, cliques):
-            self.__walk__(self.start_clique, s[1], c[1])
-
-    def __walk__(self, x, s, y):
+        :return: List of tuples (x, s, y); the message is passed from clique x to s to clique y.
         """
-        Walks away from the specified x clique.
+        messages = []
+        seen = {self.start_clique.id}
+        stack = [self.start_clique]
+
+        while len(stack) > 0:
+            x = stack.pop()
+            sepsets, cliques = self.__get_neighboring_cliques__(self.join_tree, x)
+            for sep, cli in zip(sepsets, cliques):
+                if cli[0] not in seen:
+                    seen.add(cli[0])
+                    messages.append((cli[1], sep[1], x))
+                    stack.append(cli[1])
+
+        messages.reverse()
+        return messages
 
-        :param x: Clique.
-        :param s: Separation-set.
-        :param y: Clique.
+    def start(self):
         """
-
-        sepsets, cliques = self.__get_neighboring_cliques__(self.join_tree, y)
-
-        s_arr = []
-        c_arr = []
-        for sep, cli in zip(sepsets, cliques):
-            if not cli[1].is_marked():
-                cli[1].mark()
-                s_arr.append(sep)
-                c_arr.append(cli)
-
-        for sep, cli in zip(s_arr, c_arr):
-            self.__walk__(y, sep[1], cli[1])
-
-        PotentialUtil.pass_single_message(self.join_tree, y, s, x)
+        Starts the evidence collection.
+        """
+        for x, s, y in self.get_messages():
+            PotentialUtil.pass_single_message(self.join_tree, x, s, y)
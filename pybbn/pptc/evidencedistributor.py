@@ -40,42 +40,30 @@ class EvidenceDistributor(object):
 
         return sepsets, cliques
 
-    def start(self):
+    def get_messages(self):
         """
-        Starts the evidence distribution.
+        Gets the messages to pass in order. The tree is walked iteratively (no recursion) away from the
+        start clique and a clique receives its message before it sends any.
+
+        :return: List of tuples (x, s, y); the message is passed from clique x to s to clique y.
         """
-        self.start_clique.mark()
-        sepsets, cliques = self.__get_neighboring_cliques__(
-            self.join_tree, self.start_clique
-        )
+        messages = []
+        seen = {self.start_clique.id}
+        queue = [self.start_clique]
 
-        for clique in cliques:
-            clique[1].mark()
+        for x in queue:
+            sepsets, cliques = self.__get_neighboring_cliques__(self.join_tree, x)
+            for sep, cli in zip(sepsets, cliques):
+                if cli[0] not in seen:
+                    seen.add(cli[0])
+                    messages.append((x, sep[1], cli[1]))
+                    queue.append(cli[1])
 
-        for s, c in zip(sepsets, cliques):
-            PotentialUtil.pass_single_message(
-                self.join_tree, self.start_clique, s[1], c[1]
-            )
-            self.__walk__(self.start_clique, s[1], c[1])
+        return messages
 
-    def __walk__(self, x, s, y):
+    def start(self):
         """
-        Walks away from the specified node y.
-
-        :param x: Clique.
-        :param s: Separation-set.
-        :param y: Clique.
+        Starts the evidence distribution.
         """
-        sepsets, cliques = self.__get_neighboring_cliques__(self.join_tree, y)
-
-        s_arr = []
-        c_arr = []
-        for sep, cli in zip(sepsets, cliques):
-            if not cli[1].is_marked():
-                cli[1].mark()
-                s_arr.append(sep)
-                c_arr.append(cli)
-
-        for sep, cli in zip(s_arr, c_arr):
-            PotentialUtil.pass_single_message(self.join_tree, y, sep[1], cli[1])
-            self.__walk__(y, sep[1], cli[1])
+        for x, s, y in self.get_messages():
+            PotentialUtil.pass_single_message(self.join_tree, x, s, y)
@@ -1,12 +1,17 @@
 import copy
 
+import numpy as np
+import pandas as pd
+
 from pybbn.graph.jointree import JoinTreeListener
+from pybbn.graph.potential import SparsePotential
+from pybbn.pptc.estimator import Estimator
 from pybbn.pptc.initializer import Initializer
 from pybbn.pptc.moralizer import Moralizer
 from pybbn.pptc.potentialinitializer import PotentialInitializer
 from pybbn.pptc.propagator import Propagator
 from pybbn.pptc.transformer import Transformer
-from pybbn.pptc.triangulator import Triangulator
+from pybbn.pptc.triangulator import Heuristic, Triangulator
 
 
 class InferenceController(JoinTreeListener):
@@ -15,26 +20,47 @@ class InferenceController(JoinTreeListener):
     """
 
     @staticmethod
-    def apply(bbn):
+    def apply(
+        bbn, heuristic=Heuristic.DEFAULT, max_bytes=None, scaled=False, sparse=True
+    ):
         """
         Sets up the specified BBN for probability propagation in tree clusters (PPTC).
 
         :param bbn: BBN graph.
+        :param heuristic: Triangulation heuristic.
+        :param max_bytes: Memory budget (optional). If the estimated size of the potentials of the join tree
+            (see Estimator) exceeds it, a ValueError is raised before any clique potential is allocated;
+            the caller may then fall back to approximate inference (see pybbn.sampling).
+        :param scaled: If True, clique potentials are rescaled as messages are passed (see
+            PotentialUtil.rescale) so that they do not underflow on deep networks or with many evidences.
+        :param sparse: If True, the potentials of cliques whose tables are mostly zeros (e.g. because of
+            deterministic CPTs) are stored sparse (see SparsePotential and Initializer.get_clique_potential).
+            The entries of a sparse potential are read-only.
         :return: Join tree.
         """
         PotentialInitializer.init(bbn)
 
         ug = Moralizer.moralize(bbn)
-        cliques = Triangulator.triangulate(ug)
+        cliques = Triangulator.triangulate(ug, heuristic)
         join_tree = Transformer.transform(cliques)
+
+        if max_bytes is not None:
+            estimate = Estimator.get_estimate(join_tree)
+            if estimate.bytes > max_bytes:
+                raise ValueError(
+                    f"join tree needs about {estimate.bytes} bytes, more than the budget of {max_bytes}: {estimate}"
+                )
         join_tree.parent_info = {
             node.id: bbn.parents[node.id]
             for node in bbn.get_nodes()
             if node.id in bbn.parents
         }
+        join_tree.scaled = scaled
+        join_tree.sparse = sparse
 
         Initializer.initialize(join_tree)
         Propagator.propagate(join_tree)
+        Initializer.sparsify(join_tree)
 
         join_tree.set_listener(InferenceController())
 
@@ -44,7 +70,10 @@ class InferenceController(JoinTreeListener):
     def reapply(join_tree, cpts):
         """
         Reapply propagation to join tree with new CPTs. The join tree structure is kept but the BBN node CPTs
-        are updated. A new instance/copy of the join tree will be returned.
+        are updated. A new instance/copy of the join tree will be returned. Only the potentials of the
+        updated BBN nodes and of their parent cliques are recomputed; all evidence is cleared. If a snapshot of
+        an initial clique potential is sparse, all the potentials are recomputed since the cells dropped from
+        it (see Initializer.sparsify) depend on all the CPTs.
 
         :param join_tree: Join tree.
         :param cpts: Dictionary of new CPTs. Keys are id's of nodes and values are new CPTs.
@@ -53,48 +82,149 @@ class InferenceController(JoinTreeListener):
         jt = copy.deepcopy(join_tree)
         jt.update_bbn_cpts(cpts)
         jt.listener = None
-        jt.evidences = dict()
 
-        PotentialInitializer.reinit(jt)
-        Initializer.initialize(jt)
+        if jt.initial_potentials is None or any(
+            [isinstance(p, SparsePotential) for p in jt.initial_potentials.values()]
+        ):
+            jt.evidences = dict()
+
+            PotentialInitializer.reinit(jt)
+            Initializer.initialize(jt)
+        else:
+            for potentials in jt.evidences.values():
+                for potential in potentials.values():
+                    potential.entries[0].value = 1.0
+
+            node_ids = set(cpts.keys())
+            PotentialInitializer.reinit(jt, node_ids)
+            Initializer.update_cpts(jt, node_ids)
         Propagator.propagate(jt)
+        Initializer.sparsify(jt)
 
         jt.set_listener(InferenceController())
 
         return jt
 
     @staticmethod
-    def apply_from_serde(join_tree):
+    def apply_from_serde(join_tree, scaled=False, sparse=True):
         """
         Applies propagation to join tree from a deserialzed join tree.
 
         :param join_tree: Join tree.
+        :param scaled: If True, clique potentials are rescaled as messages are passed (see apply).
+        :param sparse: If True, the potentials of cliques whose tables are mostly zeros are stored sparse
+            (see apply).
         :return: Join tree (the same one passed in).
         """
         join_tree.listener = None
         join_tree.evidences = dict()
+        join_tree.scaled = scaled
+        join_tree.sparse = sparse
 
         PotentialInitializer.reinit(join_tree)
         Initializer.initialize(join_tree)
         Propagator.propagate(join_tree)
+        Initializer.sparsify(join_tree)
 
         join_tree.set_listener(InferenceController())
 
         return join_tree
 
+    @staticmethod
+    def get_batch_posteriors(join_tree, evidences, batch_size=1000):
+        """
+        Gets the posteriors for a batch of evidence rows. Each row is an independent set of observations;
+        the rows are propagated together (batch_size at a time) with a leading batch axis on the clique
+        potentials instead of one propagation per row. The evidence set on the join tree is ignored and
+        left as is.
+
+        :param join_tree: Join tree.
+        :param evidences: DataFrame (or list of dictionaries). Columns are variable names and values are
+            the observed values; missing values (None or NaN) are unobserved.
+        :param batch_size: Maximum number of rows propagated at once.
+        :return: Dictionary. Keys are variable names and values are arrays of shape (number of rows, number
+            of values of the variable); columns are in the order of the variable values.
+        """
+        if not isinstance(evidences, pd.DataFrame):
+            evidences = pd.DataFrame(evidences)
+
+        codes = {}
+        for name in evidences.columns:
+            node = join_tree.get_bbn_node_by_name(name)
+            if node is None:
+                raise ValueError(f"no such variable: {name}")
+
+            column = evidences[name]
+            values = column.map({v: i for i, v in enumerate(node.variable.values)})
+            invalid = values.isna() & column.notna()
+            if invalid.any():
+                value = column[invalid].iloc[0]
+                raise ValueError(f"invalid value for {name}: {value}")
+            codes[node] = values.fillna(-1).to_numpy().astype(int)
+
+        n_rows = evidences.shape[0]
+        nodes = join_tree.get_bbn_nodes()
+        posteriors = {
+            node.variable.name: np.zeros((n_rows, len(node.variable.values)))
+            for node in nodes
+        }
+
+        for start in range(0, n_rows, batch_size):
+            stop = min(start + batch_size, n_rows)
+
+            likelihoods = {}
+            for node, values in codes.items():
+                values = values[start:stop]
+                likelihood = np.ones((stop - start, len(node.variable.values)))
+                observed = values >= 0
+                likelihood[observed] = 0.0
+                likelihood[observed, values[observed]] = 1.0
+                likelihoods[node] = likelihood
+
+            potentials = Propagator.propagate_batch(join_tree, likelihoods)
+
+            for node in nodes:
+                clique = node.metadata["parent.clique"]
+                projection = join_tree.get_projection(clique, [node])
+                marginals = projection.marginalize(potentials[clique.id])
+                total = marginals.sum(axis=-1, keepdims=True)
+                marginals = np.divide(
+                    marginals,
+                    total,
+                    out=np.zeros(np.broadcast_shapes(marginals.shape, total.shape)),
+                    where=total != 0.0,
+                )
+                posteriors[node.variable.name][start:stop] = marginals
+
+        return posteriors
+
     def evidence_retracted(self, join_tree):
         """
-        Evidence is retracted.
+        Evidence is retracted. The clique potentials are restored from the snapshot taken at initialization
+        and the remaining evidence is re-applied.
 
         :param join_tree: Join tree.
         """
-        Initializer.initialize(join_tree)
+        Initializer.reinitialize(join_tree)
         Propagator.propagate(join_tree)
 
     def evidence_updated(self, join_tree):
         """
-        Evidence is updated.
+        Evidence is updated. Only the cliques that got new evidence are updated and evidence is collected
+        from them; it is distributed to the other cliques when they are requested (see
+        potentials_requested).
 
         :param join_tree: Join tree.
         """
-        Propagator.propagate(join_tree)
+        cliques = Initializer.update_evidences(join_tree)
+        Propagator.propagate(join_tree, cliques, lazy=True)
+
+    def potentials_requested(self, join_tree, cliques):
+        """
+        Potentials of the specified cliques are about to be read. The evidence collected since they were
+        last up to date is distributed to them.
+
+        :param join_tree: Join tree.
+        :param cliques: Cliques.
+        """
+        Propagator.distribute_to(join_tree, cliques)
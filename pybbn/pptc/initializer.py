@@ -1,4 +1,8 @@
-from pybbn.graph.potential import PotentialUtil
+from collections import defaultdict
+
+import numpy as np
+
+from pybbn.graph.potential import DensePotential, PotentialUtil, SparsePotential
 
 
 class Initializer(object):
@@ -14,38 +18,233 @@ class Initializer(object):
         :param join_tree: Join tree.
         :return: Join tree.
         """
+        nodes = join_tree.get_bbn_nodes()
+        potentials = defaultdict(list)
+        for node in nodes:
+            clique = Initializer.get_clique(node, join_tree)
+            potentials[clique.id].append(node.potential)
+
+        join_tree.initial_potentials = dict()
         for clique in join_tree.get_cliques():
-            potential = PotentialUtil.get_potential_from_nodes(clique.nodes)
+            potential = Initializer.get_clique_potential(
+                join_tree, clique, potentials[clique.id]
+            )
             join_tree.add_potential(clique, potential)
+            join_tree.initial_potentials[clique.id] = Initializer.__snapshot__(
+                potential
+            )
 
         for sep_set in join_tree.get_sep_sets():
             potential = PotentialUtil.get_potential_from_nodes(sep_set.nodes)
             join_tree.add_potential(sep_set, potential)
 
-        nodes = join_tree.get_bbn_nodes()
         for node in nodes:
-            clique = Initializer.get_clique(node, join_tree)
-            # print('{} mapped to clique {}'.format(node.variable.name, clique))
-            p1 = join_tree.potentials[clique.id]
-            p2 = node.potential
-            # print(p1)
-            # print('>>>>>')
-            # print(p2)
-            # print('----')
-            PotentialUtil.multiply(p1, p2)
-            # print(p1)
-            # print('****')
+            Initializer.multiply_evidence(join_tree, node)
+
+        join_tree.evidence_changes = dict()
+        return join_tree
+
+    @staticmethod
+    def reinitialize(join_tree):
+        """
+        Re-initializes the join tree from the snapshot of the clique potentials taken (before any evidence
+        was multiplied in) by the last initialization. Only the evidence of the BBN nodes that are not
+        unobserved is multiplied back in. If there is no snapshot, the join tree is initialized.
+
+        :param join_tree: Join tree.
+        :return: Join tree.
+        """
+        if join_tree.initial_potentials is None:
+            return Initializer.initialize(join_tree)
+
+        for clique in join_tree.get_cliques():
+            join_tree.add_potential(
+                clique, Initializer.get_initial_potential(join_tree, clique)
+            )
 
+        for sep_set in join_tree.get_sep_sets():
+            potential = PotentialUtil.get_potential_from_nodes(sep_set.nodes)
+            join_tree.add_potential(sep_set, potential)
+
+        nodes = {node.id: node for node in join_tree.get_bbn_nodes()}
+        for node_id, potentials in join_tree.evidences.items():
+            if any([1.0 != p.entries[0].value for p in potentials.values()]):
+                Initializer.multiply_evidence(join_tree, nodes[node_id])
+
+        join_tree.evidence_changes = dict()
+        return join_tree
+
+    @staticmethod
+    def update_cpts(join_tree, node_ids):
+        """
+        Recomputes the initial clique potentials (the snapshot) of only the parent cliques of the specified
+        BBN nodes, whose potentials have changed, and then re-initializes the join tree from the snapshot.
+
+        :param join_tree: Join tree (initialized).
+        :param node_ids: IDs of the BBN nodes whose potentials have changed.
+        :return: Join tree.
+        """
+        nodes = join_tree.get_bbn_nodes()
+        cliques = {
+            node.metadata["parent.clique"].id: node.metadata["parent.clique"]
+            for node in nodes
+            if node.id in node_ids
+        }
+
+        potentials = defaultdict(list)
         for node in nodes:
-            for value in node.variable.values:
-                clique = node.metadata["parent.clique"]
-                clique_potential = join_tree.potentials[clique.id]
-                node_potential = join_tree.get_evidence(node, value)
-                PotentialUtil.multiply(clique_potential, node_potential)
-                # print(clique)
-                # print(clique_potential)
+            clique = node.metadata["parent.clique"]
+            if clique.id in cliques:
+                potentials[clique.id].append(node.potential)
+
+        join_tree.initial_potentials = dict(join_tree.initial_potentials)
+        for clique_id, clique in cliques.items():
+            potential = Initializer.get_clique_potential(
+                join_tree, clique, potentials[clique_id]
+            )
+            join_tree.initial_potentials[clique_id] = Initializer.__snapshot__(
+                potential
+            )
+
+        return Initializer.reinitialize(join_tree)
+
+    @staticmethod
+    def get_clique_potential(join_tree, clique, potentials):
+        """
+        Multiplies the specified potentials (the CPTs assigned to the clique) onto a new clique potential.
+        If the join tree is sparse, some CPT has zeros and the clique table is mostly zeros (at most
+        SparsePotential.MAX_DENSITY of its cells are nonzero), the potential is sparse.
+
+        :param join_tree: Join tree.
+        :param clique: Clique.
+        :param potentials: List of potentials; their nodes are subsets of the nodes of the clique.
+        :return: Potential.
+        """
+        if join_tree.sparse and any([np.any(0.0 == p.values) for p in potentials]):
+            max_cells = int(SparsePotential.MAX_DENSITY * clique.get_weight())
+            potential = PotentialUtil.get_sparse_product(
+                clique.nodes, potentials, max_cells
+            )
+            if potential is not None:
+                return potential
+
+        potential = PotentialUtil.get_potential_from_nodes(clique.nodes)
+        for p in potentials:
+            PotentialUtil.multiply(potential, p)
+        return potential
+
+    @staticmethod
+    def sparsify(join_tree):
+        """
+        Stores sparse the clique potentials of a sparse join tree that are mostly zeros (at most
+        SparsePotential.MAX_DENSITY of their cells are nonzero) once propagated without evidence. A cell that
+        is then 0.0 is 0.0 under any evidence, so it is dropped from the snapshot of the initial clique
+        potential as well; this is what makes cliques over deterministic CPTs sparse even when the CPTs
+        assigned to the clique have few zeros.
+
+        :param join_tree: Join tree (initialized and propagated, without evidence).
+        :return: Join tree.
+        """
+        if not join_tree.sparse:
+            return join_tree
+
+        for clique in join_tree.get_cliques():
+            potential = join_tree.potentials[clique.id]
+            initial = join_tree.initial_potentials[clique.id]
+
+            if isinstance(potential, SparsePotential):
+                nonzero = potential.data != 0.0
+                index = potential.index[nonzero]
+                data = potential.data[nonzero]
+            else:
+                values = potential.values.ravel()
+                index = np.flatnonzero(values)
+                data = values[index]
+
+            if index.size > SparsePotential.MAX_DENSITY * clique.get_weight():
+                continue
+
+            if isinstance(initial, SparsePotential):
+                initial_data = initial.data[np.searchsorted(initial.index, index)]
+            else:
+                initial_data = initial.ravel()[index]
+
+            join_tree.potentials[clique.id] = SparsePotential(
+                clique.nodes, index, data, potential.log_scale
+            )
+            join_tree.initial_potentials[clique.id] = SparsePotential(
+                clique.nodes, index, initial_data
+            ).share()
+
         return join_tree
 
+    @staticmethod
+    def get_initial_potential(join_tree, clique):
+        """
+        Gets a new clique potential from the snapshot of the initial clique potentials.
+
+        :param join_tree: Join tree (initialized).
+        :param clique: Clique.
+        :return: Potential.
+        """
+        initial = join_tree.initial_potentials[clique.id]
+        if isinstance(initial, SparsePotential):
+            return initial.share()
+        return DensePotential(clique.nodes, initial.copy())
+
+    @staticmethod
+    def __snapshot__(potential):
+        """
+        Gets the snapshot of the specified initial clique potential: a read-only copy of its values, or the
+        (shared, copy-on-write) potential itself if it is sparse.
+
+        :param potential: Potential.
+        :return: Array of values or SparsePotential.
+        """
+        if isinstance(potential, SparsePotential):
+            return potential.share()
+
+        values = potential.values.copy()
+        values.flags.writeable = False
+        return values
+
+    @staticmethod
+    def multiply_evidence(join_tree, node):
+        """
+        Multiplies the evidence of the specified BBN node into its parent clique.
+
+        :param join_tree: Join tree.
+        :param node: BBN node.
+        """
+        clique = node.metadata["parent.clique"]
+        clique_potential = join_tree.potentials[clique.id]
+        node_potential = join_tree.get_evidence_potential(node)
+        projection = join_tree.get_projection(clique, [node])
+        PotentialUtil.multiply(clique_potential, node_potential, projection)
+
+    @staticmethod
+    def update_evidences(join_tree):
+        """
+        Multiplies the evidence changes recorded since the last propagation into the parent cliques of the
+        BBN nodes. Only changes that are updates (not retractions) may be absorbed this way.
+
+        :param join_tree: Join tree.
+        :return: Set of IDs of the cliques that got new evidence.
+        """
+        cliques = set()
+        for old_potential in join_tree.evidence_changes.values():
+            node = old_potential.nodes[0]
+            clique = node.metadata["parent.clique"]
+            new_potential = join_tree.get_evidence_potential(node)
+
+            ratio = PotentialUtil.divide(new_potential, old_potential)
+            projection = join_tree.get_projection(clique, [node])
+            PotentialUtil.multiply(join_tree.potentials[clique.id], ratio, projection)
+            cliques.add(clique.id)
+
+        join_tree.evidence_changes = dict()
+        return cliques
+
     @staticmethod
     def get_clique(node, join_tree):
         """
@@ -62,6 +261,7 @@ class Initializer(object):
             )
             clique = cliques[0]
             node.add_metadata("parent.clique", clique)
+            join_tree.get_projection(clique, [node])
             return clique
         else:
             return node.metadata["parent.clique"]
@@ -0,0 +1,319 @@
+import numpy as np
+
+from pybbn.graph.jointree import EvidenceBuilder, EvidenceType
+from pybbn.graph.potential import DensePotential, PotentialUtil
+from pybbn.pptc.initializer import Initializer
+from pybbn.pptc.moralizer import Moralizer
+from pybbn.pptc.potentialinitializer import PotentialInitializer
+from pybbn.pptc.transformer import Transformer
+from pybbn.pptc.triangulator import Heuristic, Triangulator
+
+
+class LazyPropagation(object):
+    """
+    Lazy propagation (Madsen and Jensen, 1999), an alternative to the Hugin-style propagation of
+    InferenceController. The join tree is built the same way, but no clique or separation-set potential is
+    ever allocated: each clique keeps the CPTs (and evidence) assigned to it as a list of factors. A message
+    is also a list of factors; it is computed, when a posterior needs it, by eliminating (summing out) the
+    variables not in the separation-set one at a time, multiplying only the factors that mention the
+    variable. CPTs of variables that no other factor mentions (barren variables) are dropped without being
+    multiplied. Messages are cached and only the ones that depend on changed evidence are recomputed.
+    """
+
+    def __init__(
+        self, bbn, heuristic=Heuristic.DEFAULT, elimination=Heuristic.MIN_WEIGHT
+    ):
+        """
+        Ctor.
+
+        :param bbn: BBN graph.
+        :param heuristic: Triangulation heuristic.
+        :param elimination: Heuristic used to pick the next variable to eliminate when computing a message
+            or posterior; scores are computed on the graph of the variables of the factors (e.g. MIN_WEIGHT
+            is the size of the table the elimination produces).
+        """
+        PotentialInitializer.init(bbn)
+
+        ug = Moralizer.moralize(bbn)
+        cliques = Triangulator.triangulate(ug, heuristic)
+        self.join_tree = Transformer.transform(cliques)
+        self.elimination = elimination
+
+        self.neighbors = {clique.id: [] for clique in self.join_tree.get_cliques()}
+        for sep_set in self.join_tree.get_sep_sets():
+            self.neighbors[sep_set.left.id].append((sep_set, sep_set.right))
+            self.neighbors[sep_set.right.id].append((sep_set, sep_set.left))
+
+        self.nodes = {node.id: node for node in bbn.get_nodes()}
+        self.names = {node.variable.name: node for node in bbn.get_nodes()}
+        self.homes = {
+            node.id: Initializer.get_clique(node, self.join_tree)
+            for node in bbn.get_nodes()
+        }
+        self.factors = {clique.id: [] for clique in self.join_tree.get_cliques()}
+        for node in bbn.get_nodes():
+            self.factors[self.homes[node.id].id].append((node.potential, node.id))
+
+        self.evidences = dict()
+        self.messages = dict()
+        self.max_cells = 0
+
+    def observe(self, observations):
+        """
+        Sets the evidence of the specified nodes. Only the cached messages that depend on it are dropped.
+
+        :param observations: Dictionary. Keys are node names and values are either the observed value or a
+            dictionary of values to likelihoods (virtual evidence, clamped to [0, 1] as in Evidence); a
+            value of None unobserves the node.
+        :return: This engine.
+        """
+        likelihoods = dict()
+        for name, value in observations.items():
+            node = self.names.get(name)
+            if node is None:
+                raise ValueError(f"no such variable: {name}")
+
+            values = node.variable.values
+            if value is None:
+                likelihoods[node.id] = None
+            elif isinstance(value, dict):
+                builder = (
+                    EvidenceBuilder().with_node(node).with_type(EvidenceType.VIRTUAL)
+                )
+                for v, likelihood in value.items():
+                    if v not in values:
+                        raise ValueError(f"invalid value for {name}: {v}")
+                    builder = builder.with_evidence(v, likelihood)
+
+                # validating clamps the likelihoods to [0, 1] as the join tree does
+                evidence = builder.build()
+                evidence.validate()
+                likelihoods[node.id] = [float(evidence.values[v]) for v in values]
+            elif value in values:
+                likelihoods[node.id] = [1.0 if v == value else 0.0 for v in values]
+            else:
+                raise ValueError(f"invalid value for {name}: {value}")
+
+        for node_id, likelihood in likelihoods.items():
+            node = self.nodes[node_id]
+            if likelihood is None:
+                if self.evidences.pop(node_id, None) is None:
+                    continue
+            else:
+                self.evidences[node_id] = DensePotential([node], likelihood)
+            self.__invalidate__(self.homes[node_id])
+
+        return self
+
+    def unobserve_all(self):
+        """
+        Unobserves all nodes.
+
+        :return: This engine.
+        """
+        self.evidences = dict()
+        self.messages = dict()
+        return self
+
+    def __invalidate__(self, clique):
+        """
+        Drops the cached messages that depend on the factors of the specified clique: the messages passed
+        away from it.
+
+        :param clique: Clique.
+        """
+        stack = [(clique, None)]
+        while len(stack) > 0:
+            x, parent = stack.pop()
+            for _, y in self.neighbors[x.id]:
+                if parent is not None and y.id == parent.id:
+                    continue
+                self.messages.pop((x.id, y.id), None)
+                stack.append((y, x))
+
+    def get_posteriors(self, names=None):
+        """
+        Gets the posterior for all nodes.
+
+        :param names: Names of the nodes (optional). Defaults to all nodes.
+        :return: Map. Keys are node names; values are map of node values to posterior probabilities.
+        """
+        return {
+            name: {
+                f"{v}": float(p)
+                for v, p in zip(self.names[name].variable.values, values)
+            }
+            for name, values in self.get_posterior_arrays(names).items()
+        }
+
+    def get_posterior_arrays(self, names=None):
+        """
+        Gets the posterior for all nodes as arrays.
+
+        :param names: Names of the nodes (optional). Defaults to all nodes.
+        :return: Map. Keys are node names; values are arrays of posterior probabilities in the order of the
+            node values.
+        """
+        if names is None:
+            names = list(self.names.keys())
+
+        posteriors = dict()
+        for name in names:
+            node = self.names.get(name)
+            if node is None:
+                raise ValueError(f"no such variable: {name}")
+
+            clique = self.homes[node.id]
+            factors = self.__get_factors__(clique) + [
+                (m, None)
+                for _, y in self.neighbors[clique.id]
+                for m in self.__get_message__(y, clique)
+            ]
+            factors = self.__eliminate__(factors, {node.id})
+
+            potential = DensePotential([node])
+            for factor, _ in factors:
+                PotentialUtil.multiply(potential, factor)
+            posteriors[name] = PotentialUtil.normalize(potential).values
+        return posteriors
+
+    def __get_factors__(self, clique):
+        """
+        Gets the factors (CPTs and evidence) assigned to the specified clique.
+
+        :param clique: Clique.
+        :return: List of tuples (potential, ID of the node whose CPT it is or None).
+        """
+        factors = list(self.factors[clique.id])
+        for node_id, potential in self.evidences.items():
+            if self.homes[node_id].id == clique.id:
+                factors.append((potential, None))
+        return factors
+
+    def __get_message__(self, x, y):
+        """
+        Gets the message from clique x to its neighbor y. The messages into x that it depends on are
+        computed first (iteratively, leaves first) unless cached.
+
+        :param x: Clique.
+        :param y: Clique.
+        :return: List of potentials.
+        """
+        if (x.id, y.id) in self.messages:
+            return self.messages[(x.id, y.id)]
+
+        order = []
+        stack = [(x, y)]
+        while len(stack) > 0:
+            u, v = stack.pop()
+            order.append((u, v))
+            for _, w in self.neighbors[u.id]:
+                if w.id != v.id and (w.id, u.id) not in self.messages:
+                    stack.append((w, u))
+
+        for u, v in reversed(order):
+            factors = self.__get_factors__(u)
+            for sep_set, w in self.neighbors[u.id]:
+                if w.id == v.id:
+                    keep = set([node.id for node in sep_set.nodes])
+                else:
+                    factors.extend([(m, None) for m in self.messages[(w.id, u.id)]])
+            self.messages[(u.id, v.id)] = [
+                f for f, _ in self.__eliminate__(factors, keep)
+            ]
+
+        return self.messages[(x.id, y.id)]
+
+    def __eliminate__(self, factors, keep):
+        """
+        Eliminates (sums out) all the variables of the specified factors that are not to be kept.
+
+        :param factors: List of tuples (potential, ID of the node whose CPT it is or None).
+        :param keep: Set of IDs of the variables to keep.
+        :return: List of tuples (potential, None); constant factors are dropped.
+        """
+        variables = set([i for f, _ in factors for i in f.node_ids]) - keep
+
+        removed = True
+        while removed:
+            removed = False
+            for factor in factors:
+                potential, head = factor
+                if head in variables and all(
+                    [head not in f.node_ids for f, _ in factors if f is not potential]
+                ):
+                    factors = [f for f in factors if f is not factor]
+                    variables = set([i for f, _ in factors for i in f.node_ids]) - keep
+                    removed = True
+                    break
+
+        while len(variables) > 0:
+            v = min(variables, key=lambda i: (self.__get_score__(i, factors), i))
+            related = [f for f, _ in factors if v in f.node_ids]
+            factors = [(f, h) for f, h in factors if v not in f.node_ids]
+
+            product = LazyPropagation.__multiply__(related)
+            self.max_cells = max(self.max_cells, product.values.size)
+            index = product.node_ids.index(v)
+            nodes = [n for n in product.nodes if n.id != v]
+            if len(nodes) > 0:
+                factors.append(
+                    (DensePotential(nodes, product.values.sum(axis=index)), None)
+                )
+            variables.discard(v)
+
+        return [(f, None) for f, _ in factors if len(f.nodes) > 0]
+
+    def __get_score__(self, v, factors):
+        """
+        Gets the elimination score of the specified variable; the variable with the lowest score is
+        eliminated first.
+
+        :param v: ID of the variable.
+        :param factors: List of tuples (potential, ID of the node whose CPT it is or None).
+        :return: Score.
+        """
+        domains = [set(f.node_ids) for f, _ in factors if v in f.node_ids]
+        neighbors = set().union(*domains) - {v}
+        weights = {n.id: n.get_weight() for f, _ in factors for n in f.nodes}
+
+        if self.elimination == Heuristic.MIN_DEGREE:
+            return len(neighbors)
+
+        weight = int(np.prod([weights[i] for i in neighbors | {v}]))
+        if self.elimination == Heuristic.MIN_WEIGHT:
+            return weight
+
+        all_domains = [set(f.node_ids) for f, _ in factors]
+        missing = [
+            (i, j)
+            for i in neighbors
+            for j in neighbors
+            if i < j and not any([i in d and j in d for d in all_domains])
+        ]
+        if self.elimination == Heuristic.MIN_FILL:
+            return len(missing)
+        if self.elimination == Heuristic.WEIGHTED_MIN_FILL:
+            return sum([weights[i] * weights[j] for i, j in missing])
+        return len(missing), weight
+
+    @staticmethod
+    def __multiply__(potentials):
+        """
+        Multiplies the specified potentials.
+
+        :param potentials: List of potentials.
+        :return: Potential over the union of the nodes of the potentials.
+        """
+        nodes = []
+        node_ids = set()
+        for potential in potentials:
+            for node in potential.nodes:
+                if node.id not in node_ids:
+                    node_ids.add(node.id)
+                    nodes.append(node)
+
+        product = DensePotential(nodes)
+        for potential in potentials:
+            PotentialUtil.multiply(product, potential)
+        return product
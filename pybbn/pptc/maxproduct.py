@@ -0,0 +1,229 @@
+import numpy as np
+
+from pybbn.graph.potential import DensePotential, PotentialUtil
+from pybbn.pptc.initializer import Initializer
+from pybbn.pptc.propagator import Propagator
+
+
+class MaxProduct(object):
+    """
+    Max-product propagation. Finds the most probable explanation (MPE), the most likely joint assignment of
+    all the BBN nodes given the evidence, and partial MAP assignments on an initialized join tree (e.g.
+    returned by InferenceController.apply). The clique potentials are rebuilt from the snapshot of the
+    initial clique potentials and the evidence, in log space so that long products do not underflow; the
+    join tree itself is not modified.
+    """
+
+    @staticmethod
+    def get_mpe(join_tree):
+        """
+        Gets the most probable explanation given the evidence set on the join tree. Evidence is collected to
+        the roots with max-marginalization (one pass over the cached schedule); the assignment is then traced
+        back from the roots along the distribution messages.
+
+        :param join_tree: Join tree (initialized).
+        :return: Tuple of the assignment (dictionary; keys are node names and values are node values) and
+            its probability jointly with the evidence. If the evidence is impossible, the probability is 0.0
+            and the assignment is arbitrary.
+        """
+        tables = MaxProduct.__get_log_potentials__(join_tree)
+        schedule = Propagator.get_schedule(join_tree)
+
+        for x, s, y in schedule.collect:
+            message = join_tree.get_projection(x, s.nodes).maximize(tables[x.id])
+            tables[y.id] = tables[y.id] + join_tree.get_projection(y, s.nodes).expand(
+                message
+            )
+
+        assignment = dict()
+        log_probability = 0.0
+        for clique in sorted(join_tree.get_cliques(), key=lambda c: c.id):
+            if clique.id not in schedule.collect_index:
+                log_probability += tables[clique.id].max()
+                MaxProduct.__assign__(clique, tables[clique.id], assignment)
+        for _, _, y in schedule.distribute:
+            MaxProduct.__assign__(y, tables[y.id], assignment)
+
+        return MaxProduct.__get_values__(join_tree, assignment), float(
+            np.exp(log_probability)
+        )
+
+    @staticmethod
+    def get_map(join_tree, names):
+        """
+        Gets the maximum a posteriori (partial MAP) assignment of the specified BBN nodes given the evidence
+        set on the join tree; the other nodes are summed out. The clique potentials are not propagated over
+        the join tree since its elimination order need not sum out the other nodes first. Instead, the
+        variables are eliminated from the (log) clique potentials in a single pass whose order is
+        constrained: the other nodes are summed out first and the MAP nodes are then maximized out, each
+        group in order of the size of the table its elimination produces. The assignment is traced back
+        from the maximizations in reverse order. The constrained order may produce tables larger than the
+        cliques.
+
+        :param join_tree: Join tree (initialized).
+        :param names: Names of the MAP nodes.
+        :return: Tuple of the assignment (dictionary; keys are node names and values are node values) and
+            its probability jointly with the evidence. If the evidence is impossible, the probability is 0.0
+            and the assignment is arbitrary.
+        """
+        map_ids = set()
+        for name in names:
+            node = join_tree.get_bbn_node_by_name(name)
+            if node is None:
+                raise ValueError(f"no such variable: {name}")
+            map_ids.add(node.id)
+
+        tables = MaxProduct.__get_log_potentials__(join_tree)
+        factors = [
+            (clique.nodes, tables[clique.id]) for clique in join_tree.get_cliques()
+        ]
+
+        variables = set([node.id for nodes, _ in factors for node in nodes])
+        maximized = []
+        for group, maximize in [(variables - map_ids, False), (map_ids, True)]:
+            group = set(group)
+            while len(group) > 0:
+                v = min(group, key=lambda i: (MaxProduct.__get_weight__(i, factors), i))
+                group.discard(v)
+
+                related = [f for f in factors if v in [n.id for n in f[0]]]
+                factors = [f for f in factors if v not in [n.id for n in f[0]]]
+                nodes, table = MaxProduct.__multiply__(related)
+                axis = [n.id for n in nodes].index(v)
+                rest = [n for n in nodes if n.id != v]
+
+                if maximize:
+                    maximized.append((nodes[axis], rest, np.argmax(table, axis=axis)))
+                    factors.append((rest, table.max(axis=axis)))
+                else:
+                    factors.append((rest, MaxProduct.__log_sum__(table, axis)))
+
+        log_probability = float(sum([table.sum() for _, table in factors]))
+
+        assignment = dict()
+        for node, rest, argmax in reversed(maximized):
+            index = tuple([assignment[n.id] for n in rest])
+            assignment[node.id] = int(argmax[index])
+
+        return MaxProduct.__get_values__(join_tree, assignment), float(
+            np.exp(log_probability)
+        )
+
+    @staticmethod
+    def __get_log_potentials__(join_tree):
+        """
+        Gets the logs of the initial clique potentials multiplied by the evidence.
+
+        :param join_tree: Join tree (initialized).
+        :return: Dictionary. Keys are clique IDs and values are arrays (axes in the order of the clique
+            nodes).
+        """
+        if join_tree.initial_potentials is None:
+            raise ValueError("join tree is not initialized")
+
+        potentials = {
+            clique.id: DensePotential(
+                clique.nodes,
+                Initializer.get_initial_potential(join_tree, clique).values,
+            )
+            for clique in join_tree.get_cliques()
+        }
+        for node in join_tree.get_bbn_nodes():
+            evidence = join_tree.get_evidence_potential(node)
+            if np.any(1.0 != evidence.values):
+                clique = node.metadata["parent.clique"]
+                projection = join_tree.get_projection(clique, [node])
+                PotentialUtil.multiply(potentials[clique.id], evidence, projection)
+
+        with np.errstate(divide="ignore"):
+            return {k: np.log(p.values) for k, p in potentials.items()}
+
+    @staticmethod
+    def __get_weight__(v, factors):
+        """
+        Gets the number of cells of the table produced by eliminating the specified variable.
+
+        :param v: ID of the variable.
+        :param factors: List of tuples (nodes, array).
+        :return: Number of cells.
+        """
+        weights = {
+            node.id: node.get_weight()
+            for nodes, _ in factors
+            if v in [n.id for n in nodes]
+            for node in nodes
+        }
+        return int(np.prod(list(weights.values())))
+
+    @staticmethod
+    def __multiply__(factors):
+        """
+        Multiplies the specified factors (adds them, since they are logs).
+
+        :param factors: List of tuples (nodes, array with axes in the order of the nodes).
+        :return: Tuple (nodes, array) over the union of the nodes of the factors.
+        """
+        nodes = []
+        for f_nodes, _ in factors:
+            for node in f_nodes:
+                if node.id not in [n.id for n in nodes]:
+                    nodes.append(node)
+        node_ids = [node.id for node in nodes]
+
+        table = np.zeros(tuple([node.get_weight() for node in nodes]))
+        for f_nodes, f_table in factors:
+            axes = [node_ids.index(node.id) for node in f_nodes]
+            order = sorted(range(len(axes)), key=lambda i: axes[i])
+            shape = [1] * len(nodes)
+            for i in axes:
+                shape[i] = table.shape[i]
+            table = table + np.transpose(f_table, order).reshape(shape)
+        return nodes, table
+
+    @staticmethod
+    def __log_sum__(table, axis):
+        """
+        Sums out the specified axis of a table of logs.
+
+        :param table: Array of logs.
+        :param axis: Axis.
+        :return: Array of logs.
+        """
+        m = table.max(axis=axis, keepdims=True)
+        m[~np.isfinite(m)] = 0.0
+        with np.errstate(divide="ignore"):
+            return np.log(np.exp(table - m).sum(axis=axis)) + np.squeeze(m, axis=axis)
+
+    @staticmethod
+    def __assign__(clique, table, assignment):
+        """
+        Assigns the nodes of the specified clique that are not assigned yet to the values that maximize the
+        clique table given the nodes already assigned.
+
+        :param clique: Clique.
+        :param table: Array (axes in the order of the clique nodes).
+        :param assignment: Dictionary. Keys are node IDs and values are value indices; updated in place.
+        """
+        index = tuple([assignment.get(node.id, slice(None)) for node in clique.nodes])
+        free = [node for node in clique.nodes if node.id not in assignment]
+        if len(free) == 0:
+            return
+
+        values = table[index]
+        for node, i in zip(free, np.unravel_index(np.argmax(values), values.shape)):
+            assignment[node.id] = int(i)
+
+    @staticmethod
+    def __get_values__(join_tree, assignment):
+        """
+        Converts an assignment of value indices to node values.
+
+        :param join_tree: Join tree.
+        :param assignment: Dictionary. Keys are node IDs and values are value indices.
+        :return: Dictionary. Keys are node names and values are node values.
+        """
+        values = dict()
+        for node_id, index in assignment.items():
+            node = join_tree.get_bbn_node(node_id)
+            values[node.variable.name] = node.variable.values[index]
+        return values
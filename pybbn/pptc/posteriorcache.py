@@ -0,0 +1,178 @@
+from collections import OrderedDict
+
+from pybbn.graph.jointree import EvidenceBuilder, EvidenceType
+from pybbn.pptc.inferencecontroller import InferenceController
+
+
+class PosteriorCache(object):
+    """
+    Posterior cache. Wraps a join tree and caches the posteriors computed for each evidence state. The
+    evidence state is the likelihoods of all the observed (or softly observed) BBN nodes; it is the key of
+    the cache, so the same evidence gets the same posteriors without entering it into the join tree or
+    propagating. The least recently used entries are evicted first. The cache owns the evidence of the
+    join tree; entries are dropped when the CPTs of the join tree change (see JoinTree.update_bbn_cpts).
+    """
+
+    def __init__(self, join_tree, max_size=1024):
+        """
+        Ctor.
+
+        :param join_tree: Join tree.
+        :param max_size: Maximum number of evidence states cached.
+        """
+        self.join_tree = join_tree
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.cpt_version = join_tree.cpt_version
+        self.likelihoods = self.__get_likelihoods__()
+
+    def __get_likelihoods__(self):
+        """
+        Gets the likelihoods of the BBN nodes that have evidence in the join tree.
+
+        :return: Dictionary. Keys are node IDs and values are tuples of likelihoods.
+        """
+        likelihoods = {}
+        for node in self.join_tree.get_bbn_nodes():
+            values = tuple(
+                [
+                    self.join_tree.get_evidence(node, value).entries[0].value
+                    for value in node.variable.values
+                ]
+            )
+            if any([1.0 != v for v in values]):
+                likelihoods[node.id] = values
+        return likelihoods
+
+    def get_key(self, evidences):
+        """
+        Gets the canonical key of the specified evidence: the likelihoods of the nodes with evidence, sorted
+        by node ID. Nodes whose likelihoods are all 1.0 are unobserved and left out.
+
+        :param evidences: Dictionary. Keys are node names and values are either the observed value or a
+            dictionary of values to likelihoods (virtual evidence); a value of None is unobserved.
+        :return: Tuple of tuples (node ID, likelihoods).
+        """
+        key = []
+        for name, value in evidences.items():
+            if value is None:
+                continue
+
+            node = self.join_tree.get_bbn_node_by_name(name)
+            if node is None:
+                raise ValueError(f"no such variable: {name}")
+
+            builder = EvidenceBuilder().with_node(node)
+            if isinstance(value, dict):
+                builder = builder.with_type(EvidenceType.VIRTUAL)
+                items = value.items()
+            else:
+                builder = builder.with_type(EvidenceType.OBSERVATION)
+                items = [(value, 1.0)]
+            for v, likelihood in items:
+                if self.join_tree.get_value_index(node, v) is None:
+                    raise ValueError(f"invalid value for {name}: {v}")
+                builder = builder.with_evidence(v, likelihood)
+
+            evidence = builder.build()
+            evidence.validate()
+            likelihoods = tuple([evidence.values[v] for v in node.variable.values])
+            if any([1.0 != v for v in likelihoods]):
+                key.append((node.id, likelihoods))
+
+        return tuple(sorted(key))
+
+    def get_posteriors(self, evidences, names=None):
+        """
+        Gets the posteriors for the specified evidence. Only the posteriors not cached for this evidence are
+        computed (after entering the evidence into the join tree).
+
+        :param evidences: Dictionary. Keys are node names and values are either the observed value or a
+            dictionary of values to likelihoods (virtual evidence); a value of None (or a missing node) is
+            unobserved.
+        :param names: Names of the nodes (optional). Defaults to all nodes.
+        :return: Map. Keys are node names; values are (read-only) arrays of posterior probabilities in the
+            order of the node values.
+        """
+        if self.cpt_version != self.join_tree.cpt_version:
+            self.clear()
+
+        if names is None:
+            names = [node.variable.name for node in self.join_tree.get_bbn_nodes()]
+
+        key = self.get_key(evidences)
+        entry = self.entries.get(key)
+        missing = names if entry is None else [n for n in names if n not in entry]
+
+        if entry is None:
+            self.misses += 1
+            entry = dict()
+            self.entries[key] = entry
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+        elif len(missing) > 0:
+            self.misses += 1
+            self.entries.move_to_end(key)
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+
+        if len(missing) > 0:
+            self.__set_likelihoods__(dict(key))
+            for name, values in self.join_tree.get_posterior_arrays(missing).items():
+                values.flags.writeable = False
+                entry[name] = values
+
+        return {name: entry[name] for name in names}
+
+    def __set_likelihoods__(self, likelihoods):
+        """
+        Enters the specified likelihoods into the join tree; all other nodes are unobserved. Only the nodes
+        whose likelihoods differ from the ones last entered are updated.
+
+        :param likelihoods: Dictionary. Keys are node IDs and values are tuples of likelihoods.
+        """
+        evidences = []
+        for node_id in set(self.likelihoods.keys()) | set(likelihoods.keys()):
+            values = likelihoods.get(node_id)
+            if values == self.likelihoods.get(node_id):
+                continue
+
+            node = self.join_tree.get_bbn_node(node_id)
+            if values is None:
+                evidences.append(self.join_tree.get_unobserved_evidence(node))
+                continue
+
+            builder = EvidenceBuilder().with_node(node).with_type(EvidenceType.VIRTUAL)
+            for v, likelihood in zip(node.variable.values, values):
+                builder = builder.with_evidence(v, likelihood)
+            evidences.append(builder.build())
+
+        if len(evidences) > 0:
+            self.join_tree.update_evidences(evidences)
+        self.likelihoods = likelihoods
+
+    def reapply(self, cpts):
+        """
+        Reapplies propagation with new CPTs (see InferenceController.reapply). The cache then wraps the new
+        join tree and is cleared.
+
+        :param cpts: Dictionary of new CPTs. Keys are id's of nodes and values are new CPTs.
+        :return: Join tree.
+        """
+        self.join_tree = InferenceController.reapply(self.join_tree, cpts)
+        self.likelihoods = self.__get_likelihoods__()
+        self.clear()
+        return self.join_tree
+
+    def clear(self):
+        """
+        Removes all the entries; the hit and miss counters are kept.
+        """
+        self.entries.clear()
+        self.cpt_version = self.join_tree.cpt_version
+
+    def __len__(self):
+        return len(self.entries)
@@ -21,16 +21,22 @@ class PotentialInitializer(object):
             )
             potential = PotentialUtil.get_potential(node, parents)
             node.potential = potential
+            # the parent clique belongs to a previous join tree, which may have been triangulated differently
+            node.metadata.pop("parent.clique", None)
 
     @staticmethod
-    def reinit(jt):
+    def reinit(jt, node_ids=None):
         """
         Reinitialize potentials of BBN nodes in join tree.
 
         :param jt: Join tree.
+        :param node_ids: IDs of the BBN nodes to reinitialize (optional). If not specified, all BBN nodes
+            are reinitialized.
         :return: None.
         """
         for node, parents in jt.get_bbn_node_and_parents().items():
+            if node_ids is not None and node.id not in node_ids:
+                continue
             potential = PotentialUtil.get_potential(node, parents)
             node.potential = potential
             node.metadata["parents"] = parents
@@ -1,3 +1,8 @@
+from collections import defaultdict
+
+import numpy as np
+
+from pybbn.graph.potential import PotentialUtil, SparsePotential
 from pybbn.pptc.evidencecollector import EvidenceCollector
 from pybbn.pptc.evidencedistributor import EvidenceDistributor
 
@@ -8,26 +13,220 @@ class Propagator(object):
     """
 
     @staticmethod
-    def propagate(join_tree):
+    def propagate(join_tree, cliques=None, lazy=False):
         """
         Propagates evidence.
 
         :param join_tree: Join tree.
+        :param cliques: IDs of the cliques that got new evidence (optional). If specified, the join tree
+            must have been consistent before the new evidence was entered and only the affected messages
+            are passed (see propagate_incremental); otherwise, all messages are passed.
+        :param lazy: If True (and cliques are specified), distribution is deferred (see
+            propagate_incremental).
+        :return: Join tree.
+        """
+        if cliques is not None:
+            return Propagator.propagate_incremental(join_tree, cliques, lazy)
+
+        schedule = Propagator.get_schedule(join_tree)
+
+        for x, s, y in schedule.collect:
+            PotentialUtil.pass_single_message(join_tree, x, s, y)
+
+        for x, s, y in schedule.distribute:
+            PotentialUtil.pass_single_message(join_tree, x, s, y)
+
+        join_tree.fresh = None
+        return join_tree
+
+    @staticmethod
+    def propagate_incremental(join_tree, cliques, lazy=False):
+        """
+        Propagates evidence entered into the specified cliques of an otherwise consistent join tree.
+        Evidence is collected only along the paths from those cliques to the root. Evidence is then
+        distributed from the root, but not into sub-trees whose incoming message is unchanged (up to a
+        constant factor).
+
+        :param join_tree: Join tree.
+        :param cliques: IDs of the cliques that got new evidence.
+        :param lazy: If True, evidence is only collected; it is distributed to a clique when the clique is
+            requested (see distribute_to). Only the roots are then up to date.
+        :return: Join tree.
+        """
+        schedule = Propagator.get_schedule(join_tree)
+
+        marked = set()
+        roots = []
+        for clique_id in cliques:
+            while clique_id not in marked:
+                marked.add(clique_id)
+                if clique_id not in schedule.collect_index:
+                    roots.append(join_tree.get_node(clique_id))
+                    break
+                clique_id = schedule.collect[schedule.collect_index[clique_id]][2].id
+
+        indices = sorted(
+            [schedule.collect_index[i] for i in marked if i in schedule.collect_index]
+        )
+        for i in indices:
+            x, s, y = schedule.collect[i]
+            PotentialUtil.pass_single_message(join_tree, x, s, y)
+
+        if lazy:
+            join_tree.fresh = set()
+            return join_tree
+
+        if join_tree.fresh is not None:
+            return Propagator.distribute_to(join_tree, join_tree.get_cliques())
+
+        queue = roots
+        for x in queue:
+            for i in schedule.distribute_index[x.id]:
+                _, s, y = schedule.distribute[i]
+                passed = PotentialUtil.pass_single_message(
+                    join_tree, x, s, y, skip_proportional=True
+                )
+                if passed or y.id in marked:
+                    queue.append(y)
+
+        return join_tree
+
+    @staticmethod
+    def distribute_to(join_tree, cliques):
+        """
+        Distributes the evidence that was collected lazily (see propagate_incremental) to the specified
+        cliques. Messages are only passed along the paths from the closest up-to-date clique (or root) to
+        each of the specified cliques; the other cliques are left as they are.
+
+        :param join_tree: Join tree.
+        :param cliques: Cliques.
         :return: Join tree.
         """
-        cliques = join_tree.get_cliques()
-        cliques = sorted(cliques, key=lambda c: c.id)
-        # cliques = sorted(cliques, key=lambda c: c.get_sid())
-        x = cliques[0]
+        if join_tree.fresh is None:
+            return join_tree
 
-        join_tree.unmark_cliques()
-        Propagator.collect_evidence(join_tree, x)
+        schedule = Propagator.get_schedule(join_tree)
 
-        join_tree.unmark_cliques()
-        Propagator.distribute_evidence(join_tree, x)
+        for clique in cliques:
+            path = []
+            clique_id = clique.id
+            while (
+                clique_id not in join_tree.fresh and clique_id in schedule.collect_index
+            ):
+                x, s, y = schedule.collect[schedule.collect_index[clique_id]]
+                path.append((y, s, x))
+                clique_id = y.id
+            join_tree.fresh.add(clique_id)
+
+            for x, s, y in reversed(path):
+                PotentialUtil.pass_single_message(
+                    join_tree, x, s, y, skip_proportional=True
+                )
+                join_tree.fresh.add(y.id)
 
         return join_tree
 
+    @staticmethod
+    def propagate_batch(join_tree, likelihoods):
+        """
+        Propagates a batch of evidence sets at once. The clique potentials start from the snapshot taken at
+        initialization and get a leading batch axis as evidence reaches them, so each message is a single
+        vectorized operation over the whole batch. The join tree itself is not modified.
+
+        :param join_tree: Join tree (initialized).
+        :param likelihoods: Dictionary. Keys are BBN nodes and values are arrays of likelihoods of shape
+            (batch size, number of values of the node).
+        :return: Dictionary. Keys are clique IDs and values are arrays of the (unnormalized) clique potentials;
+            the arrays of cliques that no evidence reached have no batch axis. If the join tree is scaled,
+            each row of a clique potential is rescaled so that its largest value is 1.0.
+        """
+        schedule = Propagator.get_schedule(join_tree)
+        potentials = {
+            clique_id: (
+                initial.values if isinstance(initial, SparsePotential) else initial
+            )
+            for clique_id, initial in join_tree.initial_potentials.items()
+        }
+        sep_sets = dict()
+
+        for node, likelihood in likelihoods.items():
+            clique = node.metadata["parent.clique"]
+            projection = join_tree.get_projection(clique, [node])
+            potentials[clique.id] = potentials[clique.id] * projection.expand(
+                likelihood
+            )
+
+        for x, s, y in schedule.collect + schedule.distribute:
+            new_values = join_tree.get_projection(x, s.nodes).marginalize(
+                potentials[x.id]
+            )
+            old_values = sep_sets.get(s.id, 1.0)
+            sep_sets[s.id] = new_values
+
+            ratio = np.zeros(
+                np.broadcast_shapes(np.shape(new_values), np.shape(old_values))
+            )
+            np.divide(
+                new_values,
+                old_values,
+                out=ratio,
+                where=(new_values != 0.0) & (old_values != 0.0),
+            )
+            projection = join_tree.get_projection(y, s.nodes)
+            potentials[y.id] = potentials[y.id] * projection.expand(ratio)
+
+            if join_tree.scaled:
+                values = potentials[y.id]
+                axes = tuple(range(values.ndim - len(y.nodes), values.ndim))
+                m = values.max(axis=axes, keepdims=True)
+                potentials[y.id] = np.divide(
+                    values, m, out=np.zeros(values.shape), where=m != 0.0
+                )
+
+        return potentials
+
+    @staticmethod
+    def get_schedule(join_tree):
+        """
+        Gets the message passing schedule of the join tree. The schedule is compiled once and cached on
+        the join tree since the structure of the join tree does not change after it is built.
+
+        :param join_tree: Join tree.
+        :return: Schedule.
+        """
+        if join_tree.schedule is None:
+            join_tree.schedule = Propagator.compile(join_tree)
+        return join_tree.schedule
+
+    @staticmethod
+    def compile(join_tree):
+        """
+        Compiles the message passing schedule of the join tree. Every connected component of the join tree
+        is rooted at its clique with the smallest id.
+
+        :param join_tree: Join tree.
+        :return: Schedule.
+        """
+        collect = []
+        distribute = []
+        seen = set()
+
+        cliques = sorted(join_tree.get_cliques(), key=lambda c: c.id)
+        for x in cliques:
+            if x.id in seen:
+                continue
+
+            collect_messages = EvidenceCollector(join_tree, x).get_messages()
+            distribute_messages = EvidenceDistributor(join_tree, x).get_messages()
+
+            seen.add(x.id)
+            seen.update([y.id for _, _, y in distribute_messages])
+
+            collect.extend(collect_messages)
+            distribute.extend(distribute_messages)
+
+        return Schedule(collect, distribute)
+
     @staticmethod
     def collect_evidence(join_tree, start):
         """
@@ -49,3 +248,23 @@ class Propagator(object):
         """
         distributor = EvidenceDistributor(join_tree, start)
         distributor.start()
+
+
+class Schedule(object):
+    """
+    Message passing schedule. Each message is a tuple (x, s, y) passed from clique x to s to clique y.
+    """
+
+    def __init__(self, collect, distribute):
+        """
+        Ctor.
+
+        :param collect: List of messages passed towards the roots.
+        :param distribute: List of messages passed away from the roots.
+        """
+        self.collect = collect
+        self.distribute = distribute
+        self.collect_index = {x.id: i for i, (x, _, _) in enumerate(collect)}
+        self.distribute_index = defaultdict(list)
+        for i, (x, _, _) in enumerate(distribute):
+            self.distribute_index[x.id].append(i)
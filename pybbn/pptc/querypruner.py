@@ -0,0 +1,157 @@
+from collections import OrderedDict
+
+from pybbn.graph.dag import Bbn
+from pybbn.graph.edge import Edge, EdgeType
+from pybbn.graph.node import BbnNode
+from pybbn.graph.variable import Variable
+from pybbn.pptc.inferencecontroller import InferenceController
+from pybbn.pptc.posteriorcache import PosteriorCache
+
+
+class QueryPruner(object):
+    """
+    Query pruner. Answers each query on the sub-network of the BBN that is relevant to it: barren nodes
+    (nodes with no evidence and no query below them) and nodes d-separated from the query nodes by the
+    evidence are removed (see get_requisite_nodes). The join trees of the sub-networks are cached (least
+    recently used first out) by the sub-network they were built from, along with their posteriors (see
+    PosteriorCache).
+    """
+
+    def __init__(self, bbn, max_size=128):
+        """
+        Ctor.
+
+        :param bbn: BBN.
+        :param max_size: Maximum number of join trees (sub-networks) cached.
+        """
+        self.bbn = bbn
+        self.max_size = max_size
+        self.n2i = bbn.get_n2i()
+        self.caches = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def get_requisite_nodes(bbn, query_ids, observed_ids, soft_ids=None):
+        """
+        Gets the nodes needed to compute the posteriors of the query nodes with a Bayes-ball pass (Shachter,
+        1998). Virtual (soft) evidence on a node is handled as an observed child of that node.
+
+        :param bbn: BBN.
+        :param query_ids: IDs of the query nodes.
+        :param observed_ids: IDs of the observed nodes.
+        :param soft_ids: IDs of the nodes with virtual evidence (optional).
+        :return: Tuple of sets of node IDs: the nodes whose CPTs are needed, the observed nodes whose
+            observations are needed and the nodes whose virtual evidence is needed.
+        """
+        if soft_ids is None:
+            soft_ids = set()
+
+        top = set()
+        bottom = set()
+        visited = set()
+        schedule = [(node_id, True) for node_id in query_ids]
+
+        def pass_to_parents(node_id):
+            top.add(node_id)
+            schedule.extend([(pa_id, True) for pa_id in bbn.parents.get(node_id, [])])
+
+        def pass_to_children(node_id):
+            bottom.add(node_id)
+            schedule.extend([(ch_id, False) for ch_id in bbn.get_children(node_id)])
+            if node_id in soft_ids:
+                schedule.append((node_id, True))
+
+        while len(schedule) > 0:
+            node_id, from_child = schedule.pop()
+            visited.add(node_id)
+
+            if node_id in observed_ids:
+                if not from_child and node_id not in top:
+                    pass_to_parents(node_id)
+            elif from_child:
+                if node_id not in top:
+                    pass_to_parents(node_id)
+                if node_id not in bottom:
+                    pass_to_children(node_id)
+            elif node_id not in bottom:
+                pass_to_children(node_id)
+
+        return top, visited & set(observed_ids), bottom & set(soft_ids)
+
+    @staticmethod
+    def get_sub_bbn(bbn, node_ids, root_ids=None):
+        """
+        Gets the sub-network of the specified BBN. The BBN nodes are copied.
+
+        :param bbn: BBN.
+        :param node_ids: IDs of the nodes whose CPTs are kept; their parents must be in node_ids or root_ids.
+        :param root_ids: IDs of the (observed) nodes whose CPTs are not needed; they have no parents and a
+            uniform distribution in the sub-network (optional).
+        :return: BBN.
+        """
+        if root_ids is None:
+            root_ids = set()
+
+        sub_bbn = Bbn()
+        nodes = {}
+
+        for node_id in sorted(set(node_ids) | set(root_ids)):
+            node = bbn.get_node(node_id)
+            variable = Variable(node.id, node.variable.name, node.variable.values)
+            if node_id in node_ids:
+                probs = node.probs
+            else:
+                probs = [1.0 / len(node.variable.values)] * len(node.variable.values)
+            nodes[node_id] = BbnNode(variable, probs)
+            sub_bbn.add_node(nodes[node_id])
+
+        for node_id in sorted(node_ids):
+            for pa_id in bbn.parents.get(node_id, []):
+                sub_bbn.add_edge(Edge(nodes[pa_id], nodes[node_id], EdgeType.DIRECTED))
+
+        return sub_bbn
+
+    def get_posteriors(self, evidences, names):
+        """
+        Gets the posteriors of the specified nodes given the specified evidence, computed on the relevant
+        sub-network only.
+
+        :param evidences: Dictionary. Keys are node names and values are either the observed value or a
+            dictionary of values to likelihoods (virtual evidence); a value of None is unobserved.
+        :param names: Names of the query nodes.
+        :return: Map. Keys are node names; values are (read-only) arrays of posterior probabilities in the
+            order of the node values.
+        """
+        for name in list(names) + list(evidences.keys()):
+            if name not in self.n2i:
+                raise ValueError(f"no such variable: {name}")
+
+        evidences = {k: v for k, v in evidences.items() if v is not None}
+        observed_ids = {
+            self.n2i[k] for k, v in evidences.items() if not isinstance(v, dict)
+        }
+        soft_ids = {self.n2i[k] for k, v in evidences.items() if isinstance(v, dict)}
+        query_ids = [self.n2i[name] for name in names]
+
+        node_ids, observed_ids, soft_ids = QueryPruner.get_requisite_nodes(
+            self.bbn, query_ids, observed_ids, soft_ids
+        )
+        root_ids = observed_ids - node_ids
+        signature = (tuple(sorted(node_ids)), tuple(sorted(root_ids)))
+
+        cache = self.caches.get(signature)
+        if cache is None:
+            self.misses += 1
+            sub_bbn = QueryPruner.get_sub_bbn(self.bbn, node_ids, root_ids)
+            cache = PosteriorCache(InferenceController.apply(sub_bbn))
+            self.caches[signature] = cache
+            while len(self.caches) > self.max_size:
+                self.caches.popitem(last=False)
+        else:
+            self.hits += 1
+            self.caches.move_to_end(signature)
+
+        relevant = observed_ids | soft_ids
+        evidences = {k: v for k, v in evidences.items() if self.n2i[k] in relevant}
+        return cache.get_posteriors(evidences, names)
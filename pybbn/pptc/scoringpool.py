@@ -0,0 +1,110 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from pybbn.graph.jointree import JoinTree
+from pybbn.pptc.inferencecontroller import InferenceController
+
+_join_tree = None
+
+
+def _initialize_worker(d, scaled, sparse):
+    """
+    Initializes a worker process with a join tree deserialized from the specified dictionary. The join tree
+    is not triangulated again; its potentials are initialized and propagated.
+
+    :param d: Dictionary (serialized join tree).
+    :param scaled: Whether the clique potentials are rescaled (see InferenceController.apply).
+    :param sparse: Whether mostly-zero clique potentials are stored sparse (see InferenceController.apply).
+    """
+    global _join_tree
+    _join_tree = InferenceController.apply_from_serde(
+        JoinTree.from_dict(d), scaled, sparse
+    )
+
+
+def _score(evidences, batch_size):
+    """
+    Scores evidence rows with the join tree of the worker process.
+
+    :param evidences: DataFrame of evidence rows.
+    :param batch_size: Maximum number of rows propagated at once.
+    :return: Dictionary of posteriors (see InferenceController.get_batch_posteriors).
+    """
+    return InferenceController.get_batch_posteriors(_join_tree, evidences, batch_size)
+
+
+class ScoringPool(object):
+    """
+    Scoring pool. Builds the join tree of a BBN once, ships it (serialized) to worker processes and fans
+    batches of evidence rows out to them.
+    """
+
+    def __init__(
+        self, bbn, n_workers=None, chunk_size=10000, batch_size=1000, join_tree=None
+    ):
+        """
+        Ctor.
+
+        :param bbn: BBN.
+        :param n_workers: Number of worker processes (default is the number of CPUs).
+        :param chunk_size: Number of evidence rows sent to a worker at a time.
+        :param batch_size: Maximum number of rows a worker propagates at once.
+        :param join_tree: Join tree of the BBN (optional). If not specified, one is built.
+        """
+        if join_tree is None:
+            join_tree = InferenceController.apply(bbn)
+
+        self.n_workers = multiprocessing.cpu_count() if n_workers is None else n_workers
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+        self.names = [node.variable.name for node in join_tree.get_bbn_nodes()]
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.n_workers,
+            initializer=_initialize_worker,
+            initargs=(
+                JoinTree.to_dict(join_tree, bbn),
+                join_tree.scaled,
+                join_tree.sparse,
+            ),
+        )
+
+    def get_posteriors(self, evidences):
+        """
+        Gets the posteriors for a batch of evidence rows. The rows are split into chunks that are scored in
+        parallel by the workers and gathered back in order.
+
+        :param evidences: DataFrame (or list of dictionaries). Columns are variable names and values are
+            the observed values; missing values (None or NaN) are unobserved.
+        :return: Dictionary. Keys are variable names and values are arrays of shape (number of rows, number
+            of values of the variable); columns are in the order of the variable values.
+        """
+        if not isinstance(evidences, pd.DataFrame):
+            evidences = pd.DataFrame(evidences)
+
+        chunks = [
+            evidences.iloc[start : start + self.chunk_size]
+            for start in range(0, max(evidences.shape[0], 1), self.chunk_size)
+        ]
+        results = list(
+            self.executor.map(_score, chunks, [self.batch_size] * len(chunks))
+        )
+
+        return {
+            name: np.concatenate([result[name] for result in results])
+            for name in self.names
+        }
+
+    def close(self):
+        """
+        Shuts down the worker processes.
+        """
+        self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -1,3 +1,5 @@
+from collections import defaultdict
+
 from pybbn.graph.edge import JtEdge
 from pybbn.graph.jointree import JoinTree
 from pybbn.graph.node import SepSet
@@ -11,7 +13,9 @@ class Transformer(object):
     @staticmethod
     def transform(cliques):
         """
-        Transforms the cliques into a join tree.
+        Transforms the cliques into a join tree. This is a maximum spanning tree (Kruskal); separation-sets
+        are considered descendingly by mass followed by cost (asc) and id (asc), and a union-find structure
+        rejects the ones that would create a cycle.
 
         :param cliques: List of cliques.
         :return: Join tree.
@@ -20,11 +24,27 @@ class Transformer(object):
         for clique in cliques:
             join_tree.add_node(clique)
 
-        sep_sets = Transformer.get_sep_sets(cliques)
+        parents = list(range(len(cliques)))
+
+        def find(i):
+            while parents[i] != i:
+                parents[i] = parents[parents[i]]
+                i = parents[i]
+            return i
+
+        n_edges = 0
+        for _, i, j, lhs, rhs, intersection in Transformer.__get_candidates__(cliques):
+            if n_edges == len(cliques) - 1:
+                break
+
+            root_i, root_j = find(i), find(j)
+            if root_i == root_j:
+                continue
+            parents[root_j] = root_i
+            n_edges += 1
 
-        for i in range(len(sep_sets)):
-            jtEdge = JtEdge(sep_sets[i])
-            join_tree.add_edge(jtEdge)
+            sep_set = SepSet(cliques[i], cliques[j], lhs, rhs, intersection)
+            join_tree.add_edge(JtEdge(sep_set), detect_path=False)
 
         return join_tree
 
@@ -36,15 +56,39 @@ class Transformer(object):
         :param cliques: Array of cliques.
         :return: Array of separation sets sorted descendingly by mass followed by cost (asc) and id (asc).
         """
-        sep_sets = []
-        size = len(cliques)
-        for i in range(size):
-            clique_i = cliques[i]
-            for j in range(i + 1, size):
-                clique_j = cliques[j]
-                is_intersection, lhs, rhs, intersection = clique_i.intersects(clique_j)
-                if is_intersection:
-                    sep_set = SepSet(clique_i, clique_j, lhs, rhs, intersection)
-                    sep_sets.append(sep_set)
-
-        return sorted(sep_sets, key=lambda x: (-1 * x.mass, x.cost, x.id))
+        candidates = Transformer.__get_candidates__(cliques)
+        return [
+            SepSet(cliques[i], cliques[j], lhs, rhs, intersection)
+            for _, i, j, lhs, rhs, intersection in candidates
+        ]
+
+    @staticmethod
+    def __get_candidates__(cliques):
+        """
+        Gets the candidate separation-sets. Only pairs of cliques sharing at least one node are considered;
+        they are found with an inverted index of node to cliques.
+
+        :param cliques: Array of cliques.
+        :return: Array of tuples (key, i, j, lhs, rhs, intersection) sorted by key, where i < j are the
+            indices of the cliques, lhs, rhs and intersection are the sorted node ids of the left clique,
+            right clique and separation-set, and key is (-mass, cost, id) of the separation-set.
+        """
+        index = defaultdict(list)
+        for i, clique in enumerate(cliques):
+            for node_id in clique.get_node_ids():
+                index[node_id].append(i)
+
+        ids = [sorted(clique.get_node_ids()) for clique in cliques]
+        sids = ["-".join(str(x) for x in arr) for arr in ids]
+        weights = [clique.get_weight() for clique in cliques]
+
+        candidates = []
+        for i, clique in enumerate(cliques):
+            neighbors = set(j for node_id in ids[i] for j in index[node_id] if j > i)
+            for j in neighbors:
+                intersection = sorted(cliques[j].get_node_ids() & clique.get_node_ids())
+                sid = "-".join([sids[i]] + [str(x) for x in intersection] + [sids[j]])
+                key = (-len(intersection), weights[i] + weights[j], sid)
+                candidates.append((key, i, j, ids[i], ids[j], intersection))
+
+        return sorted(candidates, key=lambda x: x[0])
@@ -1,3 +1,6 @@
+import heapq
+from collections import defaultdict
+from enum import Enum
 from functools import reduce
 from itertools import combinations
 
@@ -6,36 +9,127 @@ from pybbn.graph.graph import Ug
 from pybbn.graph.node import Clique
 
 
+class Heuristic(Enum):
+    """
+    Elimination heuristic. Ties are always broken by node id (asc).
+
+    - DEFAULT: number of fill-in edges, then weight.
+    - MIN_FILL: number of fill-in edges.
+    - MIN_DEGREE: number of neighbors.
+    - MIN_WEIGHT: weight (product of the number of values of the node and its neighbors).
+    - WEIGHTED_MIN_FILL: sum of the weights of the fill-in edges; the weight of an edge is the product of
+      the number of values of its two nodes.
+    """
+
+    DEFAULT = 1
+    MIN_FILL = 2
+    MIN_DEGREE = 3
+    MIN_WEIGHT = 4
+    WEIGHTED_MIN_FILL = 5
+
+
 class Triangulator(object):
     """
     Triangulator. Triangulates an undirected moralized graph and produces cliques in the process.
     """
 
     @staticmethod
-    def triangulate(m):
+    def triangulate(m, heuristic=Heuristic.DEFAULT):
         """
-        Triangulates the specified moralized graph.
+        Triangulates the specified moralized graph. The elimination scores are kept in a priority queue and,
+        after a node is eliminated, only the scores of its neighbors and of their neighbors are recomputed.
 
         :param m: Moralized undirected graph.
+        :param heuristic: Elimination heuristic. The default is the number of edges, weight and id (asc).
         :return: Array of cliques.
         """
         cliques = []
+        index = defaultdict(list)
         mm = Triangulator.duplicate(m)
-        while len(mm.get_nodes()) > 0:
-            node_clique = Triangulator.select_node(mm)
-            clique = Clique(node_clique.get_bbn_nodes())
 
-            if not Triangulator.is_subset(cliques, clique):
+        heap = [
+            (Triangulator.get_score(node, mm, heuristic), node.id)
+            for node in mm.get_nodes()
+        ]
+        heapq.heapify(heap)
+        scores = {node_id: score for score, node_id in heap}
+
+        while len(heap) > 0:
+            score, node_id = heapq.heappop(heap)
+            if node_id not in mm.nodes or scores[node_id] != score:
+                continue
+
+            node = mm.get_node(node_id)
+            neighbors = [mm.get_node(i) for i in mm.get_neighbors(node_id)]
+            edges = Triangulator.get_edges_to_add(node, mm)
+            clique = Clique(neighbors + [node])
+
+            if not Triangulator.__is_indexed_subset__(index, cliques, clique):
+                for i in clique.get_node_ids():
+                    index[i].append(len(cliques))
                 cliques.append(clique)
 
-            mm.remove_node(node_clique.node.id)
+            mm.remove_node(node_id)
 
-            for edge in node_clique.edges:
+            for edge in edges:
                 m.add_edge(edge)
                 mm.add_edge(edge)
 
+            affected = set(n.id for n in neighbors)
+            if heuristic not in {Heuristic.MIN_DEGREE, Heuristic.MIN_WEIGHT}:
+                for n in neighbors:
+                    affected.update(mm.get_neighbors(n.id))
+
+            for i in affected:
+                score = Triangulator.get_score(mm.get_node(i), mm, heuristic)
+                if scores[i] != score:
+                    scores[i] = score
+                    heapq.heappush(heap, (score, i))
+
         return cliques
 
+    @staticmethod
+    def get_score(n, m, heuristic=Heuristic.DEFAULT):
+        """
+        Gets the elimination score of a BBN node; the node with the lowest score is eliminated first.
+
+        :param n: BBN node.
+        :param m: Graph.
+        :param heuristic: Elimination heuristic.
+        :return: Tuple.
+        """
+        if heuristic == Heuristic.MIN_DEGREE:
+            return (len(m.get_neighbors(n.id)),)
+        if heuristic == Heuristic.MIN_WEIGHT:
+            return (Triangulator.get_weight(n, m),)
+
+        neighbors = [m.get_node(i) for i in m.get_neighbors(n.id)]
+        missing = [
+            (lhs, rhs)
+            for lhs, rhs in combinations(neighbors, 2)
+            if not m.edge_exists(lhs.id, rhs.id)
+        ]
+
+        if heuristic == Heuristic.MIN_FILL:
+            return (len(missing),)
+        if heuristic == Heuristic.WEIGHTED_MIN_FILL:
+            return (sum(x.get_weight() * y.get_weight() for x, y in missing),)
+        return len(missing), Triangulator.get_weight(n, m)
+
+    @staticmethod
+    def __is_indexed_subset__(index, cliques, clique):
+        """
+        Checks if the specified clique is a subset of one of the specified cliques. Only the cliques sharing
+        the least frequent node of the clique are checked.
+
+        :param index: Dictionary of node id to the indices of the cliques containing that node.
+        :param cliques: List of cliques.
+        :param clique: Clique.
+        :return: A boolean indicating if the clique is a subset.
+        """
+        candidates = min((index[i] for i in clique.get_node_ids()), key=len)
+        return any(cliques[i].is_superset(clique) for i in candidates)
+
     @staticmethod
     def duplicate(g):
         """
@@ -1,9 +1,34 @@
 import bisect
 import copy
+import heapq
 import itertools
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
 from functools import cmp_to_key
 
 import numpy as np
+import pandas as pd
+
+from pybbn.graph.dag import Bbn
+
+
+def _run_chains(d, evidence, n_samples, n_chains, burn_in, thin, seed):
+    """
+    Runs Gibbs chains in a worker process.
+
+    :param d: Dictionary (serialized BBN).
+    :param evidence: Dictionary of node ID to value index.
+    :param n_samples: Number of samples per chain.
+    :param n_chains: Number of chains.
+    :param burn_in: Number of sweeps discarded at the start of each chain.
+    :param thin: Number of sweeps per sample kept.
+    :param seed: Seed (or SeedSequence).
+    :return: Array of value indices (see GibbsSampler.run_chains).
+    """
+    sampler = GibbsSampler(Bbn.from_dict(d))
+    rng = np.random.default_rng(seed)
+    return sampler.run_chains(evidence, n_samples, n_chains, burn_in, thin, rng)
 
 
 class SortableNode(object):
@@ -58,6 +83,11 @@ class Table(object):
             probs = [np.array(p).cumsum() for p in probs]
             self.probs = {k: p for k, p in zip(keys, probs)}
 
+        n = len(node.variable.values)
+        self.shape = tuple([len(p.variable.values) for p in self.parents])
+        self.cpt = np.array(node.probs, dtype=np.float64).reshape(-1, n)
+        self.cdf = self.cpt.cumsum(axis=1)
+
     def get_value(self, prob, sample=None):
         """
         Gets the value associated with the specified probability.
@@ -74,6 +104,46 @@ class Table(object):
             index = bisect.bisect(probs, prob)
         return self.node.variable.values[index]
 
+    def get_codes(self, probs, parent_codes=None):
+        """
+        Gets the values (as indices into the node values) associated with the specified probabilities; this
+        is the vectorized version of get_value.
+
+        :param probs: Array of probabilities.
+        :param parent_codes: List of arrays of the value indices of the parents (in the order of the
+            parent ids); one array per parent and one index per probability.
+        :return: Array of value indices.
+        """
+        n = self.cdf.shape[1]
+        if not self.has_parents():
+            codes = np.searchsorted(self.cdf[0], probs, side="right")
+            return np.minimum(codes, n - 1)
+
+        rows = np.ravel_multi_index(parent_codes, self.shape)
+        if n <= 16:
+            # counting the cumulative probabilities below each probability is faster for few values
+            codes = np.zeros(len(probs), dtype=np.int64)
+            for j in range(n - 1):
+                codes += probs >= self.cdf[rows, j]
+            return codes
+
+        # offsetting every row by its index makes the flattened CDFs one ascending array
+        cdf = (self.cdf + np.arange(self.cdf.shape[0])[:, np.newaxis]).ravel()
+        codes = np.searchsorted(cdf, rows + probs, side="right") - rows * n
+        return np.minimum(codes, n - 1)
+
+    def get_probs(self, codes, parent_codes=None):
+        """
+        Gets the conditional probabilities of the specified values given the values of the parents.
+
+        :param codes: Array of value indices.
+        :param parent_codes: List of arrays of the value indices of the parents (see get_codes).
+        :return: Array of probabilities.
+        """
+        if not self.has_parents():
+            return self.cpt[0, codes]
+        return self.cpt[np.ravel_multi_index(parent_codes, self.shape), codes]
+
     def has_parents(self):
         """
         Checks if the node associated with this table has parents.
@@ -97,6 +167,8 @@ class LogicSampler(object):
         self.bbn = bbn
         self.nodes = self.__topological_sort__()
         self.tables = self.__get_tables__()
+        self.ids = sorted([node.id for node in bbn.get_nodes()])
+        self.order = self.__get_order__()
 
     def __get_tables__(self):
         """
@@ -133,6 +205,126 @@ class LogicSampler(object):
         nodes = [n.node_id for n in nodes]
         return nodes
 
+    def __get_order__(self):
+        """
+        Gets the node IDs in topological order (parents before children; ties by ID). Unlike the pairwise
+        comparisons of __topological_sort__, this is a topological order for any DAG.
+
+        :return: List of node IDs.
+        """
+        n_parents = {i: len(self.bbn.get_parents_ordered(i)) for i in self.ids}
+        queue = [i for i in self.ids if n_parents[i] == 0]
+        order = []
+        while len(queue) > 0:
+            node_id = heapq.heappop(queue)
+            order.append(node_id)
+            for ch_id in self.bbn.get_children(node_id):
+                n_parents[ch_id] -= 1
+                if n_parents[ch_id] == 0:
+                    heapq.heappush(queue, ch_id)
+        return order
+
+    def get_codes(self, n_samples=100, rng=None, evidence={}):
+        """
+        Draws forward samples as value indices. All the samples are drawn at once, node by node, in
+        topological order.
+
+        :param n_samples: Number of samples.
+        :param rng: NumPy random generator (optional).
+        :param evidence: Dictionary of node ID to value index (optional). These nodes are not sampled but
+            set to the specified values.
+        :return: Array of shape (n_samples, number of nodes) of value indices (of the smallest unsigned
+            integer type that fits); columns are in the order of the (sorted) node IDs.
+        """
+        rng = np.random.default_rng() if rng is None else rng
+        n_values = max([len(self.bbn.get_node(i).variable.values) for i in self.ids])
+        codes = np.empty(
+            (n_samples, len(self.ids)), dtype=np.min_scalar_type(n_values), order="F"
+        )
+        columns = {node_id: j for j, node_id in enumerate(self.ids)}
+
+        for node_id in self.order:
+            table = self.tables[node_id]
+            if node_id in evidence:
+                codes[:, columns[node_id]] = evidence[node_id]
+                continue
+            parent_codes = [codes[:, columns[p.id]] for p in table.parents]
+            probs = rng.random(n_samples)
+            codes[:, columns[node_id]] = table.get_codes(probs, parent_codes)
+
+        return codes
+
+    def get_batch_samples(self, evidence={}, n_samples=100, seed=37, as_codes=False):
+        """
+        Gets the samples. Unlike get_samples, the samples are drawn in batches with NumPy; samples that do
+        not agree with the evidence are rejected a batch at a time.
+
+        :param evidence: Evidence. Dictionary. Keys are ids and values are node values.
+        :param n_samples: Number of samples.
+        :param seed: Seed (default=37).
+        :param as_codes: If True, returns the value indices (see get_codes) instead of a DataFrame.
+        :return: DataFrame of samples; columns are node ids (sorted) and values are node values.
+        """
+        if n_samples < 1:
+            raise ValueError(f"n_samples must be positive: {n_samples}")
+
+        rng = np.random.default_rng(seed)
+        evidence = self.__get_evidence_codes__(evidence)
+        columns = [self.ids.index(node_id) for node_id in evidence]
+        observed = list(evidence.values())
+
+        batches = []
+        n_batch = n_samples
+        n_drawn = 0
+        n_accepted = 0
+        while n_accepted < n_samples:
+            codes = self.get_codes(n_batch, rng)
+            if len(columns) > 0:
+                codes = codes[np.all(codes[:, columns] == observed, axis=1)]
+
+            batches.append(codes)
+            n_drawn += n_batch
+            n_accepted += codes.shape[0]
+
+            # sizes the next batch by the acceptance rate so far
+            rate = max(n_accepted, 1) / n_drawn
+            n_batch = int(min(max((n_samples - n_accepted) / rate, 1_000), 1_000_000))
+
+        codes = np.concatenate(batches)[:n_samples]
+        if as_codes:
+            return codes
+        return self.__to_frame__(codes)
+
+    def __get_evidence_codes__(self, evidence):
+        """
+        Converts the values of the evidence to value indices.
+
+        :param evidence: Evidence. Dictionary. Keys are ids and values are node values.
+        :return: Dictionary. Keys are ids and values are value indices.
+        """
+        return {
+            node_id: self.bbn.get_node(node_id).variable.values.index(value)
+            for node_id, value in evidence.items()
+        }
+
+    def __to_frame__(self, codes):
+        """
+        Converts samples of value indices to a DataFrame of node values.
+
+        :param codes: Array of value indices (see get_codes).
+        :return: DataFrame; columns are node ids (sorted) and values are node values.
+        """
+        values = {
+            node_id: np.array(self.bbn.get_node(node_id).variable.values, dtype=object)
+            for node_id in self.ids
+        }
+        return pd.DataFrame(
+            {
+                node_id: values[node_id][codes[:, j]]
+                for j, node_id in enumerate(self.ids)
+            }
+        )
+
     def get_samples(self, evidence={}, n_samples=100, seed=37):
         """
         Gets the samples.
@@ -164,3 +356,364 @@ class LogicSampler(object):
                 break
 
         return samples
+
+
+class LikelihoodWeightingSampler(LogicSampler):
+    """
+    Likelihood weighting. The evidence nodes are not sampled but set to their observed values, and every
+    sample is weighted by the likelihood of the evidence given its sampled parents; no sample is rejected,
+    so the cost does not depend on how likely the evidence is.
+    """
+
+    def get_weighted_samples(
+        self, evidence={}, n_samples=100, seed=37, batch_size=10_000, max_seconds=None
+    ):
+        """
+        Gets weighted samples.
+
+        :param evidence: Evidence. Dictionary. Keys are ids and values are node values.
+        :param n_samples: Maximum number of samples (sample budget).
+        :param seed: Seed (default=37).
+        :param batch_size: Number of samples drawn at once.
+        :param max_seconds: Wall-clock budget in seconds (optional). No batch is started after it is spent
+            (the first batch always is), so fewer than n_samples samples may be returned.
+        :return: Tuple of a DataFrame of samples (columns are node ids and values are node values) and an
+            array of their weights.
+        """
+        batches = list(
+            self.__get_batches__(evidence, n_samples, seed, batch_size, max_seconds)
+        )
+        codes = np.concatenate([codes for codes, _ in batches])
+        log_weights = np.concatenate([log_weights for _, log_weights in batches])
+        if log_weights.max() == -np.inf:
+            raise ValueError("all samples have zero weight; the evidence is impossible")
+
+        weights = np.exp(log_weights - log_weights.max())
+        return self.__to_frame__(codes), weights
+
+    def get_posteriors(
+        self, evidence={}, n_samples=100, seed=37, batch_size=10_000, max_seconds=None
+    ):
+        """
+        Estimates the posteriors. The samples are not kept; only their weighted counts are.
+
+        :param evidence: Evidence. Dictionary. Keys are ids and values are node values.
+        :param n_samples: Maximum number of samples (sample budget).
+        :param seed: Seed (default=37).
+        :param batch_size: Number of samples drawn at once.
+        :param max_seconds: Wall-clock budget in seconds (optional); see get_weighted_samples.
+        :return: Map. Keys are node names; values are map of node values to posterior probabilities (the
+            same as JoinTree.get_posteriors).
+        """
+        nodes = [self.bbn.get_node(node_id) for node_id in self.ids]
+        counts = [np.zeros(len(node.variable.values)) for node in nodes]
+        scale = -np.inf
+
+        batches = self.__get_batches__(
+            evidence, n_samples, seed, batch_size, max_seconds
+        )
+        for codes, log_weights in batches:
+            # the weights are kept relative to the largest log weight so far to avoid underflow
+            batch_scale = max(scale, log_weights.max())
+            if batch_scale == -np.inf:
+                continue
+            factor = np.exp(scale - batch_scale)
+            weights = np.exp(log_weights - batch_scale)
+            for j, node in enumerate(nodes):
+                counts[j] *= factor
+                counts[j] += np.bincount(
+                    codes[:, j], weights=weights, minlength=len(counts[j])
+                )
+            scale = batch_scale
+
+        if scale == -np.inf:
+            raise ValueError("all samples have zero weight; the evidence is impossible")
+
+        return {
+            node.variable.name: {
+                f"{value}": float(p)
+                for value, p in zip(node.variable.values, c / c.sum())
+            }
+            for node, c in zip(nodes, counts)
+        }
+
+    @staticmethod
+    def get_effective_sample_size(weights):
+        """
+        Gets the (Kish) effective sample size of the weighted samples.
+
+        :param weights: Array of weights.
+        :return: Effective sample size.
+        """
+        return float(weights.sum() ** 2 / (weights**2).sum())
+
+    def __get_batches__(self, evidence, n_samples, seed, batch_size, max_seconds):
+        """
+        Draws batches of samples with their log weights until the sample or wall-clock budget is spent.
+
+        :param evidence: Evidence. Dictionary. Keys are ids and values are node values.
+        :param n_samples: Maximum number of samples.
+        :param seed: Seed.
+        :param batch_size: Number of samples drawn at once.
+        :param max_seconds: Wall-clock budget in seconds (optional).
+        :return: Generator of tuples of value indices (see get_codes) and log weights.
+        """
+        if n_samples < 1:
+            raise ValueError(f"n_samples must be positive: {n_samples}")
+
+        rng = np.random.default_rng(seed)
+        evidence = self.__get_evidence_codes__(evidence)
+        columns = {node_id: j for j, node_id in enumerate(self.ids)}
+        start = time.time()
+
+        n_drawn = 0
+        while n_drawn < n_samples:
+            n_batch = min(batch_size, n_samples - n_drawn)
+            codes = self.get_codes(n_batch, rng, evidence)
+
+            log_weights = np.zeros(n_batch)
+            with np.errstate(divide="ignore"):
+                for node_id in evidence:
+                    table = self.tables[node_id]
+                    parent_codes = [codes[:, columns[p.id]] for p in table.parents]
+                    probs = table.get_probs(codes[:, columns[node_id]], parent_codes)
+                    log_weights += np.log(probs)
+
+            n_drawn += n_batch
+            yield codes, log_weights
+
+            if max_seconds is not None and time.time() - start > max_seconds:
+                break
+
+
+class GibbsSampler(LogicSampler):
+    """
+    Gibbs sampling. Every node (that is not observed) is resampled in turn from its distribution given its
+    Markov blanket (its parents, its children and the other parents of its children). Chains are run in
+    parallel: the chains of a process are updated together, one node at a time, with NumPy.
+    """
+
+    def __init__(self, bbn):
+        """
+        Ctor.
+
+        :param bbn: BBN.
+        """
+        LogicSampler.__init__(self, bbn)
+        self.columns = {node_id: j for j, node_id in enumerate(self.ids)}
+        self.blankets = self.__get_blankets__()
+
+    def __get_blankets__(self):
+        """
+        Gets, for every node, the tables needed to compute its distribution given its Markov blanket.
+
+        :return: Dictionary. Keys are node IDs and values are lists of tuples (table, log CPT, column of
+            the table node, columns of the table parents, stride), one for the node and one per child. The
+            stride is the step in the rows of the table for a step in the value of the node (0 for the node
+            table itself).
+        """
+        columns = self.columns
+
+        def get_entry(table, node_id):
+            parent_ids = [p.id for p in table.parents]
+            if node_id in parent_ids:
+                stride = int(np.prod(table.shape[parent_ids.index(node_id) + 1 :]))
+            else:
+                stride = 0
+            with np.errstate(divide="ignore"):
+                log_cpt = np.log(table.cpt)
+            return (
+                table,
+                log_cpt,
+                columns[table.node.id],
+                [columns[i] for i in parent_ids],
+                stride,
+            )
+
+        return {
+            node_id: [get_entry(self.tables[node_id], node_id)]
+            + [
+                get_entry(self.tables[ch_id], node_id)
+                for ch_id in sorted(self.bbn.get_children(node_id))
+            ]
+            for node_id in self.ids
+        }
+
+    def run_chains(
+        self, evidence={}, n_samples=1000, n_chains=4, burn_in=100, thin=1, rng=None
+    ):
+        """
+        Runs Gibbs chains in this process. Chains start from forward samples (with the evidence set).
+
+        :param evidence: Dictionary of node ID to value index.
+        :param n_samples: Number of samples per chain.
+        :param n_chains: Number of chains.
+        :param burn_in: Number of sweeps discarded at the start of each chain.
+        :param thin: Number of sweeps per sample kept.
+        :param rng: NumPy random generator (optional).
+        :return: Array of shape (n_chains, n_samples, number of nodes) of value indices; the last axis is
+            in the order of the (sorted) node IDs.
+        """
+        rng = np.random.default_rng() if rng is None else rng
+        state = self.get_codes(n_chains, rng, evidence)
+        nodes = [node_id for node_id in self.order if node_id not in evidence]
+        chains = np.empty((n_chains, n_samples, len(self.ids)), dtype=state.dtype)
+
+        for i in range(burn_in + n_samples * thin):
+            for node_id in nodes:
+                self.__resample__(node_id, state, rng)
+
+            if i >= burn_in and (i - burn_in) % thin == thin - 1:
+                chains[:, (i - burn_in) // thin, :] = state
+
+        return chains
+
+    def __resample__(self, node_id, state, rng):
+        """
+        Resamples the specified node of every chain given its Markov blanket.
+
+        :param node_id: Node ID.
+        :param state: Array of shape (number of chains, number of nodes) of value indices; updated in place.
+        :param rng: NumPy random generator.
+        """
+        blanket = self.blankets[node_id]
+        own = state[:, self.columns[node_id]].astype(np.int64)
+        n = blanket[0][1].shape[1]
+        values = np.arange(n)
+        log_probs = np.zeros((state.shape[0], n))
+
+        for table, log_cpt, column, parent_columns, stride in blanket:
+            if len(parent_columns) == 0:
+                rows = np.zeros(state.shape[0], dtype=np.int64)
+            else:
+                parent_codes = [state[:, j] for j in parent_columns]
+                rows = np.ravel_multi_index(parent_codes, table.shape)
+
+            if stride == 0:
+                log_probs += log_cpt[rows]
+            else:
+                rows = (rows - own * stride)[:, np.newaxis] + values * stride
+                log_probs += log_cpt[rows, state[:, column][:, np.newaxis]]
+
+        # a chain may (only at the start) be in a state where no value is possible; it is then uniform
+        log_probs[np.isneginf(log_probs).all(axis=1)] = 0.0
+        log_probs -= log_probs.max(axis=1, keepdims=True)
+        cdf = np.exp(log_probs).cumsum(axis=1)
+        probs = rng.random(state.shape[0]) * cdf[:, -1]
+        codes = (cdf[:, :-1] <= probs[:, np.newaxis]).sum(axis=1)
+        state[:, self.columns[node_id]] = codes
+
+    def get_chains(
+        self,
+        evidence={},
+        n_samples=1000,
+        n_chains=4,
+        burn_in=100,
+        thin=1,
+        seed=37,
+        n_workers=None,
+    ):
+        """
+        Runs Gibbs chains; the chains are split over worker processes.
+
+        :param evidence: Evidence. Dictionary. Keys are ids and values are node values.
+        :param n_samples: Number of samples per chain (after burn-in and thinning).
+        :param n_chains: Number of chains.
+        :param burn_in: Number of sweeps discarded at the start of each chain.
+        :param thin: Number of sweeps per sample kept.
+        :param seed: Seed (default=37).
+        :param n_workers: Number of worker processes (default is the number of CPUs, at most n_chains).
+            With 1 worker, the chains are run in this process.
+        :return: Array of shape (n_chains, n_samples, number of nodes) of value indices; the last axis is
+            in the order of the (sorted) node IDs.
+        """
+        evidence = self.__get_evidence_codes__(evidence)
+        if n_workers is None:
+            n_workers = multiprocessing.cpu_count()
+        n_workers = max(min(n_workers, n_chains), 1)
+
+        seeds = np.random.SeedSequence(seed).spawn(n_workers)
+        sizes = [len(c) for c in np.array_split(np.arange(n_chains), n_workers)]
+        args = (evidence, n_samples)
+
+        if n_workers == 1:
+            rng = np.random.default_rng(seeds[0])
+            return self.run_chains(*args, n_chains, burn_in, thin, rng)
+
+        d = Bbn.to_dict(self.bbn)
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            futures = [
+                executor.submit(_run_chains, d, *args, size, burn_in, thin, seed)
+                for size, seed in zip(sizes, seeds)
+            ]
+            return np.concatenate([future.result() for future in futures])
+
+    def get_posteriors(
+        self,
+        evidence={},
+        n_samples=1000,
+        n_chains=4,
+        burn_in=100,
+        thin=1,
+        seed=37,
+        n_workers=None,
+    ):
+        """
+        Estimates the posteriors from the samples of all chains (see get_chains for the parameters).
+
+        :return: Map. Keys are node names; values are map of node values to posterior probabilities (the
+            same as JoinTree.get_posteriors).
+        """
+        chains = self.get_chains(
+            evidence, n_samples, n_chains, burn_in, thin, seed, n_workers
+        )
+        return self.__to_posteriors__(self.get_frequencies(chains).mean(axis=0))
+
+    def get_frequencies(self, chains):
+        """
+        Gets the frequencies of the values of every node in every chain.
+
+        :param chains: Array of value indices (see get_chains).
+        :return: Array of shape (n_chains, number of nodes, largest number of values).
+        """
+        n_values = max([len(self.bbn.get_node(i).variable.values) for i in self.ids])
+        frequencies = np.zeros((chains.shape[0], chains.shape[2], n_values))
+        for v in range(n_values):
+            frequencies[:, :, v] = (chains == v).mean(axis=1)
+        return frequencies
+
+    def get_rhat(self, chains):
+        """
+        Gets the (Gelman-Rubin) potential scale reduction factor of the indicator of every node value;
+        values close to 1.0 (e.g. below 1.1) indicate that the chains have converged.
+
+        :param chains: Array of value indices (see get_chains); at least 2 chains of at least 2 samples.
+        :return: Map. Keys are node names; values are map of node values to R-hat (the same shape as
+            get_posteriors). R-hat is 1.0 for a value that is constant across all chains.
+        """
+        n = chains.shape[1]
+        means = self.get_frequencies(chains)
+        within = (means * (1.0 - means) * n / (n - 1)).mean(axis=0)
+        between = n * means.var(axis=0, ddof=1)
+        estimate = (n - 1) / n * within + between / n
+
+        rhat = np.ones_like(within)
+        np.divide(estimate, within, out=rhat, where=within > 0)
+        rhat[(within == 0) & (between > 0)] = np.inf
+        return self.__to_posteriors__(np.sqrt(rhat))
+
+    def __to_posteriors__(self, arr):
+        """
+        Converts an array with one row per node (in the order of the sorted node IDs) and one column per
+        value to a map shaped like JoinTree.get_posteriors.
+
+        :param arr: Array of shape (number of nodes, largest number of values).
+        :return: Map. Keys are node names; values are map of node values to floats.
+        """
+        nodes = [self.bbn.get_node(node_id) for node_id in self.ids]
+        return {
+            node.variable.name: {
+                f"{value}": float(p) for value, p in zip(node.variable.values, row)
+            }
+            for node, row in zip(nodes, arr)
+        }
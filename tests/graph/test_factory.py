@@ -283,3 +283,57 @@ class TestFactory(unittest.TestCase):
             for v in expected[k]:
                 assert v in observed[k]
                 assert expected[k][v] - observed[k][v] < 1e-5
+
+    def test_from_data_chunks(self):
+        """
+        Tests learning parameters from chunks of a DataFrame.
+        :return: None.
+        """
+        df = pd.DataFrame(
+            [
+                ["0", "1", "0", "0"],
+                ["1", "0", "1", "1"],
+                ["1", "0", "1", "1"],
+                ["1", "0", "0", "0"],
+                ["2", "1", "1", "2"],
+            ],
+            columns=["a", "b", "c", "d"],
+        )
+        structure = {"a": [], "b": ["a"], "c": ["a"], "d": ["c", "b"]}
+
+        bbn1 = Factory.from_data(structure, df)
+        chunks = (df.iloc[i : i + 2] for i in range(0, 5, 2))
+        bbn2 = Factory.from_data(structure, chunks)
+
+        for node in bbn1.get_nodes():
+            assert node.variable.values == bbn2.get_node(node.id).variable.values
+            assert node.probs == bbn2.get_node(node.id).probs
+
+        # parents are ordered by name, for the CPT and for the edges alike
+        node = [n for n in bbn1.get_nodes() if n.variable.name == "d"][0]
+        parents = [bbn1.get_node(i).variable.name for i in bbn1.parents[node.id]]
+        assert parents == ["b", "c"]
+        # P(d | b=0, c=0) is observed once (d=0); P(d | b=1, c=0) is observed once (d=0)
+        assert node.probs[0:3] == [1.0, 0.0, 0.0]
+        # P(d | b=0, c=1) is observed twice (d=1)
+        assert node.probs[3:6] == [0.0, 1.0, 0.0]
+
+    def test_from_data_smoothing(self):
+        """
+        Tests learning parameters with Laplace smoothing.
+        :return: None.
+        """
+        df = pd.DataFrame(
+            [["0", "0"], ["0", "0"], ["0", "1"], ["1", "1"]],
+            columns=["a", "b"],
+        )
+        structure = {"a": [], "b": ["a"]}
+
+        bbn = Factory.from_data(structure, df)
+        probs = {n.variable.name: n.probs for n in bbn.get_nodes()}
+        assert probs["b"] == [2 / 3, 1 / 3, 0.0, 1.0]
+
+        bbn = Factory.from_data(structure, df, smoothing=1.0)
+        probs = {n.variable.name: n.probs for n in bbn.get_nodes()}
+        assert probs["a"] == [4 / 6, 2 / 6]
+        assert probs["b"] == [3 / 5, 2 / 5, 1 / 3, 2 / 3]
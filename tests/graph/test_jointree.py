@@ -2,9 +2,14 @@ import copy
 import json
 import unittest
 
-from pybbn.graph.dag import Bbn
+from pybbn.graph.dag import Bbn, BbnUtil
 from pybbn.graph.edge import Edge, EdgeType, JtEdge
-from pybbn.graph.jointree import JoinTree
+from pybbn.graph.jointree import (
+    ChangeType,
+    EvidenceBuilder,
+    EvidenceType,
+    JoinTree,
+)
 from pybbn.graph.node import BbnNode, Clique
 from pybbn.graph.potential import Potential
 from pybbn.graph.variable import Variable
@@ -56,6 +61,98 @@ class TestJoinTree(unittest.TestCase):
         assert len(edges) == 1
         assert len(g.get_flattened_edges()) == 2
 
+    def test_projections(self):
+        """
+        Tests that projections are built for every clique and separation-set pair.
+        :return: None
+        """
+        bbn = BbnUtil.get_huang_graph()
+        jt = InferenceController.apply(bbn)
+
+        for sep_set in jt.get_sep_sets():
+            for clique in [sep_set.left, sep_set.right]:
+                key = (clique.id, tuple([node.id for node in sep_set.nodes]))
+                assert key in jt.projections
+
+        for node in jt.get_bbn_nodes():
+            clique = node.metadata["parent.clique"]
+            assert (clique.id, (node.id,)) in jt.projections
+
+    def test_change_type(self):
+        """
+        Tests classifying evidence changes as updates or retractions.
+        :return: None
+        """
+        bbn = BbnUtil.get_huang_graph()
+        jt = InferenceController.apply(bbn)
+        node = jt.get_bbn_node_by_name("a")
+
+        def get_evidence(ev_type, values):
+            builder = EvidenceBuilder().with_node(node).with_type(ev_type)
+            for value, likelihood in values.items():
+                builder = builder.with_evidence(value, likelihood)
+            evidence = builder.build()
+            evidence.validate()
+            return evidence
+
+        observe_on = get_evidence(EvidenceType.OBSERVATION, {"on": 1.0})
+        observe_off = get_evidence(EvidenceType.OBSERVATION, {"off": 1.0})
+        unobserve = get_evidence(EvidenceType.UNOBSERVE, {})
+
+        assert jt.get_change_type([unobserve]) == ChangeType.NONE
+        assert jt.get_change_type([observe_on]) == ChangeType.UPDATE
+
+        jt.update_evidences([observe_on])
+        assert len(jt.evidence_changes) == 0
+
+        assert jt.get_change_type([observe_on]) == ChangeType.NONE
+        assert jt.get_change_type([observe_off]) == ChangeType.RETRACTION
+        assert jt.get_change_type([unobserve]) == ChangeType.RETRACTION
+
+    def test_observe(self):
+        """
+        Tests observing a dictionary of names to values.
+        :return: None
+        """
+        bbn = BbnUtil.get_huang_graph()
+        jt = InferenceController.apply(bbn)
+        expected = InferenceController.apply(bbn)
+
+        a = jt.get_bbn_node_by_name("a")
+        assert jt.get_value_index(a, "off") == 1
+        assert jt.get_value_index(a, "maybe") is None
+        assert jt.get_bbn_node_by_name("z") is None
+
+        jt.observe({"a": "on", "f": "off"})
+        for name, value in [("a", "on"), ("f", "off")]:
+            expected.set_observation(
+                EvidenceBuilder()
+                .with_node(expected.get_bbn_node_by_name(name))
+                .with_evidence(value, 1.0)
+                .build()
+            )
+        for name, posteriors in expected.get_posteriors().items():
+            for value, p in posteriors.items():
+                self.assertAlmostEqual(p, jt.get_posteriors()[name][value])
+
+        jt.observe({"a": None, "f": "on"})
+        expected.unobserve_all()
+        expected.set_observation(
+            EvidenceBuilder()
+            .with_node(expected.get_bbn_node_by_name("f"))
+            .with_evidence("on", 1.0)
+            .build()
+        )
+        for name, posteriors in expected.get_posteriors().items():
+            for value, p in posteriors.items():
+                self.assertAlmostEqual(p, jt.get_posteriors()[name][value])
+
+        with self.assertRaises(ValueError):
+            jt.observe({"z": "on"})
+        with self.assertRaises(ValueError):
+            jt.observe({"a": "on", "f": "maybe"})
+        assert jt.get_evidence(a, "off").entries[0].value == 1.0
+
     def test_copy(self):
         """
         Tests copy of join tree.
@@ -106,6 +203,48 @@ class TestJoinTree(unittest.TestCase):
         rhs_v = list(rhs.get_nodes())[0].nodes[0].variable.values[0]
         assert lhs_v != rhs_v
 
+    def test_clone(self):
+        """
+        Tests copy-on-write clone of join tree.
+        :return: None
+        """
+        lhs = InferenceController.apply(BbnUtil.get_huang_graph())
+        rhs = lhs.clone()
+        expected = lhs.get_posteriors()
+
+        assert rhs.nodes is lhs.nodes
+        assert rhs.neighbors is lhs.neighbors
+        for k, potential in lhs.potentials.items():
+            assert rhs.potentials[k] is not potential
+            assert rhs.potentials[k].values is potential.values
+
+        ev = (
+            EvidenceBuilder()
+            .with_node(rhs.get_bbn_node_by_name("a"))
+            .with_evidence("on", 1.0)
+            .build()
+        )
+        rhs.set_observation(ev)
+
+        assert rhs.get_posteriors()["a"]["on"] == 1.0
+        assert lhs.get_posteriors() == expected
+        for k, potential in lhs.potentials.items():
+            assert rhs.potentials[k].values is not potential.values
+
+        lhs.set_observation(ev)
+        for name, posteriors in rhs.get_posteriors().items():
+            for value, p in posteriors.items():
+                self.assertAlmostEqual(p, lhs.get_posteriors()[name][value], 7)
+
+        probs = list(lhs.get_bbn_node(0).probs)
+        with self.assertRaises(ValueError):
+            rhs.update_bbn_cpts({0: [0.1, 0.9]})
+        assert lhs.get_bbn_node(0).probs == probs
+
+        jt = InferenceController.reapply(rhs, {0: [0.1, 0.9]})
+        assert not jt.is_clone
+        assert lhs.get_bbn_node(0).probs == probs
+
     def test_to_dict(self):
         """
         Tests serializing join tree to dictionary.
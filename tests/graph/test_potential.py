@@ -1,6 +1,17 @@
 import unittest
 
-from pybbn.graph.potential import Potential, PotentialEntry
+import numpy as np
+
+from pybbn.graph.node import BbnNode
+from pybbn.graph.potential import (
+    DensePotential,
+    Potential,
+    PotentialEntry,
+    PotentialUtil,
+    Projection,
+    SparsePotential,
+)
+from pybbn.graph.variable import Variable
 
 
 class TestPotential(unittest.TestCase):
@@ -97,3 +108,152 @@ class TestPotential(unittest.TestCase):
         o = potential.__str__()
         e = "0=on,1=on|1.00000\n0=on,1=off|1.00000\n0=off,1=on|1.00000\n0=off,1=off|1.00000"
         assert o == e
+
+    def test_dense_potential_entries(self):
+        """
+        Tests the entry view of a dense potential.
+        :return: None.
+        """
+        a = BbnNode(Variable(0, "a", ["on", "off"]), [0.5, 0.5])
+        b = BbnNode(Variable(1, "b", ["on", "off"]), [0.1, 0.9, 0.4, 0.6])
+
+        potential = DensePotential([a, b], [0.1, 0.9, 0.4, 0.6])
+
+        assert potential.values.shape == (2, 2)
+        o = potential.__str__()
+        e = "0=on,1=on|0.10000\n0=on,1=off|0.90000\n0=off,1=on|0.40000\n0=off,1=off|0.60000"
+        assert o == e
+
+        potential.entries[1].value = 0.5
+        assert potential.values[0, 1] == 0.5
+
+        entry = PotentialEntry().add(1, "on")
+        assert len(potential.get_matching_entries(entry)) == 2
+
+    def test_dense_potential_util(self):
+        """
+        Tests multiply, marginalize and divide of dense potentials.
+        :return: None.
+        """
+        a = BbnNode(Variable(0, "a", ["on", "off"]), [0.5, 0.5])
+        b = BbnNode(Variable(1, "b", ["on", "off", "na"]), [0.2, 0.3, 0.5])
+
+        lhs = PotentialUtil.get_potential_from_nodes([a, b])
+        PotentialUtil.multiply(lhs, DensePotential([b], [0.2, 0.3, 0.5]))
+        PotentialUtil.multiply(lhs, DensePotential([a], [0.4, 0.6]))
+
+        o = Potential.to_dict([lhs])
+        self.assertAlmostEqual(o["0=on|1=on"], 0.08)
+        self.assertAlmostEqual(o["0=off|1=na"], 0.30)
+
+        m = PotentialUtil.marginalize(lhs, [b, a])
+        assert m.node_ids == [1, 0]
+        self.assertAlmostEqual(m.values[2, 1], 0.30)
+
+        m = PotentialUtil.marginalize(lhs, [b])
+        self.assertAlmostEqual(m.values.sum(), 1.0)
+
+        d = PotentialUtil.divide(m, DensePotential([b], [0.0, 0.3, 0.5]))
+        assert list(d.values) == [0.0, 1.0, 1.0]
+
+    def test_rescale(self):
+        """
+        Tests rescaling a dense potential.
+        :return: None.
+        """
+        a = BbnNode(Variable(0, "a", ["on", "off"]), [0.5, 0.5])
+        b = BbnNode(Variable(1, "b", ["on", "off", "na"]), [0.2, 0.3, 0.5])
+
+        lhs = DensePotential([a, b], [1e-300, 2e-300, 4e-300, 0.0, 0.0, 0.0])
+        PotentialUtil.rescale(lhs)
+        assert list(lhs.values.ravel()) == [0.25, 0.5, 1.0, 0.0, 0.0, 0.0]
+        self.assertAlmostEqual(lhs.log_scale, np.log(4e-300))
+
+        PotentialUtil.multiply(lhs, DensePotential([b], [1.0, 1.0, 1.0], -1.0))
+        self.assertAlmostEqual(lhs.log_scale, np.log(4e-300) - 1.0)
+
+        m = PotentialUtil.marginalize(lhs, [a])
+        assert m.log_scale == lhs.log_scale
+        d = PotentialUtil.divide(lhs, m)
+        self.assertAlmostEqual(d.log_scale, 0.0)
+
+        PotentialUtil.normalize(m)
+        assert list(m.values) == [1.0, 0.0]
+        assert m.log_scale == 0.0
+
+        zero = DensePotential([a], [0.0, 0.0])
+        assert PotentialUtil.rescale(zero).log_scale == 0.0
+
+    def test_sparse(self):
+        """
+        Tests the sparse potential kernels against the dense ones.
+        :return: None.
+        """
+        a = BbnNode(Variable(0, "a", ["on", "off"]), [0.5, 0.5])
+        b = BbnNode(Variable(1, "b", ["on", "off", "na"]), [0.2, 0.3, 0.5])
+        c = BbnNode(Variable(2, "c", ["on", "off"]), [0.5, 0.5])
+
+        cpts = [
+            DensePotential([b, a], [1.0, 0.0, 0.0, 1.0, 0.5, 0.5]),
+            DensePotential([c, b], [0.0, 1.0, 0.0, 0.0, 0.2, 0.0]),
+        ]
+        dense = DensePotential([a, b, c])
+        for cpt in cpts:
+            PotentialUtil.multiply(dense, cpt)
+        sparse = PotentialUtil.get_sparse_product([a, b, c], cpts)
+
+        assert list(sparse.index) == list(np.flatnonzero(dense.values))
+        assert np.array_equal(sparse.values, dense.values)
+        assert PotentialUtil.get_sparse_product([a, b, c], cpts, max_cells=1) is None
+
+        for nodes in [[c, a], [b]]:
+            lhs = PotentialUtil.marginalize(sparse, nodes).values
+            rhs = PotentialUtil.marginalize(dense, nodes).values
+            assert np.array_equal(lhs, rhs)
+
+        evidence = DensePotential([c], [0.0, 0.5])
+        PotentialUtil.multiply(sparse, evidence)
+        PotentialUtil.multiply(dense, evidence)
+        assert np.array_equal(sparse.values, dense.values)
+        assert sparse.data.size == np.count_nonzero(dense.values)
+
+        m = DensePotential([a], [0.5, 0.0])
+        assert np.array_equal(
+            PotentialUtil.divide(sparse, m).values,
+            PotentialUtil.divide(dense, m).values,
+        )
+
+        shared = sparse.share()
+        PotentialUtil.normalize(shared)
+        self.assertAlmostEqual(shared.values.sum(), 1.0)
+        assert np.array_equal(sparse.values, dense.values)
+        assert np.array_equal(SparsePotential.from_dense(dense).values, dense.values)
+
+        entries = sparse.entries
+        assert [e.value for e in entries] == list(dense.values.ravel())
+        with self.assertRaises(ValueError):
+            entries[0].value = 1.0
+
+    def test_projection(self):
+        """
+        Tests marginalizing and expanding with a projection.
+        :return: None.
+        """
+        a = BbnNode(Variable(0, "a", ["on", "off"]), [0.5, 0.5])
+        b = BbnNode(Variable(1, "b", ["on", "off", "na"]), [0.2, 0.3, 0.5])
+        c = BbnNode(Variable(2, "c", ["on", "off"]), [0.5, 0.5])
+
+        potential = DensePotential([a, b, c], list(range(12)))
+        projection = Projection([a, b, c], [c, a])
+
+        assert projection.sum_axes == (1,)
+
+        o = projection.marginalize(potential.values)
+        e = PotentialUtil.marginalize(potential, [c, a])
+        assert o.shape == (2, 2)
+        assert (o == e.values).all()
+        assert o[1, 0] == 1.0 + 3.0 + 5.0
+
+        o = projection.expand(o)
+        assert o.shape == (2, 1, 2)
+        assert o[0, 0, 1] == 1.0 + 3.0 + 5.0
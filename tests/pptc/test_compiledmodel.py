@@ -0,0 +1,66 @@
+import shutil
+import tempfile
+import unittest
+
+from pybbn.graph.dag import BbnUtil
+from pybbn.graph.jointree import EvidenceBuilder
+from pybbn.pptc.compiledmodel import CompiledModel
+from pybbn.pptc.inferencecontroller import InferenceController
+
+
+class TestCompiledModel(unittest.TestCase):
+    def setUp(self):
+        """
+        Setup.
+        :return: None.
+        """
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """
+        Teardown.
+        :return: None.
+        """
+        shutil.rmtree(self.path)
+
+    def test_save_load(self):
+        """
+        Tests saving and loading a compiled model.
+        :return: None.
+        """
+        join_tree = InferenceController.apply(BbnUtil.get_huang_graph())
+        e_posteriors = join_tree.get_posteriors()
+
+        node = join_tree.get_bbn_node_by_name("a")
+        join_tree.set_observation(
+            EvidenceBuilder().with_node(node).with_evidence("on", 1.0).build()
+        )
+        CompiledModel.save(join_tree, self.path)
+
+        for mmap in [True, False]:
+            jt = CompiledModel.load(self.path, mmap=mmap)
+            self.__assert_posteriors__(e_posteriors, jt.get_posteriors())
+
+            node = jt.get_bbn_node_by_name("a")
+            jt.set_observation(
+                EvidenceBuilder().with_node(node).with_evidence("on", 1.0).build()
+            )
+            self.__assert_posteriors__(join_tree.get_posteriors(), jt.get_posteriors())
+
+            jt.unobserve_all()
+            self.__assert_posteriors__(e_posteriors, jt.get_posteriors())
+
+        jt = CompiledModel.load(self.path)
+        self.__assert_posteriors__(e_posteriors, jt.get_posteriors())
+
+    def __assert_posteriors__(self, e, o):
+        """
+        Asserts that the posteriors are equal.
+        :param e: Expected posteriors.
+        :param o: Observed posteriors.
+        :return: None.
+        """
+        assert len(e) == len(o)
+        for name, probs in e.items():
+            for value, prob in probs.items():
+                self.assertAlmostEqual(prob, o[name][value], 7)
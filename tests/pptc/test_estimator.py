@@ -0,0 +1,56 @@
+import unittest
+
+from pybbn.graph.dag import BbnUtil
+from pybbn.pptc.estimator import Estimator
+from pybbn.pptc.inferencecontroller import InferenceController
+
+
+class TestEstimator(unittest.TestCase):
+    def setUp(self):
+        """
+        Setup.
+        :return: None.
+        """
+        pass
+
+    def tearDown(self):
+        """
+        Teardown.
+        :return: None.
+        """
+        pass
+
+    def test_estimate(self):
+        """
+        Tests estimating the size of a join tree.
+        :return: None.
+        """
+        bbn = BbnUtil.get_huang_graph()
+        estimate = Estimator.estimate(bbn)
+
+        join_tree = InferenceController.apply(bbn)
+        cliques = join_tree.get_cliques()
+        sep_sets = join_tree.get_sep_sets()
+        clique_cells = sum([join_tree.potentials[c.id].values.size for c in cliques])
+        sep_set_cells = sum([join_tree.potentials[s.id].values.size for s in sep_sets])
+
+        assert len(cliques) == estimate.n_cliques
+        assert 2 == estimate.treewidth
+        assert 8 == estimate.max_clique_cells
+        assert clique_cells + sep_set_cells == estimate.total_cells
+        assert 8 * (2 * clique_cells + sep_set_cells + 8) == estimate.bytes
+        assert estimate.to_dict()["bytes"] == estimate.bytes
+
+    def test_apply_budget(self):
+        """
+        Tests applying with a memory budget.
+        :return: None.
+        """
+        bbn = BbnUtil.get_huang_graph()
+        estimate = Estimator.estimate(bbn)
+
+        join_tree = InferenceController.apply(bbn, max_bytes=estimate.bytes)
+        assert len(join_tree.get_posteriors()) == 8
+
+        with self.assertRaises(ValueError):
+            InferenceController.apply(bbn, max_bytes=estimate.bytes - 1)
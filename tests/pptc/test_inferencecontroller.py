@@ -1,12 +1,16 @@
 import unittest
+from unittest import mock
 
 from pybbn.graph.dag import Bbn, BbnUtil
 from pybbn.graph.edge import Edge, EdgeType
-from pybbn.graph.jointree import EvidenceBuilder
+from pybbn.graph.jointree import EvidenceBuilder, EvidenceType, JoinTree
 from pybbn.graph.node import BbnNode
-from pybbn.graph.potential import Potential
+from pybbn.graph.potential import Potential, SparsePotential
 from pybbn.graph.variable import Variable
+from pybbn.pptc.estimator import Estimator
 from pybbn.pptc.inferencecontroller import InferenceController
+from pybbn.pptc.initializer import Initializer
+from pybbn.pptc.propagator import Propagator
 
 
 def __validate_posterior__(expected, join_tree, debug=False):
@@ -158,6 +162,190 @@ class TestInferenceController(unittest.TestCase):
 
         # assert 1 == 2
 
+    def test_incremental_update(self):
+        """
+        Tests that incremental propagation of evidence updates matches full propagation.
+        :return: None.
+        """
+        lhs = InferenceController.apply(BbnUtil.get_huang_graph())
+        rhs = InferenceController.apply(BbnUtil.get_huang_graph())
+        rhs.set_listener(None)
+
+        updates = [
+            [("a", EvidenceType.OBSERVATION, {"on": 1.0})],
+            [("h", EvidenceType.VIRTUAL, {"on": 0.3, "off": 0.9})],
+            [("h", EvidenceType.VIRTUAL, {"on": 0.6, "off": 0.2})],
+            [
+                ("f", EvidenceType.OBSERVATION, {"off": 1.0}),
+                ("g", EvidenceType.FINDING, {"on": 1.0, "off": 1.0}),
+            ],
+        ]
+
+        for update in updates:
+            for jt in [lhs, rhs]:
+                evidences = []
+                for name, ev_type, values in update:
+                    builder = (
+                        EvidenceBuilder()
+                        .with_node(jt.get_bbn_node_by_name(name))
+                        .with_type(ev_type)
+                    )
+                    for value, likelihood in values.items():
+                        builder = builder.with_evidence(value, likelihood)
+                    evidences.append(builder.build())
+                jt.update_evidences(evidences)
+
+            Initializer.initialize(rhs)
+            Propagator.propagate(rhs)
+
+            lhs_posteriors = lhs.get_posteriors()
+            rhs_posteriors = rhs.get_posteriors()
+            for name, posteriors in rhs_posteriors.items():
+                for value, p in posteriors.items():
+                    self.assertAlmostEqual(p, lhs_posteriors[name][value], 7)
+
+    def test_lazy_distribution(self):
+        """
+        Tests that posteriors of a subset of nodes only distribute evidence to the cliques they need.
+        :return: None.
+        """
+        lhs = InferenceController.apply(BbnUtil.get_huang_graph())
+        rhs = InferenceController.apply(BbnUtil.get_huang_graph())
+        n_cliques = len(lhs.get_cliques())
+
+        observations = [
+            {"a": "on"},
+            {"h": "off", "d": "on"},
+            {"a": None},
+            {"e": "on"},
+        ]
+
+        for i, observation in enumerate(observations):
+            lhs.observe(observation)
+            rhs.observe(observation)
+
+            names = ["h"] if i % 2 == 0 else ["c", "g"]
+            o = lhs.get_posterior_arrays(names)
+            assert list(o.keys()) == names
+            if lhs.fresh is not None:
+                assert len(lhs.fresh) < n_cliques
+
+            e = rhs.get_posteriors()
+            for name in names:
+                for j, p in enumerate(e[name].values()):
+                    self.assertAlmostEqual(p, o[name][j], 7)
+                for value, p in lhs.get_posteriors([name])[name].items():
+                    self.assertAlmostEqual(p, e[name][value], 7)
+
+        assert len(lhs.get_posteriors()) == 8
+        assert len(lhs.fresh) == n_cliques
+
+        with self.assertRaises(ValueError):
+            lhs.get_posteriors(["z"])
+
+    def test_get_potentials(self):
+        """
+        Tests that the potentials of a lazily propagated join tree are brought up to date when requested.
+        :return: None.
+        """
+        lhs = InferenceController.apply(BbnUtil.get_huang_graph())
+        rhs = InferenceController.apply(BbnUtil.get_huang_graph())
+
+        lhs.observe({"a": "on", "f": "off"})
+        lhs.get_posteriors(["a"])
+        assert len(lhs.fresh) < len(lhs.get_cliques())
+
+        rhs.observe({"a": "on", "f": "off"})
+        rhs.get_posteriors()
+
+        potentials = lhs.get_potentials()
+        assert len(lhs.fresh) == len(lhs.get_cliques())
+        for k, p in rhs.potentials.items():
+            expected = p.values / p.values.sum()
+            observed = potentials[k].values / potentials[k].values.sum()
+            for e, o in zip(expected.ravel(), observed.ravel()):
+                self.assertAlmostEqual(e, o, 7)
+
+    def test_retraction(self):
+        """
+        Tests that retracting evidence from the initial snapshot matches a full initialization.
+        :return: None.
+        """
+        lhs = InferenceController.apply(BbnUtil.get_huang_graph())
+        rhs = InferenceController.apply(BbnUtil.get_huang_graph())
+        rhs.set_listener(None)
+
+        for name, value in [("a", "on"), ("f", "off"), ("a", "off"), ("h", "on")]:
+            for jt in [lhs, rhs]:
+                ev = (
+                    EvidenceBuilder()
+                    .with_node(jt.get_bbn_node_by_name(name))
+                    .with_evidence(value, 1.0)
+                    .build()
+                )
+                jt.set_observation(ev)
+
+            Initializer.initialize(rhs)
+            Propagator.propagate(rhs)
+
+            lhs_posteriors = lhs.get_posteriors()
+            rhs_posteriors = rhs.get_posteriors()
+            for name, posteriors in rhs_posteriors.items():
+                for value, p in posteriors.items():
+                    self.assertAlmostEqual(p, lhs_posteriors[name][value], 7)
+
+        initial_potentials = lhs.initial_potentials
+        lhs.unobserve_all()
+        assert lhs.initial_potentials is initial_potentials
+        __validate_posterior__(
+            {
+                "a": [0.5, 0.5],
+                "b": [0.45, 0.55],
+                "c": [0.45, 0.55],
+                "d": [0.68, 0.32],
+                "e": [0.465, 0.535],
+                "f": [0.176, 0.824],
+                "g": [0.415, 0.585],
+                "h": [0.823, 0.177],
+            },
+            lhs,
+        )
+
+    def test_batch_posteriors(self):
+        """
+        Tests batched posterior queries against one query per row.
+        :return: None.
+        """
+        join_tree = InferenceController.apply(BbnUtil.get_huang_graph())
+        rows = [
+            {"a": "on", "f": None, "h": "off"},
+            {"a": None, "f": "on", "h": None},
+            {"a": None, "f": None, "h": None},
+            {"a": "off", "f": "off", "h": "on"},
+        ]
+
+        o = InferenceController.get_batch_posteriors(join_tree, rows, batch_size=3)
+
+        for i, row in enumerate(rows):
+            join_tree.unobserve_all()
+            for name, value in row.items():
+                if value is not None:
+                    ev = (
+                        EvidenceBuilder()
+                        .with_node(join_tree.get_bbn_node_by_name(name))
+                        .with_evidence(value, 1.0)
+                        .build()
+                    )
+                    join_tree.set_observation(ev)
+
+            for name, posteriors in join_tree.get_posteriors().items():
+                assert o[name].shape == (len(rows), 2)
+                for j, p in enumerate(posteriors.values()):
+                    self.assertAlmostEqual(p, o[name][i, j], 7)
+
+        with self.assertRaises(ValueError):
+            InferenceController.get_batch_posteriors(join_tree, [{"a": "maybe"}])
+
     def test_huang_inference(self):
         """
         Tests inference on the Huang graph.
@@ -707,6 +895,45 @@ class TestInferenceController(unittest.TestCase):
             assert k in rhs_d
             self.assertAlmostEqual(prob, rhs_d[k], 3)
 
+    def test_reapply_partial(self):
+        """
+        Tests reapplying new CPTs to a few nodes of a join tree with evidence.
+        :return: None.
+        """
+        lhs = InferenceController.apply(BbnUtil.get_huang_graph())
+        ev = (
+            EvidenceBuilder()
+            .with_node(lhs.get_bbn_node_by_name("a"))
+            .with_evidence("on", 1.0)
+            .build()
+        )
+        lhs.set_observation(ev)
+        posteriors = lhs.get_posteriors()
+
+        assert lhs.sparse
+        assert not any(
+            [isinstance(p, SparsePotential) for p in lhs.initial_potentials.values()]
+        )
+
+        cpts = {3: [0.2, 0.8, 0.7, 0.3], 7: [0.1, 0.9, 0.5, 0.5, 0.3, 0.7, 0.8, 0.2]}
+        with mock.patch.object(
+            Initializer, "update_cpts", wraps=Initializer.update_cpts
+        ) as update_cpts:
+            rhs = InferenceController.reapply(lhs, cpts)
+        assert 1 == update_cpts.call_count
+
+        bbn = BbnUtil.get_huang_graph()
+        for node_id, cpt in cpts.items():
+            bbn.get_node(node_id).probs = cpt
+        e = InferenceController.apply(bbn).get_posteriors()
+        o = rhs.get_posteriors()
+
+        for name, p in e.items():
+            for value, prob in p.items():
+                self.assertAlmostEqual(prob, o[name][value], 7)
+
+        assert lhs.get_posteriors() == posteriors
+
     def test_six_values_parents(self):
         """
         Tests inference on simple graph having a parent with 6 values.
@@ -749,3 +976,140 @@ class TestInferenceController(unittest.TestCase):
         __validate_posterior__(expected, join_tree)
 
         __print_potentials__(join_tree)
+
+    def test_scaled(self):
+        """
+        Tests inference on a long chain where the probability of the evidence underflows.
+        :return: None.
+        """
+        n = 200
+        nodes = [BbnNode(Variable(0, "n0", ["on", "off"]), [0.5, 0.5])]
+        for i in range(1, n):
+            nodes.append(
+                BbnNode(Variable(i, f"n{i}", ["on", "off"]), [0.01, 0.99, 0.99, 0.01])
+            )
+        bbn = Bbn()
+        for node in nodes:
+            bbn.add_node(node)
+        for i in range(1, n):
+            bbn.add_edge(Edge(nodes[i - 1], nodes[i], EdgeType.DIRECTED))
+
+        rows = [{f"n{i}": "on" for i in range(n - 1)}]
+        expected = {"on": 0.01, "off": 0.99}
+
+        join_tree = InferenceController.apply(bbn)
+        join_tree.update_evidences(
+            [
+                EvidenceBuilder()
+                .with_node(join_tree.get_bbn_node_by_name(name))
+                .with_evidence(value, 1.0)
+                .build()
+                for name, value in rows[0].items()
+            ]
+        )
+        assert 0.0 == sum(join_tree.get_posteriors()[f"n{n - 1}"].values())
+
+        join_tree = InferenceController.apply(bbn, scaled=True)
+        o = InferenceController.get_batch_posteriors(join_tree, rows)
+        self.assertAlmostEqual(o[f"n{n - 1}"][0, 0], expected["on"])
+        self.assertAlmostEqual(o[f"n{n - 1}"][0, 1], expected["off"])
+
+        join_tree.update_evidences(
+            [
+                EvidenceBuilder()
+                .with_node(join_tree.get_bbn_node_by_name(name))
+                .with_evidence(value, 1.0)
+                .build()
+                for name, value in rows[0].items()
+            ]
+        )
+        posteriors = join_tree.get_posteriors()[f"n{n - 1}"]
+        for value, p in expected.items():
+            self.assertAlmostEqual(posteriors[value], p)
+
+    def test_sparse(self):
+        """
+        Tests inference with sparse potentials on a network of logical gates.
+        :return: None.
+        """
+
+        def get_bbn():
+            nodes = [
+                BbnNode(
+                    Variable(i, f"r{i}", ["f", "t"]), [0.3 + 0.1 * i, 0.7 - 0.1 * i]
+                )
+                for i in range(4)
+            ]
+            gates = [
+                ("or", [0, 1, 2]),
+                ("and", [1, 2, 3]),
+                ("xor", [0, 3, 4]),
+                ("or", [4, 5, 6]),
+                ("and", [2, 5, 7]),
+            ]
+            ops = {"or": any, "and": all, "xor": lambda x: sum(x) % 2 == 1}
+            for name, parents in gates:
+                probs = []
+                for i in range(8):
+                    bits = [(i >> (2 - j)) & 1 for j in range(3)]
+                    probs.extend([0.0, 1.0] if ops[name](bits) else [1.0, 0.0])
+                i = len(nodes)
+                nodes.append(BbnNode(Variable(i, f"g{i}", ["f", "t"]), probs))
+
+            bbn = Bbn()
+            for node in nodes:
+                bbn.add_node(node)
+            for i, (_, parents) in enumerate(gates):
+                for pa_id in parents:
+                    bbn.add_edge(Edge(nodes[pa_id], nodes[4 + i], EdgeType.DIRECTED))
+            return bbn
+
+        bbn = get_bbn()
+        dense = InferenceController.apply(get_bbn(), sparse=False)
+        sparse = InferenceController.apply(bbn)
+        serde = InferenceController.apply_from_serde(
+            JoinTree.from_dict(JoinTree.to_dict(sparse, bbn)), scaled=True
+        )
+
+        assert any(
+            [
+                isinstance(sparse.potentials[clique.id], SparsePotential)
+                for clique in sparse.get_cliques()
+            ]
+        )
+        assert Estimator.get_compression(sparse)["ratio"] < 1.0
+        assert Estimator.get_compression(dense)["ratio"] == 1.0
+        assert serde.scaled and serde.sparse
+        assert (
+            Estimator.get_compression(serde)["ratio"]
+            == Estimator.get_compression(sparse)["ratio"]
+        )
+
+        requests = [
+            {"g7": "t"},
+            {"g7": "t", "r0": "f"},
+            {"g8": "f"},
+            {"g7": None, "g8": None, "r0": None, "g6": "t"},
+        ]
+        for observations in requests:
+            dense.observe(observations)
+            sparse.observe(observations)
+            serde.observe(observations)
+            lhs = dense.get_posterior_arrays()
+            for rhs in [sparse.get_posterior_arrays(), serde.get_posterior_arrays()]:
+                for name in lhs.keys():
+                    for p, q in zip(lhs[name], rhs[name]):
+                        self.assertAlmostEqual(p, q)
+
+        with mock.patch.object(
+            Initializer, "update_cpts", wraps=Initializer.update_cpts
+        ) as update_cpts:
+            dense = InferenceController.reapply(dense, {0: [0.9, 0.1]})
+            sparse = InferenceController.reapply(sparse, {0: [0.9, 0.1]})
+        assert 1 == update_cpts.call_count
+
+        lhs = dense.get_posterior_arrays()
+        rhs = sparse.get_posterior_arrays()
+        for name in lhs.keys():
+            for p, q in zip(lhs[name], rhs[name]):
+                self.assertAlmostEqual(p, q)
@@ -0,0 +1,114 @@
+import unittest
+
+from pybbn.graph.dag import BbnUtil
+from pybbn.graph.jointree import EvidenceBuilder, EvidenceType
+from pybbn.pptc.inferencecontroller import InferenceController
+from pybbn.pptc.lazypropagation import LazyPropagation
+from pybbn.pptc.triangulator import Heuristic
+
+
+class TestLazyPropagation(unittest.TestCase):
+    def setUp(self):
+        """
+        Setup.
+        :return: None.
+        """
+        pass
+
+    def tearDown(self):
+        """
+        Teardown.
+        :return: None.
+        """
+        pass
+
+    def __assert_posteriors__(self, expected, engine, names=None):
+        """
+        Asserts that the posteriors of the lazy propagation engine match the ones of the join tree.
+        :param expected: Join tree.
+        :param engine: Lazy propagation engine.
+        :param names: Names of the nodes (optional).
+        :return: None.
+        """
+        e = expected.get_posterior_arrays(names)
+        o = engine.get_posterior_arrays(names)
+        self.assertEqual(set(e.keys()), set(o.keys()))
+        for name in e.keys():
+            for lhs, rhs in zip(e[name], o[name]):
+                self.assertAlmostEqual(lhs, rhs, places=10)
+
+    def test_lazy_propagation(self):
+        """
+        Tests lazy propagation against Hugin propagation, with and without evidence.
+        :return: None.
+        """
+        for elimination in list(Heuristic):
+            expected = InferenceController.apply(BbnUtil.get_huang_graph())
+            engine = LazyPropagation(BbnUtil.get_huang_graph(), elimination=elimination)
+            self.__assert_posteriors__(expected, engine)
+
+            requests = [
+                {"a": "on"},
+                {"a": "on", "f": "off"},
+                {"h": {"on": 0.2, "off": 0.8}},
+                {"a": None, "c": "on"},
+                {"f": None, "h": None, "c": None},
+            ]
+            for evidences in requests:
+                for name, value in evidences.items():
+                    if isinstance(value, dict):
+                        builder = (
+                            EvidenceBuilder()
+                            .with_node(expected.get_bbn_node_by_name(name))
+                            .with_type(EvidenceType.VIRTUAL)
+                        )
+                        for v, likelihood in value.items():
+                            builder = builder.with_evidence(v, likelihood)
+                        expected.update_evidences([builder.build()])
+                    else:
+                        expected.observe({name: value})
+                engine.observe(evidences)
+                self.__assert_posteriors__(expected, engine, ["b", "d", "g"])
+            self.__assert_posteriors__(expected, engine)
+
+            engine.unobserve_all()
+            expected.unobserve_all()
+            self.__assert_posteriors__(expected, engine)
+
+    def test_observe(self):
+        """
+        Tests invalid observations.
+        :return: None.
+        """
+        engine = LazyPropagation(BbnUtil.get_huang_graph())
+        with self.assertRaises(ValueError):
+            engine.observe({"z": "on"})
+        with self.assertRaises(ValueError):
+            engine.observe({"a": "maybe"})
+        with self.assertRaises(ValueError):
+            engine.get_posteriors(["z"])
+
+    def test_virtual_evidence(self):
+        """
+        Tests that virtual evidence outside of [0, 1] is clamped as the join tree does.
+        :return: None.
+        """
+        expected = InferenceController.apply(BbnUtil.get_huang_graph())
+        engine = LazyPropagation(BbnUtil.get_huang_graph())
+
+        requests = [
+            {"h": {"on": 1.5, "off": 0.5}},
+            {"a": {"on": -0.2, "off": 0.7}, "h": {"on": 0.3, "off": 2.0}},
+        ]
+        for evidences in requests:
+            for name, value in evidences.items():
+                builder = (
+                    EvidenceBuilder()
+                    .with_node(expected.get_bbn_node_by_name(name))
+                    .with_type(EvidenceType.VIRTUAL)
+                )
+                for v, likelihood in value.items():
+                    builder = builder.with_evidence(v, likelihood)
+                expected.update_evidences([builder.build()])
+            engine.observe(evidences)
+            self.__assert_posteriors__(expected, engine)
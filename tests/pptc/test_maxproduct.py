@@ -0,0 +1,100 @@
+import itertools
+import unittest
+
+from pybbn.graph.dag import BbnUtil
+from pybbn.pptc.inferencecontroller import InferenceController
+from pybbn.pptc.maxproduct import MaxProduct
+
+
+class TestMaxProduct(unittest.TestCase):
+    def setUp(self):
+        """
+        Setup.
+        :return: None.
+        """
+        pass
+
+    def tearDown(self):
+        """
+        Teardown.
+        :return: None.
+        """
+        pass
+
+    @staticmethod
+    def __get_joints__(join_tree, evidences):
+        """
+        Gets the joint probability of every assignment of the BBN nodes consistent with the evidence.
+        :param join_tree: Join tree.
+        :param evidences: Dictionary. Keys are node names and values are the observed values.
+        :return: List of tuples (assignment, probability).
+        """
+        nodes = join_tree.get_bbn_nodes()
+        joints = []
+        for values in itertools.product(*[n.variable.values for n in nodes]):
+            assignment = {n.variable.name: v for n, v in zip(nodes, values)}
+            if any([assignment[k] != v for k, v in evidences.items()]):
+                continue
+
+            p = 1.0
+            for node in nodes:
+                index = tuple(
+                    [
+                        join_tree.get_value_index(n, assignment[n.variable.name])
+                        for n in node.potential.nodes
+                    ]
+                )
+                p *= node.potential.values[index]
+            joints.append((assignment, p))
+        return joints
+
+    def test_mpe(self):
+        """
+        Tests the most probable explanation against enumeration.
+        :return: None.
+        """
+        join_tree = InferenceController.apply(BbnUtil.get_huang_graph())
+
+        for evidences in [{}, {"a": "on"}, {"h": "on", "c": "off"}]:
+            join_tree.unobserve_all()
+            join_tree.observe(evidences)
+            assignment, p = MaxProduct.get_mpe(join_tree)
+
+            expected = max(
+                TestMaxProduct.__get_joints__(join_tree, evidences), key=lambda t: t[1]
+            )
+            self.assertEqual(expected[0], assignment)
+            self.assertAlmostEqual(expected[1], p, places=10)
+
+    def test_map(self):
+        """
+        Tests partial MAP against enumeration.
+        :return: None.
+        """
+        join_tree = InferenceController.apply(BbnUtil.get_huang_graph())
+
+        requests = [
+            ({}, ["a", "b"]),
+            ({}, ["e", "g", "h"]),
+            ({"a": "on"}, ["e", "g", "h"]),
+            ({"h": "on", "c": "off"}, ["a", "b"]),
+            ({"f": "off", "g": "on"}, ["c", "d"]),
+            ({"f": "on"}, ["f", "h"]),
+            ({"h": "on"}, ["a", "b", "c", "d", "e", "f", "g", "h"]),
+        ]
+        for evidences, names in requests:
+            join_tree.unobserve_all()
+            join_tree.observe(evidences)
+            assignment, p = MaxProduct.get_map(join_tree, names)
+
+            scores = dict()
+            for joint, q in TestMaxProduct.__get_joints__(join_tree, evidences):
+                key = tuple([joint[name] for name in names])
+                scores[key] = scores.get(key, 0.0) + q
+            expected = max(scores, key=scores.get)
+
+            self.assertEqual(expected, tuple([assignment[name] for name in names]))
+            self.assertAlmostEqual(scores[expected], p, places=10)
+
+        with self.assertRaises(ValueError):
+            MaxProduct.get_map(join_tree, ["z"])
@@ -0,0 +1,94 @@
+import unittest
+
+from pybbn.graph.dag import BbnUtil
+from pybbn.graph.jointree import EvidenceBuilder, EvidenceType
+from pybbn.pptc.inferencecontroller import InferenceController
+from pybbn.pptc.posteriorcache import PosteriorCache
+
+
+class TestPosteriorCache(unittest.TestCase):
+    def setUp(self):
+        """
+        Setup.
+        :return: None.
+        """
+        pass
+
+    def tearDown(self):
+        """
+        Teardown.
+        :return: None.
+        """
+        pass
+
+    def test_get_posteriors(self):
+        """
+        Tests getting cached posteriors.
+        :return: None.
+        """
+        bbn = BbnUtil.get_huang_graph()
+        cache = PosteriorCache(InferenceController.apply(bbn), max_size=2)
+        expected = InferenceController.apply(bbn)
+
+        requests = [
+            {"a": "on"},
+            {"a": "on", "b": None},
+            {"h": {"on": 0.2, "off": 0.8}, "a": "off"},
+            {"a": "on"},
+            {"e": {"on": 1.0, "off": 1.0}},
+            {"a": "off", "h": {"off": 0.8, "on": 0.2}},
+        ]
+        for evidences in requests:
+            o = cache.get_posteriors(evidences, names=["c", "g"])
+            assert list(o.keys()) == ["c", "g"]
+
+            expected.unobserve_all()
+            for name, value in evidences.items():
+                if value is None:
+                    continue
+                builder = EvidenceBuilder().with_node(
+                    expected.get_bbn_node_by_name(name)
+                )
+                if isinstance(value, dict):
+                    builder = builder.with_type(EvidenceType.VIRTUAL)
+                    for v, likelihood in value.items():
+                        builder = builder.with_evidence(v, likelihood)
+                else:
+                    builder = builder.with_evidence(value, 1.0)
+                expected.update_evidences([builder.build()])
+            e = expected.get_posterior_arrays(["c", "g"])
+            for name in ["c", "g"]:
+                for lhs, rhs in zip(o[name], e[name]):
+                    self.assertAlmostEqual(lhs, rhs, 7)
+
+        assert 2 == cache.hits
+        assert 4 == cache.misses
+        assert 2 == len(cache)
+
+        o = cache.get_posteriors({"a": "off", "h": {"on": 0.2, "off": 0.8}})
+        assert 8 == len(o)
+        assert 5 == cache.misses
+        assert not o["c"].flags.writeable
+
+        with self.assertRaises(ValueError):
+            cache.get_posteriors({"z": "on"})
+        with self.assertRaises(ValueError):
+            cache.get_posteriors({"a": "maybe"})
+
+    def test_invalidation(self):
+        """
+        Tests that new CPTs invalidate the cache.
+        :return: None.
+        """
+        bbn = BbnUtil.get_huang_graph()
+        cache = PosteriorCache(InferenceController.apply(bbn))
+
+        before = cache.get_posteriors({"c": "on"}, names=["a"])["a"]
+        cache.reapply({0: [0.1, 0.9]})
+        after = cache.get_posteriors({"c": "on"}, names=["a"])["a"]
+        assert 1 == len(cache)
+        assert before[0] != after[0]
+
+        cache.join_tree.update_bbn_cpts({0: [0.1, 0.9]})
+        cache.get_posteriors({"c": "on"}, names=["a"])
+        assert 3 == cache.misses
@@ -123,3 +123,38 @@ class TestPropagator(unittest.TestCase):
             rhs = e_potentials[k]
 
             assert lhs == rhs
+
+    def test_schedule(self):
+        """
+        Tests the compiled message passing schedule.
+        :return: None.
+        """
+        bbn = BbnUtil.get_huang_graph()
+        PotentialInitializer.init(bbn)
+
+        ug = Moralizer.moralize(bbn)
+        cliques = Triangulator.triangulate(ug)
+
+        join_tree = Transformer.transform(cliques)
+
+        schedule = Propagator.get_schedule(join_tree)
+        collect, distribute = schedule.collect, schedule.distribute
+        root = sorted(join_tree.get_cliques(), key=lambda c: c.id)[0]
+
+        assert len(collect) == len(join_tree.get_sep_sets())
+        assert len(distribute) == len(join_tree.get_sep_sets())
+        assert collect[-1][2].id == root.id
+        assert distribute[0][0].id == root.id
+        assert Propagator.get_schedule(join_tree) is join_tree.schedule
+
+        # every clique sends its collect message only after it received all of its own
+        sent = set()
+        for x, _, y in collect:
+            assert y.id not in sent
+            sent.add(x.id)
+
+        # every clique receives its distribute message before it sends any
+        received = {root.id}
+        for x, _, y in distribute:
+            assert x.id in received
+            received.add(y.id)
@@ -0,0 +1,104 @@
+import unittest
+
+from pybbn.graph.dag import BbnUtil
+from pybbn.graph.jointree import EvidenceBuilder, EvidenceType
+from pybbn.pptc.inferencecontroller import InferenceController
+from pybbn.pptc.querypruner import QueryPruner
+
+
+class TestQueryPruner(unittest.TestCase):
+    def setUp(self):
+        """
+        Setup.
+        :return: None.
+        """
+        pass
+
+    def tearDown(self):
+        """
+        Teardown.
+        :return: None.
+        """
+        pass
+
+    def test_requisite_nodes(self):
+        """
+        Tests finding the requisite nodes with Bayes-ball.
+        :return: None.
+        """
+        bbn = BbnUtil.get_huang_graph()
+
+        nodes, observed, soft = QueryPruner.get_requisite_nodes(bbn, [3], set())
+        assert {0, 1, 3} == nodes
+        assert set() == observed
+
+        nodes, observed, soft = QueryPruner.get_requisite_nodes(bbn, [0], {5})
+        assert {0, 1, 2, 3, 4, 5} == nodes
+        assert {5} == observed
+
+        nodes, observed, soft = QueryPruner.get_requisite_nodes(bbn, [3], {1}, {7})
+        assert {3} == nodes
+        assert {1} == observed
+        assert set() == soft
+
+        nodes, observed, soft = QueryPruner.get_requisite_nodes(bbn, [3], set(), {5})
+        assert {0, 1, 2, 3, 4, 5} == nodes
+        assert {5} == soft
+
+        nodes, observed, soft = QueryPruner.get_requisite_nodes(bbn, [5], {3, 4}, {0})
+        assert {5} == nodes
+        assert {3, 4} == observed
+        assert set() == soft
+
+        sub_bbn = QueryPruner.get_sub_bbn(bbn, {5}, {3, 4})
+        assert 3 == len(sub_bbn.get_nodes())
+        assert [0.5, 0.5] == sub_bbn.get_node(3).probs
+
+        nodes, observed, soft = QueryPruner.get_requisite_nodes(bbn, [3, 7], {1, 2})
+        assert {3, 4, 6, 7} == nodes
+        assert {1, 2} == observed
+
+    def test_get_posteriors(self):
+        """
+        Tests getting posteriors on the pruned sub-networks.
+        :return: None.
+        """
+        bbn = BbnUtil.get_huang_graph()
+        pruner = QueryPruner(bbn)
+        join_tree = InferenceController.apply(bbn)
+
+        queries = [
+            ({"f": "on"}, ["a", "h"]),
+            ({"b": "off", "h": {"on": 0.3, "off": 0.9}}, ["d"]),
+            ({"d": "on", "e": "off", "a": {"on": 0.2, "off": 0.6}}, ["f", "a"]),
+            ({"f": "off"}, ["a", "h"]),
+            ({"c": "on"}, ["d", "g"]),
+            ({"c": "on", "b": "on"}, ["d", "h"]),
+        ]
+        for evidences, names in queries:
+            o = pruner.get_posteriors(evidences, names)
+
+            join_tree.unobserve_all()
+            for name, value in evidences.items():
+                builder = EvidenceBuilder().with_node(
+                    join_tree.get_bbn_node_by_name(name)
+                )
+                if isinstance(value, dict):
+                    builder = builder.with_type(EvidenceType.VIRTUAL)
+                    for v, likelihood in value.items():
+                        builder = builder.with_evidence(v, likelihood)
+                else:
+                    builder = builder.with_evidence(value, 1.0)
+                join_tree.update_evidences([builder.build()])
+            e = join_tree.get_posterior_arrays(names)
+
+            assert list(o.keys()) == names
+            for name in names:
+                for lhs, rhs in zip(o[name], e[name]):
+                    self.assertAlmostEqual(lhs, rhs, 7)
+
+        assert 5 == pruner.misses
+        assert 1 == pruner.hits
+
+        with self.assertRaises(ValueError):
+            pruner.get_posteriors({"z": "on"}, ["a"])
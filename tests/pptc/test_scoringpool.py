@@ -0,0 +1,47 @@
+import unittest
+
+from pybbn.graph.dag import BbnUtil
+from pybbn.pptc.inferencecontroller import InferenceController
+from pybbn.pptc.scoringpool import ScoringPool
+
+
+class TestScoringPool(unittest.TestCase):
+    def setUp(self):
+        """
+        Setup.
+        :return: None.
+        """
+        pass
+
+    def tearDown(self):
+        """
+        Teardown.
+        :return: None.
+        """
+        pass
+
+    def test_get_posteriors(self):
+        """
+        Tests scoring evidence rows with worker processes.
+        :return: None.
+        """
+        bbn = BbnUtil.get_huang_graph()
+        join_tree = InferenceController.apply(bbn)
+        rows = [
+            {"a": "on", "f": None},
+            {"a": None, "f": "on"},
+            {"a": None, "f": None},
+            {"a": "off", "f": "off"},
+            {"a": "on", "f": "off"},
+        ]
+
+        e = InferenceController.get_batch_posteriors(join_tree, rows)
+
+        with ScoringPool(bbn, n_workers=2, chunk_size=2, join_tree=join_tree) as pool:
+            o = pool.get_posteriors(rows)
+
+        assert len(o) == len(e)
+        for name, posteriors in e.items():
+            assert o[name].shape == posteriors.shape
+            for lhs, rhs in zip(o[name].ravel(), posteriors.ravel()):
+                self.assertAlmostEqual(lhs, rhs, 7)
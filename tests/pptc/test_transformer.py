@@ -1,6 +1,15 @@
 import unittest
 
+import numpy as np
+
+from pybbn.generator.bbngenerator import (
+    convert_for_exact_inference,
+    generate_multi_bbn,
+)
 from pybbn.graph.dag import BbnUtil
+from pybbn.graph.edge import JtEdge
+from pybbn.graph.jointree import JoinTree
+from pybbn.graph.node import SepSet
 from pybbn.pptc.moralizer import Moralizer
 from pybbn.pptc.potentialinitializer import PotentialInitializer
 from pybbn.pptc.transformer import Transformer
@@ -71,3 +80,38 @@ class TestTransformer(unittest.TestCase):
         assert len(e_edges) == len(o_edges)
         for e in e_edges:
             assert e in o_edges
+
+    def test_spanning_tree(self):
+        """
+        Tests that the spanning tree is the same as the one built with path detection over all pairs.
+        :return: None.
+        """
+        np.random.seed(37)
+        g, p = generate_multi_bbn(50, max_iter=20)
+        bbn = convert_for_exact_inference(g, p)
+        PotentialInitializer.init(bbn)
+
+        ug = Moralizer.moralize(bbn)
+        cliques = Triangulator.triangulate(ug)
+
+        sep_sets = [
+            SepSet(lhs, rhs)
+            for i, lhs in enumerate(cliques)
+            for rhs in cliques[i + 1 :]
+            if lhs.intersects(rhs)[0]
+        ]
+        sep_sets = sorted(sep_sets, key=lambda x: (-1 * x.mass, x.cost, x.id))
+
+        e_tree = JoinTree()
+        for clique in cliques:
+            e_tree.add_node(clique)
+        for sep_set in sep_sets:
+            e_tree.add_edge(JtEdge(sep_set))
+
+        o_tree = Transformer.transform(cliques)
+
+        assert [s.id for s in sep_sets] == [
+            s.id for s in Transformer.get_sep_sets(cliques)
+        ]
+        assert len(o_tree.get_edges()) == len(cliques) - 1
+        assert sorted(e_tree.edges.keys()) == sorted(o_tree.edges.keys())
@@ -1,9 +1,17 @@
 import unittest
 
+import numpy as np
+
+from pybbn.generator.bbngenerator import (
+    convert_for_exact_inference,
+    generate_multi_bbn,
+)
 from pybbn.graph.dag import BbnUtil
+from pybbn.graph.node import Clique
+from pybbn.pptc.inferencecontroller import InferenceController
 from pybbn.pptc.moralizer import Moralizer
 from pybbn.pptc.potentialinitializer import PotentialInitializer
-from pybbn.pptc.triangulator import Triangulator
+from pybbn.pptc.triangulator import Heuristic, Triangulator
 
 
 class TestTriangulator(unittest.TestCase):
@@ -41,3 +49,52 @@ class TestTriangulator(unittest.TestCase):
         assert len(e_cliques) == len(o_cliques)
         for c in e_cliques:
             assert c in o_cliques
+
+    def test_default_heuristic(self):
+        """
+        Tests that the default heuristic eliminates nodes in the same order as a full re-sort.
+        :return: None.
+        """
+        np.random.seed(37)
+        g, p = generate_multi_bbn(50, max_iter=20)
+        bbn = convert_for_exact_inference(g, p)
+        PotentialInitializer.init(bbn)
+
+        ug = Moralizer.moralize(bbn)
+        mm = Triangulator.duplicate(ug)
+        e_cliques = []
+        while len(mm.get_nodes()) > 0:
+            node_clique = Triangulator.select_node(mm)
+            clique = Clique(node_clique.get_bbn_nodes())
+            if not Triangulator.is_subset(e_cliques, clique):
+                e_cliques.append(clique)
+            mm.remove_node(node_clique.node.id)
+            for edge in node_clique.edges:
+                mm.add_edge(edge)
+
+        o_cliques = Triangulator.triangulate(Moralizer.moralize(bbn))
+
+        assert [[n.id for n in c.nodes] for c in e_cliques] == [
+            [n.id for n in c.nodes] for c in o_cliques
+        ]
+
+    def test_heuristics(self):
+        """
+        Tests that every heuristic produces cliques covering every family and consistent posteriors.
+        :return: None.
+        """
+        bbn = BbnUtil.get_huang_graph()
+        e_posteriors = InferenceController.apply(bbn).get_posteriors()
+
+        for heuristic in Heuristic:
+            PotentialInitializer.init(bbn)
+            cliques = Triangulator.triangulate(Moralizer.moralize(bbn), heuristic)
+
+            for node in bbn.get_nodes():
+                family = set([node.id] + bbn.get_parents_ordered(node.id))
+                assert any(c.get_node_ids().issuperset(family) for c in cliques)
+
+            o_posteriors = InferenceController.apply(bbn, heuristic).get_posteriors()
+            for name, probs in e_posteriors.items():
+                for value, prob in probs.items():
+                    self.assertAlmostEqual(prob, o_posteriors[name][value], places=7)
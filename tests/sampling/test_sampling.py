@@ -10,7 +10,12 @@ from pybbn.graph.jointree import EvidenceBuilder
 from pybbn.graph.node import BbnNode
 from pybbn.graph.variable import Variable
 from pybbn.pptc.inferencecontroller import InferenceController
-from pybbn.sampling.sampling import LogicSampler, Table
+from pybbn.sampling.sampling import (
+    GibbsSampler,
+    LikelihoodWeightingSampler,
+    LogicSampler,
+    Table,
+)
 
 
 class TestSampling(unittest.TestCase):
@@ -316,3 +321,178 @@ class TestSampling(unittest.TestCase):
         assert_almost_equal(
             s_c, np.array([posteriors["c"]["off"], posteriors["c"]["on"]]), decimal=1
         )
+
+    def test_table_codes(self):
+        """
+        Tests getting the value indices of many probabilities at once.
+        :return: None.
+        """
+        a = BbnNode(Variable(0, "a", ["on", "off"]), [0.5, 0.5])
+        b = BbnNode(Variable(1, "b", ["x", "y", "z"]), [0.2, 0.3, 0.5])
+        c = BbnNode(
+            Variable(2, "c", ["on", "off"]),
+            [0.7, 0.3, 0.2, 0.8, 0.1, 0.9, 0.6, 0.4, 0.5, 0.5, 0.0, 1.0],
+        )
+        table = Table(c, parents=[a, b])
+
+        probs = np.random.default_rng(37).random(1000)
+        pa_codes = [np.arange(1000) % 2, np.arange(1000) % 3]
+
+        e_codes = [
+            c.variable.values.index(
+                table.get_value(
+                    p, sample={0: a.variable.values[i], 1: b.variable.values[j]}
+                )
+            )
+            for p, i, j in zip(probs, *pa_codes)
+        ]
+        o_codes = table.get_codes(probs, pa_codes)
+
+        assert_almost_equal(e_codes, o_codes)
+        assert_almost_equal(
+            [b.variable.values.index(Table(b).get_value(p)) for p in probs],
+            Table(b).get_codes(probs),
+        )
+
+    def test_batch_sampling(self):
+        """
+        Tests sampling in batches, with and without evidence.
+        :return: None.
+        """
+        bbn = BbnUtil.get_huang_graph()
+        sampler = LogicSampler(bbn)
+        join_tree = InferenceController.apply(bbn)
+
+        samples = sampler.get_batch_samples(n_samples=20000, seed=37)
+        codes = sampler.get_batch_samples(n_samples=20000, seed=37, as_codes=True)
+
+        assert (20000, 8) == samples.shape
+        assert (20000, 8) == codes.shape
+        assert list(range(8)) == list(samples.columns)
+
+        for evidence in [{}, {0: "on", 7: "off"}]:
+            join_tree.unobserve_all()
+            for node_id, value in evidence.items():
+                ev = (
+                    EvidenceBuilder()
+                    .with_node(join_tree.get_bbn_node(node_id))
+                    .with_evidence(value, 1.0)
+                    .build()
+                )
+                join_tree.set_observation(ev)
+            posteriors = join_tree.get_posteriors()
+
+            samples = sampler.get_batch_samples(evidence, n_samples=20000, seed=37)
+            assert 20000 == samples.shape[0]
+
+            for node in bbn.get_nodes():
+                freq = samples[node.id].value_counts(normalize=True)
+                for value, prob in posteriors[node.variable.name].items():
+                    assert abs(freq.get(value, 0.0) - prob) < 0.02
+
+    def test_likelihood_weighting(self):
+        """
+        Tests likelihood weighting.
+        :return: None.
+        """
+        bbn = BbnUtil.get_huang_graph()
+        sampler = LikelihoodWeightingSampler(bbn)
+        evidence = {0: "on", 7: "off"}
+
+        join_tree = InferenceController.apply(bbn)
+        for node_id, value in evidence.items():
+            ev = (
+                EvidenceBuilder()
+                .with_node(join_tree.get_bbn_node(node_id))
+                .with_evidence(value, 1.0)
+                .build()
+            )
+            join_tree.set_observation(ev)
+        e_posteriors = join_tree.get_posteriors()
+
+        o_posteriors = sampler.get_posteriors(evidence, n_samples=50000, seed=37)
+        for name, probs in e_posteriors.items():
+            for value, prob in probs.items():
+                assert abs(o_posteriors[name][value] - prob) < 0.02
+
+        samples, weights = sampler.get_weighted_samples(evidence, n_samples=1000)
+        assert (1000, 8) == samples.shape
+        assert (1000,) == weights.shape
+        assert (samples[0] == "on").all()
+        assert (samples[7] == "off").all()
+        assert 0 < LikelihoodWeightingSampler.get_effective_sample_size(weights) <= 1000
+
+        samples, weights = sampler.get_weighted_samples(
+            evidence, n_samples=10**9, batch_size=100, max_seconds=0.0
+        )
+        assert 100 == samples.shape[0]
+
+    def test_likelihood_weighting_impossible(self):
+        """
+        Tests likelihood weighting with impossible evidence.
+        :return: None.
+        """
+        a = BbnNode(Variable(0, "a", ["on", "off"]), [0.5, 0.5])
+        b = BbnNode(Variable(1, "b", ["on", "off"]), [0.0, 1.0, 0.0, 1.0])
+        bbn = Bbn().add_node(a).add_node(b).add_edge(Edge(a, b, EdgeType.DIRECTED))
+
+        sampler = LikelihoodWeightingSampler(bbn)
+        with self.assertRaises(ValueError):
+            sampler.get_posteriors({1: "on"}, n_samples=100)
+
+    def test_no_samples(self):
+        """
+        Tests that a sample budget of zero is rejected.
+        :return: None.
+        """
+        a = BbnNode(Variable(0, "a", ["on", "off"]), [0.5, 0.5])
+        b = BbnNode(Variable(1, "b", ["on", "off"]), [0.5, 0.5, 0.4, 0.6])
+        bbn = Bbn().add_node(a).add_node(b).add_edge(Edge(a, b, EdgeType.DIRECTED))
+
+        sampler = LikelihoodWeightingSampler(bbn)
+        with self.assertRaises(ValueError):
+            sampler.get_weighted_samples({1: "on"}, n_samples=0)
+        with self.assertRaises(ValueError):
+            sampler.get_posteriors({1: "on"}, n_samples=0)
+        with self.assertRaises(ValueError):
+            sampler.get_batch_samples({1: "on"}, n_samples=0)
+
+    def test_gibbs(self):
+        """
+        Tests Gibbs sampling.
+        :return: None.
+        """
+        bbn = BbnUtil.get_huang_graph()
+        sampler = GibbsSampler(bbn)
+        evidence = {0: "on", 7: "off"}
+
+        join_tree = InferenceController.apply(bbn)
+        for node_id, value in evidence.items():
+            ev = (
+                EvidenceBuilder()
+                .with_node(join_tree.get_bbn_node(node_id))
+                .with_evidence(value, 1.0)
+                .build()
+            )
+            join_tree.set_observation(ev)
+        e_posteriors = join_tree.get_posteriors()
+
+        chains = sampler.get_chains(
+            evidence, n_samples=5000, n_chains=4, burn_in=100, seed=37, n_workers=2
+        )
+        assert (4, 5000, 8) == chains.shape
+        assert (chains[:, :, 0] == 0).all()
+        assert (chains[:, :, 7] == 1).all()
+
+        o_posteriors = sampler.get_posteriors(
+            evidence, n_samples=5000, n_chains=4, burn_in=100, seed=37, n_workers=1
+        )
+        for name, probs in e_posteriors.items():
+            for value, prob in probs.items():
+                assert abs(o_posteriors[name][value] - prob) < 0.03
+
+        rhat = sampler.get_rhat(chains)
+        assert e_posteriors.keys() == rhat.keys()
+        for probs in rhat.values():
+            for r in probs.values():
+                assert r < 1.1